@@ -1,16 +1,48 @@
+import asyncio
 import uuid
+import hashlib
 import json
 import os
+import concurrent.futures
+import queue
+import threading
 import redis
 import vertexai
 from flask import Flask, render_template, request, jsonify, redirect, url_for
 from google.adk.runners import Runner
 from google.api_core.exceptions import NotFound
-from google.adk.sessions import InMemorySessionService
 from google.genai.types import Content, Part
-from literary_companion.tools.gcs_tool import read_gcs_object
-from literary_companion.agents.fun_fact_adk_agents import FunFactCoordinatorAgent
-from literary_companion.config import REDIS_HOST, REDIS_PORT, GCS_BUCKET_NAME
+from literary_companion.tools.gcs_tool import (
+    read_gcs_object,
+    read_gcs_object_with_generation,
+    read_prepared_chapters,
+    read_prepared_manifest,
+)
+from literary_companion.agents.fun_fact_adk_agents import (
+    FunFactCoordinatorAgent, fun_fact_cache, fun_fact_flights,
+)
+from literary_companion.config import (
+    REDIS_HOST, REDIS_PORT, REDIS_CONNECT_TIMEOUT_SECONDS, REDIS_SOCKET_TIMEOUT_SECONDS, GCS_BUCKET_NAME,
+    BOOK_CACHE_MAX_ENTRIES, BOOK_CACHE_MAX_BYTES, BOOK_CACHE_TTL_SECONDS,
+    METADATA_CACHE_MAX_AGE_SECONDS,
+    REDIS_BOOK_STORAGE, REDIS_BOOK_TTL_SECONDS, REDIS_BOOK_SLIDING_EXPIRY,
+    REDIS_BOOK_COMPRESSION, REDIS_BOOK_COMPRESSION_LEVEL,
+    CHAPTER_CACHE_MAX_AGE_SECONDS, SCREENPLAY_CACHE_MAX_AGE_SECONDS, SCREENPLAY_CACHE_TTL_SECONDS,
+    STREAM_MAX_CHAPTERS, STREAM_PARAGRAPHS_PER_LINE, PRELOAD_BOOKS,
+    SESSION_MAX_ENTRIES, SESSION_MAX_BYTES, SESSION_IDLE_TTL_SECONDS,
+)
+from literary_companion.lib.bounded_session_service import BoundedSessionService
+from literary_companion.lib.fun_fact_generators import FUN_FACT_TYPES
+from literary_companion.lib.http_responses import (
+    EncodedBody, cached_body_response, not_modified_response, streamed_response,
+)
+from literary_companion.lib.lru_cache import LRUCache
+from literary_companion.lib.model_client import llm_governor
+from literary_companion.lib.parsed_book import ParsedBook
+from literary_companion.lib.prepared_book import (
+    COMPACT_SEPARATORS, build_chapter_shard, build_shards, compact_metadata, prepared_file_name,
+)
+from literary_companion.lib.redis_book_store import RedisBookStore
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,22 +54,42 @@ vertexai.init()
 
 # Initialize Redis Client
 try:
-    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+    redis_client = redis.Redis(
+        host=REDIS_HOST, port=REDIS_PORT, decode_responses=True,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT_SECONDS, socket_timeout=REDIS_SOCKET_TIMEOUT_SECONDS,
+    )
     redis_client.ping()
     app.logger.info("--- Successfully connected to Redis. ---")
-except redis.exceptions.ConnectionError as e:
+except redis.exceptions.RedisError as e:
     app.logger.error(f"--- Could not connect to Redis. Caching will be disabled. Error: {e} ---")
     redis_client = None
 
-def get_book_data_from_cache_or_gcs(book_name):
-    """Helper function to retrieve book data, using Redis cache if available."""
+# In "hash" mode books are stored chapter by chapter, compressed, so the store
+# needs its own client that returns raw bytes.
+book_store = None
+if redis_client and REDIS_BOOK_STORAGE == "hash":
+    book_store = RedisBookStore(
+        redis.Redis(
+            host=REDIS_HOST, port=REDIS_PORT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT_SECONDS, socket_timeout=REDIS_SOCKET_TIMEOUT_SECONDS,
+        ),
+        ttl_seconds=REDIS_BOOK_TTL_SECONDS,
+        sliding_expiry=REDIS_BOOK_SLIDING_EXPIRY,
+        codec=REDIS_BOOK_COMPRESSION,
+        compression_level=REDIS_BOOK_COMPRESSION_LEVEL,
+    )
+
+def get_book_json_from_cache_or_gcs(book_name):
+    """Helper function to retrieve the raw prepared book JSON, using Redis cache if available."""
+    # Whole-book strings are only cached in the legacy "string" storage mode.
+    string_cache = redis_client if book_store is None else None
     cache_key = f"book:{book_name}"
-    if redis_client:
+    if string_cache:
         try:
-            cached_data = redis_client.get(cache_key)
+            cached_data = string_cache.get(cache_key)
             if cached_data:
                 app.logger.info(f"--- Cache hit for {cache_key}. Serving from Redis. ---")
-                return json.loads(cached_data)
+                return cached_data
         except redis.exceptions.RedisError as e:
             app.logger.error(f"Redis GET failed for key '{cache_key}': {e}")
 
@@ -45,56 +97,227 @@ def get_book_data_from_cache_or_gcs(book_name):
     if not GCS_BUCKET_NAME:
         raise ValueError("GCS_BUCKET_NAME not configured")
 
-    prepared_file_name = book_name.replace('.txt', '_prepared.json')
+    prepared_name = prepared_file_name(book_name)
     try:
-        book_data_str = read_gcs_object(GCS_BUCKET_NAME, prepared_file_name)
-        if redis_client:
+        book_data_str = read_gcs_object(GCS_BUCKET_NAME, prepared_name)
+        if string_cache:
             try:
-                redis_client.set(cache_key, book_data_str, ex=3600)  # 1-hour expiry
+                string_cache.set(cache_key, book_data_str, ex=REDIS_BOOK_TTL_SECONDS)
             except redis.exceptions.RedisError as e:
                 app.logger.error(f"Redis SET failed for key '{cache_key}': {e}")
-        return json.loads(book_data_str)
+        return book_data_str
     except Exception as e:
-        app.logger.error(f"Failed to read or parse {prepared_file_name} from GCS: {e}")
+        app.logger.error(f"Failed to read {prepared_name} from GCS: {e}")
         raise
 
+# Parsed books and chapters are kept in-process so that a chapter request is a
+# dict lookup instead of a Redis/GCS round trip plus a JSON parse. Bounded by
+# BOOK_CACHE_MAX_BYTES, as a single book can hold hundreds of chapter entries.
+book_cache = LRUCache(
+    max_entries=BOOK_CACHE_MAX_ENTRIES,
+    max_bytes=BOOK_CACHE_MAX_BYTES,
+    ttl_seconds=BOOK_CACHE_TTL_SECONDS,
+)
+
+def get_parsed_book(book_name):
+    """Returns the ParsedBook for `book_name`, loading it into the in-process cache on a miss."""
+    def load():
+        app.logger.info(f"--- Parsed book cache miss for {book_name}. Loading and indexing. ---")
+        return ParsedBook.from_json(get_book_json_from_cache_or_gcs(book_name))
+
+    return book_cache.get_or_load(book_name, load, sizer=lambda book: book.memory_bytes)
+
+def _load_book_manifest(book_name):
+    if book_store:
+        try:
+            manifest = book_store.get_manifest(book_name)
+            if manifest:
+                return manifest
+        except redis.exceptions.RedisError as e:
+            app.logger.error(f"Redis manifest read failed for '{book_name}': {e}")
+
+    prepared_name = prepared_file_name(book_name)
+    manifest = read_prepared_manifest(GCS_BUCKET_NAME, prepared_name)
+    shards = {}
+    if manifest is None:
+        if not book_store:
+            return {}
+        # A book prepared before shards existed: split it here so that Redis
+        # can still serve it chapter by chapter.
+        manifest, shards_by_name = build_shards(prepared_name, get_parsed_book(book_name).paragraphs)
+        manifest["gcs_shards"] = False
+        shards = {
+            c["chapter_number"]: shards_by_name[c["object_name"]] for c in manifest["chapters"]
+        }
+
+    if book_store:
+        try:
+            book_store.put_book(book_name, manifest, shards)
+        except redis.exceptions.RedisError as e:
+            app.logger.error(f"Redis manifest write failed for '{book_name}': {e}")
+    return manifest
+
+def get_book_manifest(book_name):
+    """
+    Returns the sharded-layout manifest for `book_name`, or an empty dict for
+    books prepared before shards existed when there is no Redis hash store to
+    split them into. Both outcomes are cached in-process.
+    """
+    if not GCS_BUCKET_NAME:
+        raise ValueError("GCS_BUCKET_NAME not configured")
+    return book_cache.get_or_load(("manifest", book_name), lambda: _load_book_manifest(book_name))
+
+def get_chapters(book_name, chapter_numbers):
+    """
+    Returns {chapter_number: paragraphs} for the requested chapters, reading each
+    one from the in-process cache, then Redis (one pipelined HMGET), then GCS shards.
+    """
+    chapter_numbers = [int(n) for n in chapter_numbers]
+    manifest = get_book_manifest(book_name)
+    if not manifest:
+        book = get_parsed_book(book_name)
+        return {n: book.chapter(n) for n in chapter_numbers}
+
+    chapters = {}
+    missing = []
+    for n in chapter_numbers:
+        cached = book_cache.get((book_name, n))
+        if cached is not None:
+            chapters[n] = cached.chapter(n)
+        else:
+            missing.append(n)
+
+    loaded = {}
+    if missing and book_store:
+        try:
+            loaded = book_store.get_chapters(book_name, missing)
+        except redis.exceptions.RedisError as e:
+            app.logger.error(f"Redis HMGET failed for '{book_name}': {e}")
+
+    still_missing = [n for n in missing if n not in loaded]
+    if still_missing:
+        if manifest.get("gcs_shards", True):
+            from_gcs = read_prepared_chapters(
+                GCS_BUCKET_NAME, prepared_file_name(book_name), still_missing, manifest=manifest
+            )
+            if book_store:
+                try:
+                    book_store.put_chapters(
+                        book_name, {n: build_chapter_shard(n, ps) for n, ps in from_gcs.items()}
+                    )
+                except redis.exceptions.RedisError as e:
+                    app.logger.error(f"Redis chapter write failed for '{book_name}': {e}")
+        else:
+            book = get_parsed_book(book_name)
+            from_gcs = {n: book.chapter(n) for n in still_missing}
+        loaded.update(from_gcs)
+
+    for n in missing:
+        paragraphs = loaded.get(n, [])
+        chapter_book = ParsedBook(paragraphs)
+        book_cache.put((book_name, n), chapter_book, size=chapter_book.memory_bytes)
+        chapters[n] = paragraphs
+    return chapters
+
+def get_chapter_paragraphs(book_name, chapter_number):
+    """Returns one chapter's paragraphs, downloading only that chapter when possible."""
+    return get_chapters(book_name, [chapter_number])[int(chapter_number)]
+
+def get_book_version(book_name):
+    """Returns the content version of a book, used to derive its ETags."""
+    manifest = get_book_manifest(book_name)
+    return manifest["version"] if manifest else get_parsed_book(book_name).version
+
+def get_book_metadata_payload(book_name):
+    """
+    Returns the EncodedBody for the compact metadata of `book_name`. The serialized
+    body is computed once per book version and then served from the in-process cache.
+    """
+    version = get_book_version(book_name)
+
+    def load():
+        manifest = get_book_manifest(book_name)
+        if manifest:
+            metadata = compact_metadata(manifest["chapters"], version)
+        else:
+            metadata = get_parsed_book(book_name).metadata()
+        body = json.dumps(metadata, separators=COMPACT_SEPARATORS).encode('utf-8')
+        return EncodedBody(body, hashlib.sha256(body).hexdigest())
+
+    return book_cache.get_or_load(("metadata", book_name, version), load, sizer=lambda payload: payload.cache_size)
+
+def chapter_etag(version, chapter_number):
+    # Derived from the book version alone, so a revalidation can be answered
+    # without loading the chapter.
+    return hashlib.sha256(f"{version}:{chapter_number}".encode('utf-8')).hexdigest()[:32]
+
+def chapter_stream_etag(version, chapter_numbers):
+    # Covers everything that shapes the stream, so it is known before any chapter is loaded.
+    chapters = ",".join(str(n) for n in chapter_numbers)
+    return hashlib.sha256(
+        f"{version}:stream:{STREAM_PARAGRAPHS_PER_LINE}:{chapters}".encode('utf-8')
+    ).hexdigest()[:32]
+
+def get_chapter_payload(book_name, chapter_number, version):
+    """Returns the serialized chapter response as an EncodedBody, cached per book version."""
+    def load():
+        body = json.dumps(
+            {"paragraphs": get_chapter_paragraphs(book_name, chapter_number)},
+            separators=COMPACT_SEPARATORS,
+        ).encode('utf-8')
+        return EncodedBody(body, chapter_etag(version, chapter_number))
+
+    return book_cache.get_or_load(
+        ("chapter_body", book_name, chapter_number, version), load, sizer=lambda payload: payload.cache_size
+    )
+
+def get_request_params():
+    """Returns the request parameters from the query string (GET) or the JSON body (POST)."""
+    if request.method == "GET":
+        return request.args
+    return request.get_json(silent=True) or {}
+
 @app.route('/')
 def index():
     return redirect(url_for('literary_companion_page'))
 
-session_service_lc = InMemorySessionService()
+session_service_lc = BoundedSessionService(
+    max_sessions=SESSION_MAX_ENTRIES,
+    max_bytes=SESSION_MAX_BYTES,
+    idle_ttl_seconds=SESSION_IDLE_TTL_SECONDS,
+)
 
 @app.route("/literary_companion")
 def literary_companion_page():
     return render_template(
         "literary_companion/literary_companion.html",
-        GCS_FILE_NAME=os.environ.get("GCS_FILE_NAME")
+        GCS_FILE_NAME=os.environ.get("GCS_FILE_NAME"),
+        FUN_FACT_TYPES=FUN_FACT_TYPES,
     )
 
-@app.route("/api/get_book_metadata", methods=["POST"])
+@app.route("/api/get_book_metadata", methods=["GET", "POST"])
 def get_book_metadata():
-    """Returns metadata (paragraph and chapter structure) for a book."""
-    book_name = request.get_json().get("book_name")
+    """
+    Returns compact metadata (chapter and paragraph structure) for a book.
+    GET responses carry a strong ETag, so a returning browser gets a 304.
+    """
+    book_name = get_request_params().get("book_name")
     if not book_name:
         return jsonify({"error": "Missing 'book_name'"}), 400
 
     try:
-        book_data = get_book_data_from_cache_or_gcs(book_name)
-        # Return all paragraph data without the text to keep the payload small
-        metadata = {
-            "paragraphs": [
-                {k: v for k, v in p.items() if k not in ['original_text', 'translated_text']}
-                for p in book_data.get("paragraphs", [])
-            ]
-        }
-        return jsonify(metadata)
+        payload = get_book_metadata_payload(book_name)
     except Exception as e:
         return jsonify({"error": f"Could not load book metadata for {book_name}: {e}"}), 500
+    return cached_body_response(request, payload, METADATA_CACHE_MAX_AGE_SECONDS)
 
-@app.route("/api/get_book_chapter", methods=["POST"])
+@app.route("/api/get_book_chapter", methods=["GET", "POST"])
 def get_book_chapter():
-    """Fetches the text content of a specific chapter."""
-    req_data = request.get_json()
+    """
+    Fetches the text content of a specific chapter. Responses are compressed
+    when the client accepts it, and GET responses can be revalidated by ETag.
+    """
+    req_data = get_request_params()
     book_name = req_data.get("book_name")
     chapter_number = req_data.get("chapter_number")
 
@@ -102,20 +325,115 @@ def get_book_chapter():
         return jsonify({"error": "Missing 'book_name' or 'chapter_number'"}), 400
 
     try:
-        book_data = get_book_data_from_cache_or_gcs(book_name)
-        chapter_paragraphs = [
-            p for p in book_data.get("paragraphs", [])
-            if p.get("chapter_number") == int(chapter_number)
-        ]
-        return jsonify({"paragraphs": chapter_paragraphs})
+        chapter_number = int(chapter_number)
+        version = get_book_version(book_name)
+        not_modified = not_modified_response(
+            request, chapter_etag(version, chapter_number), CHAPTER_CACHE_MAX_AGE_SECONDS
+        )
+        if not_modified:
+            return not_modified
+        payload = get_chapter_payload(book_name, chapter_number, version)
     except Exception as e:
         return jsonify({"error": f"Could not load chapter {chapter_number} for {book_name}: {e}"}), 500
+    return cached_body_response(request, payload, CHAPTER_CACHE_MAX_AGE_SECONDS)
+
+
+def parse_requested_chapters(req_data):
+    """
+    Reads the chapters requested from a stream call: either a 'chapters' list
+    (a JSON list, or a comma-separated string in a query string) or a
+    'start_chapter' plus an optional 'count'.
+    """
+    chapters = req_data.get("chapters")
+    if chapters is not None:
+        if isinstance(chapters, str):
+            chapters = [c for c in chapters.split(",") if c.strip()]
+        return [int(c) for c in chapters]
+    start_chapter = req_data.get("start_chapter")
+    if start_chapter is None:
+        return []
+    count = int(req_data.get("count", 1))
+    return list(range(int(start_chapter), int(start_chapter) + count))
 
+# Threads that load chapters ahead of the one currently being streamed.
+chapter_prefetch_executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="chapter-prefetch")
 
-@app.route("/api/get_screenplay", methods=["POST"])
+@app.route("/api/stream_book_chapters", methods=["GET", "POST"])
+def stream_book_chapters():
+    """
+    Streams several chapters in one round trip as newline-delimited JSON.
+    All requested chapters start loading at once, and each is written out in
+    order as soon as it is ready. The stream is gzipped when the client
+    accepts it, and GET requests can be revalidated by ETag. Lines look like:
+        {"type": "paragraphs", "chapter_number": 3, "paragraphs": [...]}
+        {"type": "chapter_end", "chapter_number": 3, "paragraph_count": 42}
+        {"type": "error", "chapter_number": 4, "error": "..."}
+        {"type": "done"}
+    """
+    req_data = get_request_params()
+    book_name = req_data.get("book_name")
+    try:
+        chapter_numbers = parse_requested_chapters(req_data)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid 'chapters', 'start_chapter' or 'count'"}), 400
+
+    if not book_name or not chapter_numbers:
+        return jsonify({"error": "Missing 'book_name' and 'chapters' or 'start_chapter'"}), 400
+    if len(chapter_numbers) > STREAM_MAX_CHAPTERS:
+        return jsonify({"error": f"At most {STREAM_MAX_CHAPTERS} chapters may be streamed per request"}), 400
+
+    # A stream may include error lines, and its headers go out before the
+    # chapters load, so it is revalidated on every use (max-age 0) rather than
+    # trusted for CHAPTER_CACHE_MAX_AGE_SECONDS. The reader retries failures
+    # with the HTTP cache bypassed.
+    try:
+        etag = chapter_stream_etag(get_book_version(book_name), chapter_numbers)
+    except Exception as e:
+        return jsonify({"error": f"Could not load chapters for {book_name}: {e}"}), 500
+    not_modified = not_modified_response(request, etag, 0)
+    if not_modified:
+        return not_modified
+
+    futures = [
+        (n, chapter_prefetch_executor.submit(get_chapter_paragraphs, book_name, n))
+        for n in chapter_numbers
+    ]
+
+    def generate():
+        for chapter_number, future in futures:
+            try:
+                paragraphs = future.result()
+            except Exception as e:
+                app.logger.error(f"Failed to stream chapter {chapter_number} of {book_name}: {e}")
+                yield json.dumps({"type": "error", "chapter_number": chapter_number, "error": str(e)}) + "\n"
+                continue
+            for i in range(0, len(paragraphs), STREAM_PARAGRAPHS_PER_LINE):
+                yield json.dumps(
+                    {
+                        "type": "paragraphs",
+                        "chapter_number": chapter_number,
+                        "paragraphs": paragraphs[i:i + STREAM_PARAGRAPHS_PER_LINE],
+                    },
+                    separators=COMPACT_SEPARATORS,
+                ) + "\n"
+            yield json.dumps({"type": "chapter_end", "chapter_number": chapter_number, "paragraph_count": len(paragraphs)}) + "\n"
+        yield json.dumps({"type": "done"}) + "\n"
+
+    response = streamed_response(
+        request, (line.encode('utf-8') for line in generate()), "application/x-ndjson", etag=etag
+    )
+    # Ask proxies in front of Cloud Run not to buffer the stream.
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@app.route("/api/get_screenplay", methods=["GET", "POST"])
 def get_screenplay():
-    """Fetches the screenplay for a specific chapter."""
-    req_data = request.get_json()
+    """
+    Fetches the screenplay for a specific chapter. The ETag is the GCS
+    generation of the screenplay object, so it changes whenever it is rewritten.
+    """
+    req_data = get_request_params()
     book_name = req_data.get("book_name")
     chapter_number = req_data.get("chapter_number")
 
@@ -126,9 +444,15 @@ def get_screenplay():
         # The screenplay is stored in a folder named after the book, without the .txt extension.
         folder_name = book_name.replace('.txt', '')
         object_name = f"{folder_name}/chapter_{chapter_number}_screenplay.md"
-        
-        screenplay_content = read_gcs_object(GCS_BUCKET_NAME, object_name)
-        return jsonify({"screenplay": screenplay_content})
+
+        cache_key = ("screenplay", object_name)
+        payload = book_cache.get(cache_key)
+        if payload is None:
+            screenplay_content, generation = read_gcs_object_with_generation(GCS_BUCKET_NAME, object_name)
+            body = json.dumps({"screenplay": screenplay_content}, separators=COMPACT_SEPARATORS).encode('utf-8')
+            payload = EncodedBody(body, f"sp-{generation}")
+            book_cache.put(cache_key, payload, size=payload.cache_size, ttl_seconds=SCREENPLAY_CACHE_TTL_SECONDS)
+        return cached_body_response(request, payload, SCREENPLAY_CACHE_MAX_AGE_SECONDS)
     except NotFound:
         app.logger.info(f"Screenplay not found for chapter {chapter_number} of {book_name}. Returning 404.")
         # The frontend will handle this and display a user-friendly message.
@@ -138,47 +462,187 @@ def get_screenplay():
         return jsonify({"error": f"Could not load screenplay for chapter {chapter_number}"}), 500
 
 
-@app.route("/generate_fun_facts", methods=["POST"])
-async def generate_fun_facts():
-    req_data = request.get_json()
-    text_segment = req_data.get("text_segment")
-    session_id = req_data.get("session_id")
-    chapter_number = req_data.get("chapter_number")
-    book_name = req_data.get("book_name")
+@app.route("/api/cache_stats", methods=["GET"])
+def cache_stats():
+    """Reports counters for the in-process caches, the session store, fun-fact coalescing and the LLM governor."""
+    return jsonify({
+        "book_cache": book_cache.stats(),
+        "sessions": session_service_lc.stats(),
+        "fun_fact_cache": fun_fact_cache.stats(),
+        "fun_fact_flights": fun_fact_flights.stats(),
+        "llm": llm_governor.stats(),
+    })
+
 
+def validate_fun_fact_request(req_data):
+    """Returns an error message if the fun-fact payload is missing fields, else None."""
     missing_fields = []
-    if not text_segment: missing_fields.append("text_segment")
-    if not session_id: missing_fields.append("session_id")
-    if chapter_number is None: missing_fields.append("chapter_number")
-    if not book_name: missing_fields.append("book_name")
+    if not req_data.get("text_segment"): missing_fields.append("text_segment")
+    if not req_data.get("session_id"): missing_fields.append("session_id")
+    if req_data.get("chapter_number") is None: missing_fields.append("chapter_number")
+    if not req_data.get("book_name"): missing_fields.append("book_name")
     if missing_fields:
-        return jsonify({"error": f"Missing required fields: {', '.join(missing_fields)}"}), 400
+        return f"Missing required fields: {', '.join(missing_fields)}"
+    return None
 
+async def iter_fun_facts(req_data):
+    """
+    Runs the FunFactCoordinatorAgent for a validated request payload. Yields
+    ("fact", {"fact_type", "fact"}) as each fact is generated, then either
+    ("result", final_fun_facts) or ("error", {"error": message}).
+    """
     app.logger.info("--- API: Received request for fun facts. ---")
 
     coordinator = FunFactCoordinatorAgent(
-        fun_fact_types=["historical_context", "geographical_setting", "plot_points", "character_sentiments", "character_relationships"],
-        book_name=book_name,
-        chapter_number=int(chapter_number),
+        fun_fact_types=FUN_FACT_TYPES,
+        book_name=req_data["book_name"],
+        chapter_number=int(req_data["chapter_number"]),
     )
 
     runner = Runner(agent=coordinator, app_name="literary-companion-adk", session_service=session_service_lc)
-    user_id = f"user_{session_id}"
-    adk_session_id = session_id
+    user_id = f"user_{req_data['session_id']}"
+    # A fresh session per run, so repeat clicks from one reader never collide.
+    adk_session_id = f"{req_data['session_id']}_{uuid.uuid4().hex}"
 
     session_service_lc.create_session(
-        app_name="literary-companion-adk", user_id=user_id, session_id=adk_session_id, state={"text_segment": text_segment}
+        app_name="literary-companion-adk", user_id=user_id, session_id=adk_session_id,
+        state={"text_segment": req_data["text_segment"]},
     )
 
     try:
-        async for _ in runner.run_async(user_id=user_id, session_id=adk_session_id, new_message=Content(role="user", parts=[Part(text="Go.")])):
-            pass
+        async for event in runner.run_async(user_id=user_id, session_id=adk_session_id, new_message=Content(role="user", parts=[Part(text="Go.")])):
+            if event.partial and event.custom_metadata:
+                yield "fact", event.custom_metadata
         final_session = session_service_lc.get_session(app_name="literary-companion-adk", user_id=user_id, session_id=adk_session_id)
-        final_result = final_session.state.get("final_fun_facts", {})
-        return jsonify(final_result)
+        if final_session is None:
+            yield "error", {"error": "The fun-fact session expired before the run completed."}
+        else:
+            yield "result", final_session.state.get("final_fun_facts", {})
     except Exception as e:
         app.logger.error(f"--- API Error in generate_fun_facts: {e} ---")
-        return jsonify({"error": f"An internal error occurred: {str(e)}"}), 500
+        yield "error", {"error": f"An internal error occurred: {str(e)}"}
+    finally:
+        session_service_lc.delete_session(app_name="literary-companion-adk", user_id=user_id, session_id=adk_session_id)
+
+async def run_fun_facts(req_data):
+    """
+    Runs the FunFactCoordinatorAgent for a request payload and returns
+    (response_dict, status_code). Shared by the Flask view and the ASGI app.
+    """
+    error = validate_fun_fact_request(req_data)
+    if error:
+        return {"error": error}, 400
+
+    result, status = {}, 200
+    async for kind, payload in iter_fun_facts(req_data):
+        if kind == "result":
+            result = payload
+        elif kind == "error":
+            result, status = payload, 500
+    return result, status
+
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_fun_fact_messages(req_data):
+    """
+    Yields server-sent events for a validated fun-fact request: one "fact"
+    event per fact type as soon as it is ready, then a "result" event with the
+    aggregated facts (as cached) or an "error" event. Facts served from the
+    cache, or generated by a concurrent request, arrive together just before
+    the result.
+    """
+    sent = set()
+    async for kind, payload in iter_fun_facts(req_data):
+        if kind == "fact":
+            sent.add(payload["fact_type"])
+            yield sse_message("fact", payload)
+        elif kind == "result":
+            for fact_type, fact in payload.items():
+                if fact_type in FUN_FACT_TYPES and fact_type not in sent:
+                    yield sse_message("fact", {"fact_type": fact_type, "fact": fact})
+            yield sse_message("result", payload)
+        else:
+            yield sse_message("error", payload)
+
+def iterate_in_thread(async_iterable):
+    """
+    Drives an async iterable on its own event loop in a worker thread and
+    yields its items synchronously, so a WSGI response can stream them.
+    """
+    items = queue.Queue()
+    finished = object()
+    consumer_gone = threading.Event()
+
+    async def drain():
+        try:
+            async for item in async_iterable:
+                items.put(item)
+                if consumer_gone.is_set():
+                    break
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(finished)
+
+    threading.Thread(target=asyncio.run, args=(drain(),), daemon=True).start()
+    try:
+        while True:
+            item = items.get()
+            if item is finished:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        consumer_gone.set()
+
+@app.route("/generate_fun_facts", methods=["POST"])
+async def generate_fun_facts():
+    # Under gunicorn's threaded workers each call runs on its own short-lived
+    # event loop. asgi.py serves this route natively on one shared loop instead.
+    result, status = await run_fun_facts(request.get_json(silent=True) or {})
+    return jsonify(result), status
+
+@app.route("/generate_fun_facts_stream", methods=["POST"])
+def generate_fun_facts_stream():
+    """
+    Streams fun facts as server-sent events, each fact type as soon as its
+    generator finishes. Takes the same JSON payload as /generate_fun_facts.
+    """
+    req_data = request.get_json(silent=True) or {}
+    error = validate_fun_fact_request(req_data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    response = app.response_class(
+        iterate_in_thread(stream_fun_fact_messages(req_data)), mimetype="text/event-stream"
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop proxies from buffering the stream until it completes.
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+def warm_book_cache():
+    """
+    Loads the books listed in PRELOAD_BOOKS into the in-process cache. Runs in
+    each worker at import; the app is not preloaded into the gunicorn master,
+    as its GCS, Vertex AI and Redis clients are not fork-safe.
+    """
+    for book_name in PRELOAD_BOOKS:
+        try:
+            manifest = get_book_manifest(book_name)
+            chapter_numbers = [c["chapter_number"] for c in manifest["chapters"]] if manifest else []
+            if chapter_numbers:
+                get_chapters(book_name, chapter_numbers)
+            else:
+                get_parsed_book(book_name)
+            get_book_metadata_payload(book_name)
+            app.logger.info(f"--- Preloaded {book_name} into the book cache. ---")
+        except Exception as e:
+            app.logger.error(f"--- Failed to preload {book_name}: {e} ---")
+
+warm_book_cache()
 
 if __name__ == '__main__':
     app.run(debug=True, port=5001) 
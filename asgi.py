@@ -0,0 +1,114 @@
+# asgi.py
+#
+# ASGI entry point for the Literary Companion.
+#
+# The fun-fact routes are served natively on the worker's single, shared event
+# loop, so a multi-second LLM fan-out no longer pins a thread per request.
+# Every other route is delegated to the Flask app through asgiref's WSGI
+# adapter, so all routes and behaviour stay the same.
+#
+# Run with gunicorn and uvicorn workers. Do not use --preload: the clients the
+# app creates at import time are not fork-safe, so each worker imports it:
+#
+#   gunicorn --bind 0.0.0.0:8080 --workers 2 \
+#       -k uvicorn.workers.UvicornWorker asgi:application
+
+import json
+
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app, run_fun_facts, stream_fun_fact_messages, validate_fun_fact_request
+
+wsgi_application = WsgiToAsgi(flask_app)
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send, payload, status: int) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _handle_lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def generate_fun_facts(scope, receive, send) -> None:
+    try:
+        req_data = json.loads(await _read_body(receive) or b"{}")
+    except ValueError:
+        await _send_json(send, {"error": "Request body must be valid JSON"}, 400)
+        return
+    result, status = await run_fun_facts(req_data)
+    await _send_json(send, result, status)
+
+
+async def generate_fun_facts_stream(scope, receive, send) -> None:
+    try:
+        req_data = json.loads(await _read_body(receive) or b"{}")
+    except ValueError:
+        await _send_json(send, {"error": "Request body must be valid JSON"}, 400)
+        return
+    error = validate_fun_fact_request(req_data)
+    if error:
+        await _send_json(send, {"error": error}, 400)
+        return
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ],
+    })
+    async for message in stream_fun_fact_messages(req_data):
+        await send({"type": "http.response.body", "body": message.encode("utf-8"), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+# Routes served natively on the event loop, keyed by (method, path).
+NATIVE_ROUTES = {
+    ("POST", "/generate_fun_facts"): generate_fun_facts,
+    ("POST", "/generate_fun_facts_stream"): generate_fun_facts_stream,
+}
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _handle_lifespan(receive, send)
+        return
+
+    handler = NATIVE_ROUTES.get((scope.get("method"), scope.get("path")))
+    if handler:
+        await handler(scope, receive, send)
+        return
+
+    # WsgiToAsgi runs Flask in "thread sensitive" mode, which by default funnels
+    # every request through one shared thread. A context per request gives each
+    # one its own thread, matching gunicorn's threaded workers.
+    async with ThreadSensitiveContext():
+        await wsgi_application(scope, receive, send)
@@ -4,23 +4,61 @@ import asyncio
 import json
 import os
 import sys
-from typing import AsyncGenerator, List, Dict
+import time
+from typing import AsyncGenerator, Callable, Dict, List, Tuple
 
+import redis
 from google.adk.agents import BaseAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event, EventActions
 from google.genai.types import Content, Part
 
-from literary_companion.config import GCS_BUCKET_NAME
+from literary_companion.config import (
+    GCS_BUCKET_NAME,
+    FUN_FACT_REDIS_LOCK,
+    FUN_FACT_LOCK_TTL_SECONDS,
+    FUN_FACT_LOCK_POLL_SECONDS,
+    FUN_FACT_CACHE_MAX_ENTRIES,
+    FUN_FACT_CACHE_TTL_SECONDS,
+    FUN_FACT_REDIS_TTL_SECONDS,
+    FUN_FACT_NEGATIVE_TTL_SECONDS,
+)
 from literary_companion.lib import fun_fact_generators
-from literary_companion.tools.gcs_tool import check_gcs_object_exists, read_gcs_object, write_gcs_object
+from literary_companion.lib.fun_fact_cache import FunFactCache
+from literary_companion.lib.fun_fact_keys import (
+    chapter_index_object_name,
+    chapter_key,
+    chapter_object_name,
+    fact_keys,
+    fact_object_name,
+    text_hash,
+)
+from literary_companion.lib.prepared_book import prepared_file_name
+from literary_companion.lib.redis_client import get_redis_client
+from literary_companion.lib.redis_lock import RedisLock
+from literary_companion.lib.single_flight import SingleFlight
+from literary_companion.lib.text_keys import normalize_text
+from literary_companion.tools.gcs_tool import read_prepared_chapters
+
+# Shared by every coordinator in the process, keyed by (book, chapter, chapter key).
+fun_fact_flights = SingleFlight()
+
+fun_fact_cache = FunFactCache(
+    GCS_BUCKET_NAME,
+    max_entries=FUN_FACT_CACHE_MAX_ENTRIES,
+    local_ttl_seconds=FUN_FACT_CACHE_TTL_SECONDS,
+    redis_ttl_seconds=FUN_FACT_REDIS_TTL_SECONDS,
+    negative_ttl_seconds=FUN_FACT_NEGATIVE_TTL_SECONDS,
+)
 
 
 class FunFactCoordinatorAgent(BaseAgent):
     """
     A Custom Agent to orchestrate the generation of multiple fun facts.
     This agent is now more efficient, checking for cached results first
-    and generating facts directly if no cache is found.
+    and generating facts directly if no cache is found. Cached facts are
+    content addressed (see lib/fun_fact_keys.py), so facts whose inputs are
+    unchanged are reused when a prompt or the model changes.
     """
     fun_fact_types: List[str]
     book_name: str
@@ -48,81 +86,285 @@ class FunFactCoordinatorAgent(BaseAgent):
 
         # Normalize book name by removing extension if present
         base_book_name, _ = os.path.splitext(self.book_name)
-        cache_path = f"{base_book_name}/chapter_{self.chapter_number}_fun_facts.json"
 
+        # Get the text segment for context.
+        # PRIORITIZE segment from session state. Fallback to GCS.
+        text_segment = ctx.session.state.get("text_segment")
         try:
-            # 1. Check for cached fun facts
-            if check_gcs_object_exists(GCS_BUCKET_NAME, cache_path):
-                print(f"--- Cache hit for {cache_path}. Reading from GCS. ---")
-                cached_data = read_gcs_object(GCS_BUCKET_NAME, cache_path)
-                final_results = json.loads(cached_data)
-                # Yield final event with cached data and exit immediately
-                yield Event(
-                    author=self.name,
-                    content=Content(parts=[Part(text=json.dumps(final_results))]),
-                    actions=EventActions(state_delta={"final_fun_facts": final_results}),
-                )
-                print("--- ADK FunFactCoordinator: Finished early due to cache hit. ---")
-                return
-
-            # 2. Cache miss: Proceed with generation
-            print(f"--- Cache miss for {cache_path}. Generating fun facts. ---")
-
-            # 3. Get the text segment for context.
-            #    PRIORITIZE segment from session state. Fallback to GCS.
-            text_segment = ctx.session.state.get("text_segment")
             if text_segment:
                 print("--- Using text_segment provided in session state. ---")
             else:
-                print("--- text_segment not in session state. Falling back to loading full chapter from GCS. ---")
-                prepared_book_path = f"{base_book_name}_prepared.json"
-                print(f"--- Reading prepared book from: {prepared_book_path} ---")
-                book_data = json.loads(read_gcs_object(GCS_BUCKET_NAME, prepared_book_path))
-                # Use the translated text for context, as that's what the user is reading.
-                paragraphs = [
-                    p.get("translated_text", p.get("original_text", ""))
-                    for p in book_data.get("paragraphs", [])
-                    if p.get("chapter_number") == self.chapter_number
-                ]
-                if not paragraphs:
-                    error_msg = f"No paragraphs found for chapter {self.chapter_number} in {prepared_book_path}."
-                    print(f"ERROR: {error_msg}", file=sys.stderr)
-                    yield Event(author=self.name, content=Content(parts=[Part(text=error_msg)]))
+                # The chapter index points at the facts last generated for this
+                # chapter, which saves loading the chapter text on a hit.
+                indexed_results = await self._read_indexed(base_book_name)
+                if indexed_results is not None:
+                    yield self._final_event(indexed_results)
                     return
-                text_segment = "\n\n".join(paragraphs)
+                text_segment = await self._read_chapter_text(base_book_name)
+        except LookupError as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}", file=sys.stderr)
+            yield Event(author=self.name, content=Content(parts=[Part(text=error_msg)]))
+            return
+
+        # Each fact is yielded as a partial event as soon as its generator
+        # finishes, so streaming callers can show it before the rest are done.
+        progress: asyncio.Queue = asyncio.Queue()
+        flight = asyncio.ensure_future(self.get_fun_facts(text_segment, on_fact=progress.put_nowait))
+        while True:
+            next_fact = asyncio.ensure_future(progress.get())
+            try:
+                await asyncio.wait({flight, next_fact}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if not next_fact.done():
+                    next_fact.cancel()
+            if not next_fact.done() or next_fact.cancelled():
+                break
+            yield self._fact_event(*next_fact.result())
+        while not progress.empty():
+            yield self._fact_event(*progress.get_nowait())
+
+        yield self._final_event(flight.result())
+
+    async def get_fun_facts(
+        self, text_segment: str, on_fact: Callable[[Tuple[str, str]], None] = lambda fact: None
+    ) -> Dict:
+        """
+        Returns the chapter's fun facts for `text_segment`, from the cache or
+        newly generated and cached. Each (fact_type, fact) that was not already
+        cached for the chapter is passed to `on_fact` as soon as it is ready.
+        """
+        results, _ = await self.get_fun_facts_stored(text_segment, on_fact=on_fact)
+        return results
+
+    async def get_fun_facts_stored(
+        self, text_segment: str, on_fact: Callable[[Tuple[str, str]], None] = lambda fact: None
+    ) -> Tuple[Dict, bool]:
+        """
+        Like get_fun_facts, but returns (results, stored), where `stored` is
+        True only if the chapter's results are durably cached: found in the
+        cache, or generated and written to GCS.
+        """
+        base_book_name, text_segment, text_sha256, keys, current_chapter_key = self._cache_keys(text_segment)
+
+        # Readers arriving at the same chapter together share one lookup and,
+        # on a cache miss, one generation. Only the request that leads the
+        # generation sees per-fact progress; the others get the final result.
+        return await fun_fact_flights.do(
+            (base_book_name, self.chapter_number, current_chapter_key),
+            lambda: self._load_or_generate(
+                base_book_name, text_segment, text_sha256, keys, current_chapter_key, on_fact=on_fact
+            ),
+        )
+
+    def chapter_cache_path(self, text_segment: str) -> str:
+        """The cache object that holds this chapter's fun facts for `text_segment`."""
+        base_book_name, _, _, _, current_chapter_key = self._cache_keys(text_segment)
+        return chapter_object_name(base_book_name, self.chapter_number, current_chapter_key)
+
+    def _cache_keys(self, text_segment: str):
+        # Normalize book name by removing extension if present
+        base_book_name, _ = os.path.splitext(self.book_name)
+        # Cache keys are content addressed: a hash of the normalized text, each
+        # generator's instruction, the model and the prompt version.
+        text_segment = normalize_text(text_segment)
+        text_sha256 = text_hash(text_segment)
+        keys = fact_keys(self.fun_fact_types, text_sha256)
+        return base_book_name, text_segment, text_sha256, keys, chapter_key(keys)
+
+    def _final_event(self, final_results: Dict) -> Event:
+        print(f"--- ADK FunFactCoordinator: Fun fact generation complete. Final results: {final_results} ---")
+        return Event(
+            author=self.name,
+            content=Content(parts=[Part(text=json.dumps(final_results))]),
+            actions=EventActions(state_delta={"final_fun_facts": final_results}),
+        )
+
+    def _fact_event(self, fact_type: str, fact: str) -> Event:
+        # Partial events are passed through to the caller but not stored in the session.
+        return Event(
+            author=self.name,
+            partial=True,
+            content=Content(parts=[Part(text=fact)]),
+            custom_metadata={"fact_type": fact_type, "fact": fact},
+        )
+
+    async def _load_or_generate(
+        self,
+        base_book_name: str,
+        text_segment: str,
+        text_sha256: str,
+        keys: Dict[str, str],
+        current_chapter_key: str,
+        on_fact: Callable[[Tuple[str, str]], None],
+    ) -> Dict:
+        """
+        Returns (results, stored) for the chapter's fun facts from the fun-fact
+        cache. On a miss, reuses any individual facts whose keys are unchanged,
+        generates the rest and caches everything. Each (fact_type, fact) not
+        already cached for the chapter is passed to `on_fact` as soon as it is
+        available.
+        """
+        cache_path = chapter_object_name(base_book_name, self.chapter_number, current_chapter_key)
+        lock = None
+        generating = False
+        try:
+            # 1. Check for cached fun facts
+            cached_results = await self._read_cached(cache_path)
+            if cached_results is not None:
+                return cached_results, True
+
+            # 2. Cache miss: with a Redis lease, only one instance generates.
+            if FUN_FACT_REDIS_LOCK:
+                lock, cached_results = await self._acquire_generation_lock(
+                    base_book_name, cache_path, current_chapter_key
+                )
+                if cached_results is not None:
+                    return cached_results, True
+            print(f"--- Cache miss for {cache_path}. Generating fun facts. ---")
+            await asyncio.to_thread(fun_fact_cache.mark_generating, cache_path)
+            generating = True
+
+            # 3. Reuse facts whose inputs have not changed, e.g. after editing
+            #    only one generator's instruction.
+            fact_paths = {t: fact_object_name(base_book_name, t, keys[t]) for t in self.fun_fact_types}
+            cached_facts = await asyncio.gather(*(self._read_cached(fact_paths[t]) for t in self.fun_fact_types))
+            generated_facts = {}
+            for fact_type, cached_fact in zip(self.fun_fact_types, cached_facts):
+                if cached_fact is not None:
+                    generated_facts[fact_type] = cached_fact["fact"]
+                    on_fact((fact_type, cached_fact["fact"]))
+
+            # 4. Generate the remaining fun facts in parallel, collecting each as it finishes
+            async def generate(fact_type, generator_func):
+                # The generators are async, so the fan-out runs on the event loop.
+                return fact_type, await generator_func(text_segment)
 
-            # 4. Generate fun facts in parallel
             tasks = []
             for fact_type in self.fun_fact_types:
                 generator_func = getattr(fun_fact_generators, f"analyze_{fact_type}", None)
-                if generator_func:
-                    # We need a wrapper to run the sync function in an async context
-                    tasks.append(
-                        asyncio.to_thread(generator_func, text_segment)
-                    )
-
-            generated_results = await asyncio.gather(*tasks)
+                if generator_func and fact_type not in generated_facts:
+                    tasks.append(generate(fact_type, generator_func))
 
-            # 5. Aggregate results
-            final_results = {}
-            for i, fact_type in enumerate(self.fun_fact_types):
+            # 5. Aggregate results, caching each successful fact on its own
+            all_succeeded = True
+            for next_result in asyncio.as_completed(tasks):
+                fact_type, result = await next_result
                 # The result from the generator is a dict, e.g., {"status": "success", "fact": "..."}
-                final_results[fact_type] = generated_results[i].get("fact", "No fact generated.")
+                generated_facts[fact_type] = result.get("fact", "No fact generated.")
+                on_fact((fact_type, generated_facts[fact_type]))
+                if result.get("status") == "success":
+                    await asyncio.to_thread(
+                        fun_fact_cache.put, fact_paths[fact_type], {"fact": generated_facts[fact_type]}
+                    )
+                else:
+                    all_succeeded = False
+            # Keep the configured order in the cached result, whatever the completion order.
+            final_results = {t: generated_facts[t] for t in self.fun_fact_types if t in generated_facts}
 
-            # 6. Write the new results to the cache
-            write_gcs_object(GCS_BUCKET_NAME, cache_path, json.dumps(final_results, indent=4))
-            print(f"--- Wrote fun facts to cache: {cache_path} ---")
+            # 6. Write the chapter's results and point the chapter index at them.
+            #    A failed fact is not cached, so the next request retries just that one.
+            if all_succeeded:
+                status = await asyncio.to_thread(fun_fact_cache.put, cache_path, final_results)
+                if status.startswith("Error"):
+                    # Not stored durably, so the chapter index must not point at it.
+                    return final_results, False
+                generating = False
+                await asyncio.to_thread(fun_fact_cache.put, chapter_index_object_name(base_book_name, self.chapter_number), {
+                    "chapter_number": self.chapter_number,
+                    "key": current_chapter_key,
+                    "object_name": cache_path,
+                    "text_sha256": text_sha256,
+                    "fact_keys": keys,
+                })
+                print(f"--- Wrote fun facts to cache: {cache_path} ---")
+            return final_results, all_succeeded
 
         except Exception as e:
             error_msg = f"Error during fun fact generation or caching: {e}"
             print(f"--- {error_msg} ---", file=sys.stderr)
-            final_results = {"error": error_msg}
+            return {"error": error_msg}, False
+        finally:
+            if generating:
+                await asyncio.to_thread(fun_fact_cache.clear_generating, cache_path)
+            if lock is not None:
+                await asyncio.to_thread(lock.release)
 
-        print(f"--- ADK FunFactCoordinator: Fun fact generation complete. Final results: {final_results} ---")
+    async def _read_cached(self, cache_path: str, trust_negative: bool = True):
+        """Returns the cached fun facts at `cache_path`, or None if there are none."""
+        cached_results = fun_fact_cache.get_local(cache_path)
+        if cached_results is None:
+            # Redis and GCS calls are blocking, so they run in a worker thread to
+            # keep the event loop (shared by every request under ASGI) free.
+            cached_results = await asyncio.to_thread(fun_fact_cache.get, cache_path, trust_negative)
+        if cached_results is not None:
+            print(f"--- Cache hit for {cache_path}. ---")
+        return cached_results
 
-        # 7. Yield the final event with the results
-        yield Event(
-            author=self.name,
-            content=Content(parts=[Part(text=json.dumps(final_results))]),
-            actions=EventActions(state_delta={"final_fun_facts": final_results}),
+    async def _read_indexed(self, base_book_name: str):
+        """Returns the chapter's most recently generated fun facts, via the chapter index."""
+        index = await self._read_cached(chapter_index_object_name(base_book_name, self.chapter_number))
+        if not index:
+            return None
+        # The entry is stale if the instructions, model or prompt version have
+        # changed since, as the same text would now produce a different key.
+        if chapter_key(fact_keys(self.fun_fact_types, index["text_sha256"])) != index["key"]:
+            print(f"--- Chapter {self.chapter_number} index is stale. Regenerating. ---")
+            return None
+        return await self._read_cached(index["object_name"])
+
+    async def _acquire_generation_lock(self, base_book_name: str, cache_path: str, current_chapter_key: str):
+        """
+        Takes the cross-instance generation lease for this chapter. While another
+        instance holds it, polls the cache for that instance's result.
+        Returns (lock, None) once this instance should generate, (None, results)
+        if another instance finished first, or (None, None) if Redis is
+        unavailable or the wait timed out, in which case this instance generates
+        without a lease.
+        """
+        client = await asyncio.to_thread(get_redis_client)
+        if client is None:
+            return None, None
+        lock = RedisLock(
+            client,
+            f"lock:fun_facts:{base_book_name}:{self.chapter_number}:{current_chapter_key}",
+            ttl_seconds=FUN_FACT_LOCK_TTL_SECONDS,
+        )
+        deadline = time.monotonic() + FUN_FACT_LOCK_TTL_SECONDS
+        while True:
+            try:
+                if await asyncio.to_thread(lock.acquire):
+                    break
+            except redis.exceptions.RedisError as e:
+                print(f"--- Redis lock unavailable ({e}). Generating {cache_path} without it. ---")
+                return None, None
+            if time.monotonic() > deadline:
+                print(f"--- Timed out waiting for another instance to generate {cache_path}. ---")
+                return None, None
+            await asyncio.sleep(FUN_FACT_LOCK_POLL_SECONDS)
+            cached_results = await self._read_cached(cache_path)
+            if cached_results is not None:
+                return None, cached_results
+        # The previous holder may have written the cache just before releasing.
+        cached_results = await self._read_cached(cache_path, trust_negative=False)
+        if cached_results is not None:
+            await asyncio.to_thread(lock.release)
+            return None, cached_results
+        return lock, None
+
+    async def _read_chapter_text(self, base_book_name: str) -> str:
+        """Loads the chapter's translated text from the prepared book in GCS."""
+        print("--- text_segment not in session state. Falling back to loading full chapter from GCS. ---")
+        prepared_book_path = prepared_file_name(f"{base_book_name}.txt")
+        print(f"--- Reading chapter {self.chapter_number} of prepared book: {prepared_book_path} ---")
+        chapters = await asyncio.to_thread(
+            read_prepared_chapters, GCS_BUCKET_NAME, prepared_book_path, [self.chapter_number]
         )
+        # Use the translated text for context, as that's what the user is reading.
+        paragraphs = [
+            p.get("translated_text", p.get("original_text", ""))
+            for p in chapters.get(self.chapter_number, [])
+        ]
+        if not paragraphs:
+            raise LookupError(f"No paragraphs found for chapter {self.chapter_number} in {prepared_book_path}.")
+        return "\n\n".join(paragraphs)
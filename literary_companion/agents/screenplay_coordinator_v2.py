@@ -1,7 +1,8 @@
 # In literary_companion/agents/screenplay_coordinator_v2.py
+import asyncio
 import logging
 import json
-from typing import AsyncGenerator, Optional, Any
+from typing import AsyncGenerator, Dict, List, Optional, Any, Tuple
 from collections import defaultdict
 import pathlib
 from typing_extensions import override
@@ -9,8 +10,27 @@ from typing_extensions import override
 from google.adk.agents import LlmAgent, BaseAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event, EventActions
-from literary_companion.config import DEFAULT_AGENT_MODEL, GCS_BUCKET_NAME
-from literary_companion.tools.gcs_tool import write_gcs_object
+from literary_companion.config import (
+    DEFAULT_AGENT_MODEL,
+    GCS_BUCKET_NAME,
+    SCREENPLAY_CHUNK_OVERLAP_TOKENS,
+    SCREENPLAY_CHUNK_TOKENS,
+    SCREENPLAY_LLM_POLISH,
+    SCREENPLAY_PARALLELISM,
+    SCREENPLAY_PROMPT_BATCH_MAX_SCENES,
+    SCREENPLAY_PROMPT_BATCH_TOKENS,
+    SCREENPLAY_PROMPT_OUTPUT_TOKENS_PER_SCENE,
+)
+from literary_companion.lib.screenplay_checkpoint import (
+    PROMPTS_STAGE,
+    SCENES_STAGE,
+    SCREENPLAY_STAGE,
+    ScreenplayCheckpoint,
+    stage_input_hash,
+)
+from literary_companion.lib.screenplay_renderer import render_screenplay
+from literary_companion.lib.token_estimate import estimate_tokens, pack_by_tokens, trailing_within
+from literary_companion.tools.gcs_tool import open_screenplay_checkpoint, write_gcs_object
 from google.genai.types import GenerateContentConfig, Content, Part
 
 logging.basicConfig(level=logging.INFO)
@@ -51,6 +71,94 @@ def _clean_and_parse_json(json_string: Optional[str], log_context: str) -> Optio
         logger.error(f"[{log_context}] Failed to decode JSON. Content: {cleaned_str[:500]}...")
         return None
 
+
+def _parse_complete_array_items(json_string: Optional[str]) -> List[Any]:
+    """
+    Parses the complete elements at the start of a JSON array whose text was
+    cut off, e.g. by the output-token limit. Returns the elements decoded
+    before the first incomplete one, or [] if the text is not an array.
+    """
+    if not json_string:
+        return []
+    cleaned_str = json_string.strip()
+    if cleaned_str.startswith("```json"):
+        cleaned_str = cleaned_str[7:]
+    elif cleaned_str.startswith("```"):
+        cleaned_str = cleaned_str[3:]
+    cleaned_str = cleaned_str.strip()
+    if not cleaned_str.startswith("["):
+        return []
+
+    decoder = json.JSONDecoder()
+    items = []
+    pos = 1
+    while True:
+        while pos < len(cleaned_str) and cleaned_str[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(cleaned_str) or cleaned_str[pos] == "]":
+            return items
+        try:
+            item, pos = decoder.raw_decode(cleaned_str, pos)
+        except json.JSONDecodeError:
+            return items
+        items.append(item)
+
+
+def pack_chapter_chunks(
+    chapter_paragraphs: List[str],
+    max_tokens: int = SCREENPLAY_CHUNK_TOKENS,
+    overlap_tokens: int = SCREENPLAY_CHUNK_OVERLAP_TOKENS,
+) -> List[Tuple[str, str]]:
+    """
+    Packs a chapter's paragraphs into scene-generation chunks of about
+    `max_tokens` estimated tokens, never splitting a paragraph. Returns
+    (chunk_text, previous_text) pairs, where previous_text holds the trailing
+    paragraphs of the chunk before, up to `overlap_tokens`, for continuity.
+    """
+    chunks = pack_by_tokens(chapter_paragraphs, max(1, max_tokens))
+    packed = []
+    for i, chunk in enumerate(chunks):
+        previous = trailing_within(chunks[i - 1], overlap_tokens) if i else []
+        packed.append(("\n\n".join(chunk), "\n\n".join(previous)))
+    return packed
+
+
+def _scene_prompt_text(scene_index: int, scene: dict) -> str:
+    """Formats one scene for a batched creative prompt call."""
+    return f"[Scene {scene_index}]\nAction: {scene.get('action', '')}\nDialogue: {scene.get('dialogue', '')}"
+
+
+def _batch_prompts_by_index(parsed: Optional[Any], scene_indices: List[int]) -> Dict[int, dict]:
+    """
+    Picks the prompt objects for `scene_indices` out of a parsed batch response.
+    Entries with an unknown or repeated scene_index, or without prompts, are
+    dropped, so those scenes fall back to one call each.
+    """
+    if not isinstance(parsed, list):
+        return {}
+    wanted = set(scene_indices)
+    prompts_by_index = {}
+    for entry in parsed:
+        if not isinstance(entry, dict):
+            continue
+        prompts = dict(entry)
+        scene_index = prompts.pop("scene_index", None)
+        if isinstance(scene_index, str) and scene_index.strip().isdigit():
+            scene_index = int(scene_index)
+        if scene_index in wanted and scene_index not in prompts_by_index and prompts:
+            prompts_by_index[scene_index] = prompts
+    return prompts_by_index
+
+
+def _agent_fingerprint(agent: LlmAgent) -> List[Any]:
+    """The parts of a sub-agent that shape its output: instruction, model and generation config."""
+    config = agent.generate_content_config
+    return [
+        agent.instruction if isinstance(agent.instruction, str) else agent.name,
+        str(agent.model),
+        config.model_dump(exclude_none=True) if config else None,
+    ]
+
 # --- 1. Define the Sub-Agents for Each Step ---
 
 scene_generator_agent = LlmAgent(
@@ -60,6 +168,12 @@ scene_generator_agent = LlmAgent(
 For each scene, provide a scene heading (INT./EXT. LOCATION - DAY/NIGHT), a detailed action description, and any key dialogue from the original text.
 Respond with a JSON list of scenes, where each scene is an object with 'scene_heading', 'action', and 'dialogue' keys.
 
+The text just before this passage is shown for continuity only. Do not create scenes from it.
+Preceding Text:
+---
+{previous_text}
+---
+
 Novel Text:
 ---
 {novel_text}
@@ -81,6 +195,23 @@ Respond ONLY with a single JSON object containing the prompts. Do not add any ot
     output_key="creative_prompts",
 )
 
+batch_creative_prompt_generator_agent = LlmAgent(
+    name="BatchCreativePromptGenerator",
+    model=DEFAULT_AGENT_MODEL,
+    instruction="""You are a creative director. For each of the scenes below, generate prompts for an AI to create related assets.
+Generate one prompt for each of the following: 'music', 'sound_effects', 'concept_art', and 'narration'.
+The prompts should be detailed and evocative.
+Respond ONLY with a JSON list containing one object per scene, with an integer 'scene_index' key holding the number from the scene's [Scene N] label, and the 'music', 'sound_effects', 'concept_art' and 'narration' keys. Do not add any other text, markdown, or explanations.
+
+Scenes:
+---
+{scenes}
+---
+""",
+    generate_content_config=GenerateContentConfig(max_output_tokens=8192, response_mime_type="application/json"),
+    output_key="batch_creative_prompts",
+)
+
 screenplay_assembler_agent = LlmAgent(
     name="ScreenplayAssembler",
     model=DEFAULT_AGENT_MODEL,
@@ -103,11 +234,13 @@ Scenes with Prompts:
 class ScreenplayCoordinatorV2(BaseAgent):
     """
     Custom agent for an enhanced screenplay generation workflow.
-    This agent orchestrates LLM agents to generate a screenplay, create asset
-    prompts, and assemble a final document.
+    This agent orchestrates LLM agents to generate scenes and asset prompts,
+    then renders each chapter's screenplay locally (optionally polished by the
+    LLM assembler).
     """
     scene_generator: LlmAgent
     creative_prompt_generator: LlmAgent
+    batch_creative_prompt_generator: LlmAgent
     screenplay_assembler: LlmAgent
 
     model_config = {"arbitrary_types_allowed": True}
@@ -118,16 +251,19 @@ class ScreenplayCoordinatorV2(BaseAgent):
         scene_generator: LlmAgent = scene_generator_agent,
         creative_prompt_generator: LlmAgent = creative_prompt_generator_agent,
         screenplay_assembler: LlmAgent = screenplay_assembler_agent,
+        batch_creative_prompt_generator: LlmAgent = batch_creative_prompt_generator_agent,
     ):
         sub_agents_list = [
             scene_generator,
             creative_prompt_generator,
+            batch_creative_prompt_generator,
             screenplay_assembler,
         ]
         super().__init__(
             name=name,
             scene_generator=scene_generator,
             creative_prompt_generator=creative_prompt_generator,
+            batch_creative_prompt_generator=batch_creative_prompt_generator,
             screenplay_assembler=screenplay_assembler,
             sub_agents=sub_agents_list,
         )
@@ -165,94 +301,36 @@ class ScreenplayCoordinatorV2(BaseAgent):
         for p in paragraphs:
             chapters[p["chapter_number"]].append(p["translated_text"])
 
-        # Define a chunk size for processing paragraphs to avoid hitting token limits.
-        PARAGRAPH_CHUNK_SIZE = 10
-
+        # Chapters, chunks and scenes run concurrently; the semaphore bounds the
+        # number of sub-agent (LLM) calls in flight across all of them.
+        parallelism = max(1, int(ctx.session.state.get("parallelism") or SCREENPLAY_PARALLELISM))
+        semaphore = asyncio.Semaphore(parallelism)
+        logger.info(f"[{self.name}] Generating {len(chapters)} chapter screenplay(s) with up to {parallelism} concurrent LLM calls.")
+
+        # Each stage of each chapter is checkpointed in the book's folder, and
+        # reused on later runs while its inputs are unchanged (unless forced).
+        checkpoint = open_screenplay_checkpoint(GCS_BUCKET_NAME, ctx.session.state.get("folder_name"))
+        if checkpoint and ctx.session.state.get("force"):
+            logger.info(f"[{self.name}] Forced run: ignoring existing checkpoints and regenerating every stage.")
+
+        chapter_nums = sorted(chapters.keys())
+        tasks = [
+            asyncio.create_task(self._screenplay_for_chapter(ctx, chapter_num, chapters[chapter_num], semaphore, checkpoint))
+            for chapter_num in chapter_nums
+        ]
         final_screenplays_by_chapter = {}
-        # Loop through each chapter to generate a separate screenplay
-        for chapter_num in sorted(chapters.keys()):
-            logger.info(f"[{self.name}] --- Starting screenplay for Chapter {chapter_num} ---")
-
-            # --- Generate Scenes for the current chapter in chunks ---
-            chapter_paragraphs = chapters[chapter_num]
-            scenes_for_chapter = []
-
-            for i in range(0, len(chapter_paragraphs), PARAGRAPH_CHUNK_SIZE):
-                chunk = chapter_paragraphs[i:i + PARAGRAPH_CHUNK_SIZE]
-                chunk_text = "\n\n".join(chunk)
-                logger.info(f"[{self.name}] Processing chunk {i//PARAGRAPH_CHUNK_SIZE + 1} for Chapter {chapter_num} ({len(chunk)} paragraphs)...")
-
-                scene_gen_ctx = ctx.model_copy(update={"session": ctx.session.model_copy(update={"state": {"novel_text": chunk_text}})})
-
-                async for event in self.scene_generator.run_async(scene_gen_ctx):
-                    yield event
-
-                scenes_text = ctx.session.state.pop("scenes", None)
-                scenes_from_chunk = _clean_and_parse_json(scenes_text, f"{self.name}-Chap{chapter_num}-Chunk{i//PARAGRAPH_CHUNK_SIZE + 1}")
-
-                if scenes_from_chunk:
-                    scenes_for_chapter.extend(scenes_from_chunk)
-
-            if not scenes_for_chapter:
-                logger.warning(f"[{self.name}] No scenes generated for Chapter {chapter_num}. Skipping.")
-                continue
-
-            # --- Save scene list to GCS ---
-            folder_name = ctx.session.state.get("folder_name")
-            if folder_name and GCS_BUCKET_NAME and not use_mocks:
-                scene_list_filename = f"{folder_name}/chapter_{chapter_num}_scenelist.json"
-                try:
-                    # scenes_for_chapter is a list of dicts, which is JSON serializable
-                    scene_list_json_str = json.dumps(scenes_for_chapter, indent=4)
-                    write_gcs_object(
-                        GCS_BUCKET_NAME, scene_list_filename, scene_list_json_str
-                    )
-                    logger.info(
-                        f"[{self.name}] Saved scene list for Chapter {chapter_num} to "
-                        f"gs://{GCS_BUCKET_NAME}/{scene_list_filename}"
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"[{self.name}] Failed to save scene list for Chapter {chapter_num}: {e}"
-                    )
-            # --- End save ---
-            
-            logger.info(f"[{self.name}] Generated a total of {len(scenes_for_chapter)} scenes for Chapter {chapter_num}.")
-
-            # --- Generate Creative Prompts for this chapter's scenes ---
-            scenes_with_prompts = []
-            for i, scene in enumerate(scenes_for_chapter):
-                logger.info(f"[{self.name}] Generating prompts for scene {i+1}/{len(scenes_for_chapter)} (Chapter {chapter_num})...")
-                prompt_gen_state = {"action": scene.get("action", ""), "dialogue": scene.get("dialogue", "")}
-                prompt_gen_ctx = ctx.model_copy(update={"session": ctx.session.model_copy(update={"state": prompt_gen_state})})
-
-                async for event in self.creative_prompt_generator.run_async(prompt_gen_ctx):
+        try:
+            # Await chapters in order, so their events are yielded in the same
+            # order as a sequential run, however the calls interleave.
+            for chapter_num, task in zip(chapter_nums, tasks):
+                chapter_screenplay, events = await task
+                for event in events:
                     yield event
-
-                prompts_text = ctx.session.state.pop("creative_prompts", None)
-                creative_prompts = _clean_and_parse_json(prompts_text, f"{self.name}-Chap{chapter_num}-Scene{i+1}")
-                
-                if not creative_prompts:
-                    creative_prompts = {"error": "Failed to generate or parse creative prompts."}
-                scene["creative_prompts"] = creative_prompts
-                scenes_with_prompts.append(scene)
-            
-            logger.info(f"[{self.name}] Finished generating prompts for Chapter {chapter_num}.")
-
-            # --- Assemble the Final Screenplay for this chapter ---
-            logger.info(f"[{self.name}] Assembling screenplay for Chapter {chapter_num}...")
-            assembler_state = {"scenes_with_prompts": scenes_with_prompts}
-            assembler_ctx = ctx.model_copy(update={"session": ctx.session.model_copy(update={"state": assembler_state})})
-
-            async for event in self.screenplay_assembler.run_async(assembler_ctx):
-                yield event
-
-            chapter_screenplay = ctx.session.state.pop("final_screenplay", None)
-            if chapter_screenplay:
-                final_screenplays_by_chapter[chapter_num] = chapter_screenplay
-                logger.info(f"[{self.name}] Successfully assembled screenplay for Chapter {chapter_num}.")
-            else:
-                logger.warning(f"[{self.name}] Failed to assemble screenplay for Chapter {chapter_num}.")
+                if chapter_screenplay:
+                    final_screenplays_by_chapter[chapter_num] = chapter_screenplay
+        finally:
+            for task in tasks:
+                task.cancel()
 
         # After the loop, save the dictionary of all screenplays to the main state
         ctx.session.state["chapter_screenplays"] = final_screenplays_by_chapter
@@ -265,5 +343,272 @@ class ScreenplayCoordinatorV2(BaseAgent):
             actions=EventActions(state_delta={"chapter_screenplays": final_screenplays_by_chapter}),
         )
 
+    async def _run_sub_agent(
+        self, agent: LlmAgent, ctx: InvocationContext, state: Dict[str, Any], semaphore: asyncio.Semaphore
+    ) -> Tuple[Optional[Any], List[Event]]:
+        """
+        Runs one sub-agent call in an isolated copy of the context and returns
+        its output (read from the output_key in its events' state_delta) and
+        its events. The copy sees only `state` and the user's message, so a
+        call's prompt does not depend on which other calls finished first.
+        The output is removed from the events' state_delta, so yielding them
+        later does not write per-call results into the shared session state.
+        """
+        session = ctx.session.model_copy(update={
+            "state": state,
+            "events": [e for e in ctx.session.events if e.author == "user"],
+        })
+        sub_ctx = ctx.model_copy(update={"session": session})
+        output = None
+        events = []
+        async with semaphore:
+            async for event in agent.run_async(sub_ctx):
+                if agent.output_key in event.actions.state_delta:
+                    output = event.actions.state_delta.pop(agent.output_key)
+                events.append(event)
+        return output, events
+
+    async def _load_stage(
+        self, ctx: InvocationContext, checkpoint: Optional[ScreenplayCheckpoint], chapter_num: int, stage: str, input_hash: str
+    ) -> Optional[Any]:
+        """Returns a stage's checkpointed output for these inputs, or None (always None when forced)."""
+        if not checkpoint or ctx.session.state.get("force"):
+            return None
+        try:
+            output = await asyncio.to_thread(checkpoint.load, chapter_num, stage, input_hash)
+        except Exception as e:
+            logger.warning(f"[{self.name}] Could not read the {stage} checkpoint for Chapter {chapter_num}: {e}")
+            return None
+        if output is not None:
+            logger.info(f"[{self.name}] Reusing checkpointed {stage} for Chapter {chapter_num}.")
+        return output
+
+    async def _save_stage(
+        self, checkpoint: Optional[ScreenplayCheckpoint], chapter_num: int, stage: str, input_hash: str, output: Any
+    ) -> None:
+        """Checkpoints a stage's output. Failures are logged, not raised."""
+        if not checkpoint:
+            return
+        try:
+            await asyncio.to_thread(checkpoint.save, chapter_num, stage, input_hash, output)
+        except Exception as e:
+            logger.error(f"[{self.name}] Failed to checkpoint {stage} for Chapter {chapter_num}: {e}")
+
+    async def _screenplay_for_chapter(
+        self,
+        ctx: InvocationContext,
+        chapter_num: int,
+        chapter_paragraphs: List[str],
+        semaphore: asyncio.Semaphore,
+        checkpoint: Optional[ScreenplayCheckpoint] = None,
+    ) -> Tuple[Optional[str], List[Event]]:
+        """
+        Generates one chapter's scenes, creative prompts and screenplay, reusing
+        any stage checkpointed for the same inputs. Returns the screenplay (or
+        None) and the sub-agent events in workflow order.
+        """
+        logger.info(f"[{self.name}] --- Starting screenplay for Chapter {chapter_num} ---")
+        events = []
+
+        # --- Generate Scenes for the current chapter in token-budgeted chunks ---
+        scenes_hash = stage_input_hash(
+            SCENES_STAGE, chapter_paragraphs, _agent_fingerprint(self.scene_generator),
+            SCREENPLAY_CHUNK_TOKENS, SCREENPLAY_CHUNK_OVERLAP_TOKENS,
+        )
+        scenes_for_chapter = await self._load_stage(ctx, checkpoint, chapter_num, SCENES_STAGE, scenes_hash)
+        if scenes_for_chapter is None:
+            scenes_for_chapter, scene_events, complete = await self._generate_scenes(ctx, chapter_num, chapter_paragraphs, semaphore)
+            events.extend(scene_events)
+            if not scenes_for_chapter:
+                logger.warning(f"[{self.name}] No scenes generated for Chapter {chapter_num}. Skipping.")
+                return None, events
+            # A chunk whose scenes failed to parse leaves a gap, so an
+            # incomplete scene list is not checkpointed and is retried next run.
+            if complete:
+                await self._save_stage(checkpoint, chapter_num, SCENES_STAGE, scenes_hash, scenes_for_chapter)
+            await asyncio.to_thread(self._save_scene_list, ctx, chapter_num, scenes_for_chapter)
+
+        logger.info(f"[{self.name}] Generated a total of {len(scenes_for_chapter)} scenes for Chapter {chapter_num}.")
+
+        # --- Generate Creative Prompts for this chapter's scenes ---
+        prompts_hash = stage_input_hash(
+            PROMPTS_STAGE, scenes_for_chapter,
+            _agent_fingerprint(self.batch_creative_prompt_generator), _agent_fingerprint(self.creative_prompt_generator),
+        )
+        prompts_list = await self._load_stage(ctx, checkpoint, chapter_num, PROMPTS_STAGE, prompts_hash)
+        if prompts_list is not None:
+            prompts_by_index = {i: prompts for i, prompts in enumerate(prompts_list, start=1)}
+        else:
+            prompts_by_index, prompt_events = await self._creative_prompts_for_scenes(ctx, chapter_num, scenes_for_chapter, semaphore)
+            events.extend(prompt_events)
+            # Only a full set is checkpointed, so scenes that failed are retried next run.
+            if len(prompts_by_index) == len(scenes_for_chapter):
+                await self._save_stage(
+                    checkpoint, chapter_num, PROMPTS_STAGE, prompts_hash,
+                    [prompts_by_index[i] for i in range(1, len(scenes_for_chapter) + 1)],
+                )
+
+        scenes_with_prompts = []
+        for scene_index, scene in enumerate(scenes_for_chapter, start=1):
+            scene["creative_prompts"] = prompts_by_index.get(scene_index) or {"error": "Failed to generate or parse creative prompts."}
+            scenes_with_prompts.append(scene)
+
+        logger.info(f"[{self.name}] Finished generating prompts for Chapter {chapter_num}.")
+
+        # --- Assemble the Final Screenplay for this chapter ---
+        # The screenplay is rendered locally from the structured scenes. The
+        # ScreenplayAssembler agent only runs in the optional polish mode, and
+        # the rendered screenplay is kept if it fails. Rendering is free, so
+        # only a polished screenplay is checkpointed.
+        chapter_screenplay = render_screenplay(scenes_with_prompts)
+        polish = ctx.session.state.get("polish")
+        if polish is None:
+            polish = SCREENPLAY_LLM_POLISH
+        if polish:
+            screenplay_hash = stage_input_hash(SCREENPLAY_STAGE, scenes_with_prompts, _agent_fingerprint(self.screenplay_assembler))
+            polished_screenplay = await self._load_stage(ctx, checkpoint, chapter_num, SCREENPLAY_STAGE, screenplay_hash)
+            if polished_screenplay is None:
+                logger.info(f"[{self.name}] Polishing screenplay for Chapter {chapter_num} with the LLM assembler...")
+                polished_screenplay, assembler_events = await self._run_sub_agent(
+                    self.screenplay_assembler, ctx, {"scenes_with_prompts": scenes_with_prompts}, semaphore
+                )
+                events.extend(assembler_events)
+                if polished_screenplay:
+                    await self._save_stage(checkpoint, chapter_num, SCREENPLAY_STAGE, screenplay_hash, polished_screenplay)
+            if polished_screenplay:
+                chapter_screenplay = polished_screenplay
+            else:
+                logger.warning(f"[{self.name}] LLM polish failed for Chapter {chapter_num}; keeping the rendered screenplay.")
+
+        logger.info(f"[{self.name}] Successfully assembled screenplay for Chapter {chapter_num} ({len(scenes_with_prompts)} scenes).")
+        return chapter_screenplay, events
+
+    async def _generate_scenes(
+        self, ctx: InvocationContext, chapter_num: int, chapter_paragraphs: List[str], semaphore: asyncio.Semaphore
+    ) -> Tuple[List[dict], List[Event], bool]:
+        """
+        Generates a chapter's scenes from token-budgeted chunks. Returns the
+        scenes, the sub-agent events, and whether every chunk's scenes parsed.
+        """
+        chunks = pack_chapter_chunks(chapter_paragraphs)
+        logger.info(f"[{self.name}] Generating scenes for Chapter {chapter_num} from {len(chunks)} chunk(s) (~{sum(estimate_tokens(c) for c, _ in chunks)} tokens)...")
+        chunk_results = await asyncio.gather(*(
+            self._run_sub_agent(
+                self.scene_generator, ctx,
+                {"novel_text": chunk_text, "previous_text": previous_text or "(start of chapter)"},
+                semaphore,
+            )
+            for chunk_text, previous_text in chunks
+        ))
+
+        events = []
+        scenes_for_chapter = []
+        complete = True
+        for chunk_num, (scenes_text, chunk_events) in enumerate(chunk_results, start=1):
+            events.extend(chunk_events)
+            scenes_from_chunk = _clean_and_parse_json(scenes_text, f"{self.name}-Chap{chapter_num}-Chunk{chunk_num}")
+            if isinstance(scenes_from_chunk, list):
+                scenes_for_chapter.extend(scenes_from_chunk)
+            else:
+                complete = False
+        return scenes_for_chapter, events, complete
+
+    def _save_scene_list(self, ctx: InvocationContext, chapter_num: int, scenes_for_chapter: List[dict]) -> None:
+        """Writes a chapter's scene list to chapter_N_scenelist.json in the book's folder. Blocking."""
+        folder_name = ctx.session.state.get("folder_name")
+        if folder_name and GCS_BUCKET_NAME:
+            scene_list_filename = f"{folder_name}/chapter_{chapter_num}_scenelist.json"
+            try:
+                # scenes_for_chapter is a list of dicts, which is JSON serializable
+                scene_list_json_str = json.dumps(scenes_for_chapter, indent=4)
+                write_gcs_object(GCS_BUCKET_NAME, scene_list_filename, scene_list_json_str)
+                logger.info(
+                    f"[{self.name}] Saved scene list for Chapter {chapter_num} to "
+                    f"gs://{GCS_BUCKET_NAME}/{scene_list_filename}"
+                )
+            except Exception as e:
+                logger.error(
+                    f"[{self.name}] Failed to save scene list for Chapter {chapter_num}: {e}"
+                )
+
+    def _prompt_batch_max_scenes(self) -> int:
+        """
+        The most scenes one batched prompt call can answer: the batch agent's
+        output-token limit over the expected output per scene, capped by
+        SCREENPLAY_PROMPT_BATCH_MAX_SCENES.
+        """
+        config = self.batch_creative_prompt_generator.generate_content_config
+        max_output_tokens = config.max_output_tokens if config else None
+        max_scenes = SCREENPLAY_PROMPT_BATCH_MAX_SCENES
+        if max_output_tokens and SCREENPLAY_PROMPT_OUTPUT_TOKENS_PER_SCENE > 0:
+            max_scenes = min(max_scenes, max_output_tokens // SCREENPLAY_PROMPT_OUTPUT_TOKENS_PER_SCENE)
+        return max(1, max_scenes)
+
+    async def _creative_prompts_for_scenes(
+        self, ctx: InvocationContext, chapter_num: int, scenes: List[dict], semaphore: asyncio.Semaphore
+    ) -> Tuple[Dict[int, dict], List[Event]]:
+        """
+        Generates creative prompts for a chapter's scenes, keyed by 1-based scene
+        index. Scenes are sent in batches sized by both their input tokens and
+        the output each scene's prompts are expected to take; scenes a batch did
+        not return valid prompts for are retried with one call each.
+        """
+        events = []
+        prompts_by_index: Dict[int, dict] = {}
+        scene_indices = list(range(1, len(scenes) + 1))
+
+        batches = []
+        max_scenes = self._prompt_batch_max_scenes()
+        if SCREENPLAY_PROMPT_BATCH_TOKENS > 0 and max_scenes > 1 and len(scenes) > 1:
+            batches = pack_by_tokens(
+                scene_indices,
+                SCREENPLAY_PROMPT_BATCH_TOKENS,
+                text=lambda i: _scene_prompt_text(i, scenes[i - 1]),
+                max_items=max_scenes,
+            )
+        if batches:
+            logger.info(f"[{self.name}] Generating prompts for {len(scenes)} scenes in {len(batches)} batch(es) (Chapter {chapter_num})...")
+            batch_results = await asyncio.gather(*(
+                self._run_sub_agent(
+                    self.batch_creative_prompt_generator, ctx,
+                    {"scenes": "\n\n".join(_scene_prompt_text(i, scenes[i - 1]) for i in batch)},
+                    semaphore,
+                )
+                for batch in batches
+            ))
+            for batch, (batch_text, batch_events) in zip(batches, batch_results):
+                events.extend(batch_events)
+                log_context = f"{self.name}-Chap{chapter_num}-Scenes{batch[0]}-{batch[-1]}"
+                parsed = _clean_and_parse_json(batch_text, log_context)
+                if parsed is None:
+                    # Usually a response cut off at the output limit: keep the scenes it finished.
+                    parsed = _parse_complete_array_items(batch_text)
+                    if parsed:
+                        logger.warning(f"[{log_context}] Recovered {len(parsed)} complete scene(s) from a truncated batch response.")
+                prompts_by_index.update(_batch_prompts_by_index(parsed, batch))
+
+        missing = [i for i in scene_indices if i not in prompts_by_index]
+        if missing:
+            if batches:
+                logger.warning(f"[{self.name}] Batched prompts missed {len(missing)} of {len(scenes)} scenes in Chapter {chapter_num}; generating them one at a time.")
+            else:
+                logger.info(f"[{self.name}] Generating prompts for {len(scenes)} scenes (Chapter {chapter_num})...")
+            scene_results = await asyncio.gather(*(
+                self._run_sub_agent(
+                    self.creative_prompt_generator, ctx,
+                    {"action": scenes[i - 1].get("action", ""), "dialogue": scenes[i - 1].get("dialogue", "")},
+                    semaphore,
+                )
+                for i in missing
+            ))
+            for i, (prompts_text, scene_events) in zip(missing, scene_results):
+                events.extend(scene_events)
+                creative_prompts = _clean_and_parse_json(prompts_text, f"{self.name}-Chap{chapter_num}-Scene{i}")
+                if creative_prompts:
+                    prompts_by_index[i] = creative_prompts
+
+        logger.info(f"[{self.name}] Creative prompts for Chapter {chapter_num}: {len(batches) + len(missing)} call(s) for {len(scenes)} scenes.")
+        return prompts_by_index, events
+
 # --- 3. Create a default instance of the coordinator ---
 screenplay_coordinator_v2 = ScreenplayCoordinatorV2()
\ No newline at end of file
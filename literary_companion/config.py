@@ -23,4 +23,153 @@ GCS_FILE_NAME = os.environ.get("GCS_FILE_NAME")
 # Sourced from environment variables with defaults for local setup.
 REDIS_HOST = os.environ.get("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
+# Redis is a cache, so an unreachable or stalled server must fail fast rather
+# than hold up the requests that use it.
+REDIS_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("REDIS_CONNECT_TIMEOUT_SECONDS", 1.0))
+REDIS_SOCKET_TIMEOUT_SECONDS = float(os.environ.get("REDIS_SOCKET_TIMEOUT_SECONDS", 2.0))
 
+
+# In-process cache of parsed prepared books, shared by all request threads. It
+# holds one entry per chapter as well as manifests, metadata, chapter bodies and
+# screenplays, so it is bounded by the estimated memory of its entries (see
+# parsed_book.estimate_memory_bytes), not the size of the source JSON. An entry
+# count limit is optional; 0 (the default) leaves BOOK_CACHE_MAX_BYTES as the only bound.
+BOOK_CACHE_MAX_ENTRIES = int(os.environ.get("BOOK_CACHE_MAX_ENTRIES", 0))
+BOOK_CACHE_MAX_BYTES = int(os.environ.get("BOOK_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+BOOK_CACHE_TTL_SECONDS = int(os.environ.get("BOOK_CACHE_TTL_SECONDS", 3600))
+
+# Cache-Control max-age for the compact book metadata. Responses also carry a
+# strong ETag, so browsers revalidate cheaply with a 304 once this expires.
+METADATA_CACHE_MAX_AGE_SECONDS = int(os.environ.get("METADATA_CACHE_MAX_AGE_SECONDS", 300))
+
+# How prepared books are stored in Redis:
+#   "hash"   - one Redis hash per book with a compressed field per chapter (default)
+#   "string" - the legacy mode, the whole prepared JSON under a single key
+REDIS_BOOK_STORAGE = os.environ.get("REDIS_BOOK_STORAGE", "hash")
+REDIS_BOOK_TTL_SECONDS = int(os.environ.get("REDIS_BOOK_TTL_SECONDS", 3600))
+# By default a book expires REDIS_BOOK_TTL_SECONDS after it was loaded, which
+# bounds how long a re-prepared book takes to reach readers. With a sliding
+# expiry, every read pushes the expiry out by the full TTL instead, so a book
+# that is read steadily is never reloaded until it is invalidated.
+REDIS_BOOK_SLIDING_EXPIRY = os.environ.get("REDIS_BOOK_SLIDING_EXPIRY", "false").lower() in ("1", "true", "yes")
+# "zlib" (default), "zstd" (requires the zstandard package) or "none".
+REDIS_BOOK_COMPRESSION = os.environ.get("REDIS_BOOK_COMPRESSION", "zlib")
+REDIS_BOOK_COMPRESSION_LEVEL = int(os.environ.get("REDIS_BOOK_COMPRESSION_LEVEL", 6))
+
+# HTTP response compression and validators for the book, chapter and screenplay
+# endpoints. "br" is only used when the brotli package is installed.
+HTTP_COMPRESSION_ENABLED = os.environ.get("HTTP_COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+HTTP_COMPRESSION_ENCODINGS = [
+    e.strip() for e in os.environ.get("HTTP_COMPRESSION_ENCODINGS", "br,gzip").split(",") if e.strip()
+]
+HTTP_COMPRESSION_LEVEL = int(os.environ.get("HTTP_COMPRESSION_LEVEL", 6))
+HTTP_COMPRESSION_MIN_BYTES = int(os.environ.get("HTTP_COMPRESSION_MIN_BYTES", 1024))
+HTTP_ETAGS_ENABLED = os.environ.get("HTTP_ETAGS_ENABLED", "true").lower() in ("1", "true", "yes")
+CHAPTER_CACHE_MAX_AGE_SECONDS = int(os.environ.get("CHAPTER_CACHE_MAX_AGE_SECONDS", 300))
+SCREENPLAY_CACHE_MAX_AGE_SECONDS = int(os.environ.get("SCREENPLAY_CACHE_MAX_AGE_SECONDS", 60))
+# How long a screenplay stays in the in-process cache before its GCS generation is re-read.
+SCREENPLAY_CACHE_TTL_SECONDS = int(os.environ.get("SCREENPLAY_CACHE_TTL_SECONDS", 300))
+
+# Multi-chapter NDJSON streaming for the reader: the most chapters one request
+# may ask for, and how many paragraphs go on each streamed line.
+STREAM_MAX_CHAPTERS = int(os.environ.get("STREAM_MAX_CHAPTERS", 10))
+STREAM_PARAGRAPHS_PER_LINE = int(os.environ.get("STREAM_PARAGRAPHS_PER_LINE", 25))
+
+# Comma-separated book names (e.g. "moby_dick.txt") to load into the in-process
+# book cache at import time, so each worker serves them without a cold GCS read.
+PRELOAD_BOOKS = [b.strip() for b in os.environ.get("PRELOAD_BOOKS", "").split(",") if b.strip()]
+
+# Bounds for the in-memory ADK session store used by the fun-fact runner.
+# Sessions are deleted once a run completes; these limits catch anything left
+# behind by failed or abandoned runs, evicting the least recently used first.
+SESSION_MAX_ENTRIES = int(os.environ.get("SESSION_MAX_ENTRIES", 1000))
+SESSION_MAX_BYTES = int(os.environ.get("SESSION_MAX_BYTES", 64 * 1024 * 1024))
+SESSION_IDLE_TTL_SECONDS = int(os.environ.get("SESSION_IDLE_TTL_SECONDS", 600))
+
+# Concurrent fun-fact requests for the same chapter are always coalesced within
+# a process. With FUN_FACT_REDIS_LOCK enabled they are also coordinated across
+# instances: one holds a Redis lease while generating, the others poll the GCS
+# cache for its result, generating themselves only if the lease times out.
+FUN_FACT_REDIS_LOCK = os.environ.get("FUN_FACT_REDIS_LOCK", "false").lower() in ("1", "true", "yes")
+FUN_FACT_LOCK_TTL_SECONDS = int(os.environ.get("FUN_FACT_LOCK_TTL_SECONDS", 120))
+FUN_FACT_LOCK_POLL_SECONDS = float(os.environ.get("FUN_FACT_LOCK_POLL_SECONDS", 1.0))
+
+# Tiered fun-fact cache: process memory, then Redis, then GCS. While a chapter
+# is generating, lookups for it are answered by a short-lived negative entry.
+FUN_FACT_CACHE_MAX_ENTRIES = int(os.environ.get("FUN_FACT_CACHE_MAX_ENTRIES", 1024))
+FUN_FACT_CACHE_TTL_SECONDS = int(os.environ.get("FUN_FACT_CACHE_TTL_SECONDS", 3600))
+FUN_FACT_REDIS_TTL_SECONDS = int(os.environ.get("FUN_FACT_REDIS_TTL_SECONDS", 86400))
+FUN_FACT_NEGATIVE_TTL_SECONDS = float(os.environ.get("FUN_FACT_NEGATIVE_TTL_SECONDS", 5))
+
+# Chapters whose fun facts are generated at once during bulk pre-generation.
+# Each chapter runs all of its generators in parallel.
+FUN_FACT_PREGEN_CONCURRENCY = int(os.environ.get("FUN_FACT_PREGEN_CONCURRENCY", 4))
+
+# Per-call timeout for direct model calls made through lib/model_client.py.
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", 120))
+# Book preparation reads the source in ranged chunks of this many bytes and
+# translates at most this many chapters at once, so memory stays flat however
+# large the source is.
+PREP_SOURCE_CHUNK_BYTES = int(os.environ.get("PREP_SOURCE_CHUNK_BYTES", 1024 * 1024))
+PREP_CHAPTERS_IN_FLIGHT = int(os.environ.get("PREP_CHAPTERS_IN_FLIGHT", 8))
+# The prepared file is streamed to GCS in a resumable upload while chapters are
+# translated, in chunks of this many bytes (a multiple of 256 KiB), and
+# optionally stored gzip-encoded.
+PREPARED_OUTPUT_CHUNK_BYTES = int(os.environ.get("PREPARED_OUTPUT_CHUNK_BYTES", 8 * 1024 * 1024))
+PREPARED_OUTPUT_GZIP = os.environ.get("PREPARED_OUTPUT_GZIP", "false").lower() in ("1", "true", "yes")
+# How many translation batches (see TRANSLATION_BATCH_TOKENS below) book
+# preparation runs at once, each one model call of up to
+# TRANSLATION_BATCH_MAX_PARAGRAPHS paragraphs, or of one paragraph when batching
+# is off. A batch that falls back to one call per paragraph makes those calls
+# at once within its single slot. The LLM governor below decides how many calls
+# actually reach the model.
+TRANSLATION_CONCURRENCY = int(os.environ.get("TRANSLATION_CONCURRENCY", 64))
+# Batched translation packs consecutive paragraphs of a chapter into one model
+# call, up to this many estimated input tokens and paragraphs. 0 tokens
+# translates one paragraph per call.
+TRANSLATION_BATCH_TOKENS = int(os.environ.get("TRANSLATION_BATCH_TOKENS", 2000))
+TRANSLATION_BATCH_MAX_PARAGRAPHS = int(os.environ.get("TRANSLATION_BATCH_MAX_PARAGRAPHS", 40))
+# The translation memo (lib/translation_memo.py) reuses earlier translations of
+# identical paragraphs. It lives in TRANSLATION_MEMO_BUCKET, or in the book's
+# own bucket when that is unset, with an optional local SQLite file in front.
+TRANSLATION_MEMO_ENABLED = os.environ.get("TRANSLATION_MEMO_ENABLED", "true").lower() in ("1", "true", "yes")
+TRANSLATION_MEMO_BUCKET = os.environ.get("TRANSLATION_MEMO_BUCKET", "")
+TRANSLATION_MEMO_SQLITE_PATH = os.environ.get("TRANSLATION_MEMO_SQLITE_PATH", "")
+
+# The LLM governor (lib/llm_governor.py) shared by all direct model calls.
+# Requests and tokens per minute should match the project's quota; 0 disables that limit.
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get("LLM_REQUESTS_PER_MINUTE", 0))
+LLM_TOKENS_PER_MINUTE = float(os.environ.get("LLM_TOKENS_PER_MINUTE", 0))
+# Concurrent model calls start at the initial value and adapt between min and max.
+LLM_INITIAL_CONCURRENCY = int(os.environ.get("LLM_INITIAL_CONCURRENCY", 8))
+LLM_MIN_CONCURRENCY = int(os.environ.get("LLM_MIN_CONCURRENCY", 1))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 64))
+# Retries for quota and transient errors, with jittered exponential backoff.
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 5))
+LLM_RETRY_BASE_SECONDS = float(os.environ.get("LLM_RETRY_BASE_SECONDS", 1.0))
+LLM_RETRY_MAX_SECONDS = float(os.environ.get("LLM_RETRY_MAX_SECONDS", 30.0))
+# Retries allowed per request, on average, so an outage is not amplified by retries.
+LLM_RETRY_BUDGET_RATIO = float(os.environ.get("LLM_RETRY_BUDGET_RATIO", 0.2))
+
+# Screenplay generation (ScreenplayCoordinatorV2) packs each chapter's paragraphs
+# into chunks of about this many estimated tokens for one scene-generation call,
+# sized so the scene list fits in the call's 8192 output tokens. Each chunk after
+# the first is preceded by up to SCREENPLAY_CHUNK_OVERLAP_TOKENS of the text
+# before it, for continuity.
+SCREENPLAY_CHUNK_TOKENS = int(os.environ.get("SCREENPLAY_CHUNK_TOKENS", 3000))
+SCREENPLAY_CHUNK_OVERLAP_TOKENS = int(os.environ.get("SCREENPLAY_CHUNK_OVERLAP_TOKENS", 200))
+# Maximum number of concurrent LLM calls while generating screenplays. Chapters,
+# chunks and per-scene creative prompts all share this limit.
+SCREENPLAY_PARALLELISM = int(os.environ.get("SCREENPLAY_PARALLELISM", 8))
+# Creative prompts for a chapter's scenes are generated in batches of up to this
+# many estimated input tokens and scenes per call. The output is the binding
+# limit: each scene's four prompts take about SCREENPLAY_PROMPT_OUTPUT_TOKENS_PER_SCENE
+# tokens, so a batch never holds more scenes than fit in the call's 8192 output
+# tokens at that rate (5). Scenes missing from a batch's output are retried one
+# per call. 0 tokens generates one scene per call.
+SCREENPLAY_PROMPT_BATCH_TOKENS = int(os.environ.get("SCREENPLAY_PROMPT_BATCH_TOKENS", 2000))
+SCREENPLAY_PROMPT_BATCH_MAX_SCENES = int(os.environ.get("SCREENPLAY_PROMPT_BATCH_MAX_SCENES", 5))
+SCREENPLAY_PROMPT_OUTPUT_TOKENS_PER_SCENE = int(os.environ.get("SCREENPLAY_PROMPT_OUTPUT_TOKENS_PER_SCENE", 1500))
+# Chapter screenplays are rendered locally from the generated scenes. Set this to
+# also run the LLM ScreenplayAssembler over them as a "polish" pass.
+SCREENPLAY_LLM_POLISH = os.environ.get("SCREENPLAY_LLM_POLISH", "false").lower() in ("1", "true", "yes")
@@ -0,0 +1,73 @@
+# literary_companion/lib/book_segmenter.py
+#
+# Incremental segmentation of a book's source text into paragraphs. Text is fed
+# in arbitrary chunks (e.g. ranged reads of a GCS object) and paragraph records
+# come out as soon as the blank line ending them has been seen, so
+# translation can start long before the whole book is read, and memory holds
+# only the unfinished tail of the text.
+
+import re
+from typing import Iterable, Iterator, List
+
+# Paragraphs are separated by one or more blank lines.
+PARAGRAPH_SEPARATOR = re.compile(r'(?:\r\n|\n){2,}')
+# This regex is case-insensitive and looks for "CHAPTER" followed by a space and a number/roman numeral.
+CHAPTER_PATTERN = re.compile(r'^CHAPTER\s+[\w.]+', re.IGNORECASE)
+
+
+class ParagraphSegmenter:
+    """
+    Turns a stream of text chunks into paragraph records:
+    {"text", "total_id", "chapter", "para_in_chapter"}. Chapter headings start a
+    new chapter and are not emitted themselves. Paragraphs before the first
+    heading belong to chapter 0.
+    """
+
+    def __init__(self, chapter_pattern: "re.Pattern" = CHAPTER_PATTERN):
+        self.chapter_pattern = chapter_pattern
+        self.chapter_number = 0
+        self.paragraph_in_chapter = 0
+        self.total_paragraphs = 0
+        self._tail = ""
+
+    def feed(self, chunk: str) -> List[dict]:
+        """Adds a chunk of text and returns the paragraphs it completed."""
+        blocks = PARAGRAPH_SEPARATOR.split(self._tail + chunk)
+        # The last block may continue in the next chunk.
+        self._tail = blocks.pop()
+        return self._records(blocks)
+
+    def finish(self) -> List[dict]:
+        """Returns the final paragraph, if any, once the whole text has been fed."""
+        blocks, self._tail = [self._tail], ""
+        return self._records(blocks)
+
+    def _records(self, blocks: List[str]) -> List[dict]:
+        records = []
+        for p_block in blocks:
+            clean_block = p_block.strip()
+            if not clean_block:
+                continue  # Skip empty blocks
+
+            if self.chapter_pattern.match(clean_block):
+                self.chapter_number += 1
+                self.paragraph_in_chapter = 0
+                # We don't add the chapter title itself as a paragraph to translate
+            else:
+                self.paragraph_in_chapter += 1
+                self.total_paragraphs += 1
+                records.append({
+                    "text": clean_block.replace('\n', ' ').replace('\r', ' '),
+                    "total_id": self.total_paragraphs,
+                    "chapter": self.chapter_number,
+                    "para_in_chapter": self.paragraph_in_chapter,
+                })
+        return records
+
+
+def segment_paragraphs(chunks: Iterable[str]) -> Iterator[dict]:
+    """Yields the paragraph records of a text given as an iterable of chunks."""
+    segmenter = ParagraphSegmenter()
+    for chunk in chunks:
+        yield from segmenter.feed(chunk)
+    yield from segmenter.finish()
@@ -0,0 +1,150 @@
+# literary_companion/lib/bounded_session_service.py
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+
+
+def _estimate_bytes(value: Any) -> int:
+    """A cheap approximation of how much memory a JSON-like value retains."""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+class BoundedSessionService(InMemorySessionService):
+    """
+    An InMemorySessionService with a maximum session count, a retained-byte
+    budget and idle TTL eviction. The least recently used sessions are evicted
+    first. All operations are serialized with a lock, since the base class is
+    not safe to use from several request threads at once.
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 64 * 1024 * 1024, idle_ttl_seconds: float = 600):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        # (app_name, user_id, session_id) -> [last_access, retained_bytes], least recently used first.
+        self._usage: "OrderedDict[Tuple[str, str, str], list]" = OrderedDict()
+        self._retained_bytes = 0
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        with self._lock:
+            self._expire_idle()
+            session = super().create_session(
+                app_name=app_name, user_id=user_id, state=state, session_id=session_id
+            )
+            key = (app_name, user_id, session.id)
+            self._forget(key)
+            size = _estimate_bytes(state or {})
+            self._usage[key] = [time.monotonic(), size]
+            self._retained_bytes += size
+            self._enforce_bounds(keep=key)
+            return session
+
+    def get_session(self, *, app_name: str, user_id: str, session_id: str, config=None) -> Session:
+        with self._lock:
+            key = (app_name, user_id, session_id)
+            if self._is_expired(key):
+                self._evict(key)
+                self.expirations += 1
+                return None
+            session = super().get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id, config=config
+            )
+            if session is not None and key in self._usage:
+                self._touch(key)
+            return session
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        with self._lock:
+            event = super().append_event(session=session, event=event)
+            key = (session.app_name, session.user_id, session.id)
+            if key in self._usage:
+                size = len(event.model_dump_json(exclude_none=True))
+                self._usage[key][1] += size
+                self._retained_bytes += size
+                self._touch(key)
+                self._enforce_bounds(keep=key)
+            return event
+
+    def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        with self._lock:
+            self._forget((app_name, user_id, session_id))
+            # Pop directly rather than via the base class, which deep-copies the
+            # session just to check that it exists.
+            user_sessions = self.sessions.get(app_name, {}).get(user_id)
+            if user_sessions is None:
+                return
+            user_sessions.pop(session_id, None)
+            # Drop the per-user map once it is empty, so idle readers leave nothing behind.
+            if not user_sessions:
+                del self.sessions[app_name][user_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Gauges for live sessions and retained bytes, plus eviction counters."""
+        with self._lock:
+            self._expire_idle()
+            return {
+                "live_sessions": len(self._usage),
+                "retained_bytes": self._retained_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    # --- Internal bookkeeping; callers hold the lock. ---
+
+    def _touch(self, key) -> None:
+        self._usage[key][0] = time.monotonic()
+        self._usage.move_to_end(key)
+
+    def _is_expired(self, key) -> bool:
+        usage = self._usage.get(key)
+        return bool(
+            usage and self.idle_ttl_seconds and time.monotonic() - usage[0] > self.idle_ttl_seconds
+        )
+
+    def _expire_idle(self) -> None:
+        # The usage map is in access order, so expired sessions are at the front.
+        while self._usage:
+            key = next(iter(self._usage))
+            if not self._is_expired(key):
+                break
+            self._evict(key)
+            self.expirations += 1
+
+    def _enforce_bounds(self, keep) -> None:
+        while len(self._usage) > 1 and (
+            len(self._usage) > self.max_sessions or self._retained_bytes > self.max_bytes
+        ):
+            key = next(iter(self._usage))
+            if key == keep:
+                break
+            self._evict(key)
+            self.evictions += 1
+
+    def _evict(self, key) -> None:
+        app_name, user_id, session_id = key
+        self.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def _forget(self, key) -> None:
+        usage = self._usage.pop(key, None)
+        if usage:
+            self._retained_bytes -= usage[1]
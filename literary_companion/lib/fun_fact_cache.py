@@ -0,0 +1,138 @@
+# literary_companion/lib/fun_fact_cache.py
+#
+# A read-through cache for generated fun facts, keyed by their GCS object path:
+# an in-process LRU, then Redis (shared by instances), then GCS (the durable
+# copy). Hits in a lower tier are copied into the tiers above it.
+#
+# While a chapter is being generated its key holds a short-lived negative
+# entry, so repeated lookups during generation skip the slower tiers instead of
+# paying a GCS miss each time.
+
+import json
+import logging
+from typing import Dict, Optional
+
+import redis
+
+from literary_companion.lib.lru_cache import LRUCache
+from literary_companion.lib.redis_client import get_redis_client
+from literary_companion.tools.gcs_tool import read_gcs_object_if_exists, write_gcs_object
+
+# Stored in place of the facts while a generation is in flight.
+GENERATING = "__generating__"
+
+
+class FunFactCache:
+    """Tiered fun-fact storage: process memory, then Redis, then GCS."""
+
+    def __init__(
+        self,
+        bucket_name: str,
+        max_entries: int = 1024,
+        local_ttl_seconds: float = 3600,
+        redis_ttl_seconds: int = 86400,
+        negative_ttl_seconds: float = 5,
+    ):
+        self.bucket_name = bucket_name
+        self.local = LRUCache(max_entries=max_entries, ttl_seconds=local_ttl_seconds)
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+
+    @staticmethod
+    def redis_key(cache_path: str) -> str:
+        return f"funfacts:{cache_path}"
+
+    def get_local(self, cache_path: str) -> Optional[Dict]:
+        """Returns the fun facts for `cache_path` from process memory only, without blocking on I/O."""
+        value = self.local.get(cache_path)
+        return None if value == GENERATING else value
+
+    def get(self, cache_path: str, trust_negative: bool = True) -> Optional[Dict]:
+        """
+        Returns the cached fun facts for `cache_path`, or None on a miss. With
+        `trust_negative` False, a local negative entry does not short-circuit
+        the lookup, e.g. for a final check just before generating.
+        """
+        value = self.local.get(cache_path)
+        if value == GENERATING and trust_negative:
+            return None
+        if value is not None and value != GENERATING:
+            return value
+
+        client = get_redis_client()
+        if client is not None:
+            try:
+                cached = client.get(self.redis_key(cache_path))
+            except redis.exceptions.RedisError as e:
+                logging.warning(f"Redis GET failed for fun facts '{cache_path}': {e}")
+                cached = None
+            if cached == GENERATING:
+                self.local.put(cache_path, GENERATING, ttl_seconds=self.negative_ttl_seconds)
+                return None
+            if cached is not None:
+                results = json.loads(cached)
+                self.local.put(cache_path, results)
+                return results
+
+        cached = read_gcs_object_if_exists(self.bucket_name, cache_path)
+        if cached is None:
+            return None
+        results = json.loads(cached)
+        self.local.put(cache_path, results)
+        self._redis_set(cache_path, cached, self.redis_ttl_seconds)
+        return results
+
+    def put(self, cache_path: str, results: Dict) -> str:
+        """
+        Writes `results` through every tier. Returns the GCS write status message.
+        If the GCS write fails, the facts are only kept locally for the short
+        negative TTL and never reach Redis, so other instances do not serve
+        facts that were never stored durably.
+        """
+        content = json.dumps(results, indent=4)
+        status = write_gcs_object(self.bucket_name, cache_path, content)
+        if status.startswith("Error"):
+            logging.warning(f"Fun facts for '{cache_path}' were not saved to GCS; caching them only briefly. {status}")
+            self.local.put(cache_path, results, ttl_seconds=self.negative_ttl_seconds)
+            return status
+        self.local.put(cache_path, results)
+        self._redis_set(cache_path, content, self.redis_ttl_seconds)
+        return status
+
+    def mark_generating(self, cache_path: str) -> None:
+        """Records a short-lived negative entry while `cache_path` is being generated."""
+        self.local.put(cache_path, GENERATING, ttl_seconds=self.negative_ttl_seconds)
+        client = get_redis_client()
+        if client is None:
+            return
+        try:
+            # NX, so a negative entry never replaces facts another instance just wrote.
+            client.set(self.redis_key(cache_path), GENERATING, ex=max(1, int(self.negative_ttl_seconds)), nx=True)
+        except redis.exceptions.RedisError as e:
+            logging.warning(f"Redis SET failed for fun facts '{cache_path}': {e}")
+
+    def clear_generating(self, cache_path: str) -> None:
+        """Drops the negative entry for `cache_path`, e.g. after a failed generation."""
+        if self.local.get(cache_path) == GENERATING:
+            self.local.invalidate(cache_path)
+        client = get_redis_client()
+        if client is None:
+            return
+        try:
+            key = self.redis_key(cache_path)
+            if client.get(key) == GENERATING:
+                client.delete(key)
+        except redis.exceptions.RedisError as e:
+            logging.warning(f"Redis DELETE failed for fun facts '{cache_path}': {e}")
+
+    def _redis_set(self, cache_path: str, content: str, ttl_seconds: int) -> None:
+        client = get_redis_client()
+        if client is None:
+            return
+        try:
+            client.set(self.redis_key(cache_path), content, ex=ttl_seconds or None)
+        except redis.exceptions.RedisError as e:
+            logging.warning(f"Redis SET failed for fun facts '{cache_path}': {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return self.local.stats()
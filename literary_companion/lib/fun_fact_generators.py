@@ -1,70 +1,80 @@
 # literary_companion/lib/fun_fact_generators.py
 
-from vertexai.generative_models import GenerativeModel
-from literary_companion.config import DEFAULT_AGENT_MODEL
+from literary_companion.lib.model_client import generate_text_async
 
+# Part of every fun-fact cache key. Instruction edits already change the keys
+# of their own fact type; bump this to regenerate every type, e.g. after
+# changing the prompt template in _generate_fact.
+PROMPT_VERSION = "1"
 
-def _generate_fact(instruction: str, text: str) -> dict:
+
+async def _generate_fact(instruction: str, text: str) -> dict:
     """A helper to make a direct, one-shot call to the generative model via Vertex AI."""
     try:
-        # Get the generative model from Vertex AI
-        model = GenerativeModel(DEFAULT_AGENT_MODEL)
-        
         # Combine the instruction and the text for the prompt
         prompt = f"{instruction}\n\nHere is the text:\n---\n{text}\n---"
-        
-        response = model.generate_content(prompt)
-        
-        return {"status": "success", "fact": response.text}
-    except Exception as e:
-        print(f"--- Generator Error: {e} ---")
-        return {"status": "error", "fact": f"Failed to generate fact. {e}"}
 
+        fact = await generate_text_async(prompt)
 
-# --- The analyze_* functions below remain exactly the same ---
+        return {"status": "success", "fact": fact}
+    except Exception as e:
+        # Timeouts carry no message, so fall back to the exception's name.
+        error = str(e) or type(e).__name__
+        print(f"--- Generator Error: {error} ---")
+        return {"status": "error", "fact": f"Failed to generate fact. {error}"}
 
-def analyze_historical_context(text: str) -> dict:
-    """Analyzes the text for historical context."""
-    instruction = (
+
+# The instruction for each fact type. Fun-fact cache keys hash these, so
+# editing one only invalidates the cached facts of that type.
+INSTRUCTIONS = {
+    "historical_context": (
         "You are a history expert. Based on the provided text from a classic novel, "
         "identify and explain one interesting piece of historical context (e.g., "
         "customs, technologies, events, societal norms) relevant to what the characters "
         "are experiencing. Be concise and engaging."
-    )
-    return _generate_fact(instruction, text)
-
-def analyze_geographical_setting(text: str) -> dict:
-    """Analyzes the text for the geographical setting."""
-    instruction = (
+    ),
+    "geographical_setting": (
         "You are a world geography expert. Based on the provided text, describe the "
         "physical location or setting. Mention any real-world places if they are "
         "named or clearly implied. Be concise."
-    )
-    return _generate_fact(instruction, text)
-
-def analyze_plot_points(text: str) -> dict:
-    """Analyzes the text for key plot points."""
-    instruction = (
+    ),
+    "plot_points": (
         "You are a literary analyst. Based on the text provided so far, summarize "
         "the main plot points in one or two brief sentences. What are the key events "
         "that have just happened?"
-    )
-    return _generate_fact(instruction, text)
-
-def analyze_character_sentiments(text: str) -> dict:
-    """Analyzes the sentiments of characters."""
-    instruction = (
+    ),
+    "character_sentiments": (
         "You are an expert in character psychology. Based on the provided text, "
         "describe the primary emotion or sentiment of a key character. Use evidence "
         "from the text to support your analysis. Be concise."
-    )
-    return _generate_fact(instruction, text)
-
-def analyze_character_relationships(text: str) -> dict:
-    """Analyzes the relationships between characters."""
-    instruction = (
+    ),
+    "character_relationships": (
         "You are a literary relationship analyst. Based on the provided text, describe "
         "the nature of the relationship between two key characters mentioned. "
         "Are they friends, rivals, strangers? Be concise."
-    )
-    return _generate_fact(instruction, text)
\ No newline at end of file
+    ),
+}
+
+# Every fact type, in the order the reader shows them.
+FUN_FACT_TYPES = list(INSTRUCTIONS)
+
+
+async def analyze_historical_context(text: str) -> dict:
+    """Analyzes the text for historical context."""
+    return await _generate_fact(INSTRUCTIONS["historical_context"], text)
+
+async def analyze_geographical_setting(text: str) -> dict:
+    """Analyzes the text for the geographical setting."""
+    return await _generate_fact(INSTRUCTIONS["geographical_setting"], text)
+
+async def analyze_plot_points(text: str) -> dict:
+    """Analyzes the text for key plot points."""
+    return await _generate_fact(INSTRUCTIONS["plot_points"], text)
+
+async def analyze_character_sentiments(text: str) -> dict:
+    """Analyzes the sentiments of characters."""
+    return await _generate_fact(INSTRUCTIONS["character_sentiments"], text)
+
+async def analyze_character_relationships(text: str) -> dict:
+    """Analyzes the relationships between characters."""
+    return await _generate_fact(INSTRUCTIONS["character_relationships"], text)
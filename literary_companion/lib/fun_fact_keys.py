@@ -0,0 +1,58 @@
+# literary_companion/lib/fun_fact_keys.py
+#
+# Content-addressed cache keys for fun facts. Each fact is keyed by a hash of
+# everything that determines it: the normalized input text, the generator's
+# instruction, the model and the prompt version. Changing any of them yields a
+# new key, so stale facts are never served, while facts whose inputs did not
+# change keep their key and are reused.
+#
+# Objects under the book's folder in the bucket:
+#   fun_facts/<fact_type>/<fact_key>.json        - one generated fact
+#   fun_facts/chapter_<n>/<chapter_key>.json     - a chapter's aggregated facts
+#   fun_facts/index/chapter_<n>.json             - the chapter's current key
+
+import hashlib
+import json
+from typing import Dict, Iterable
+
+from literary_companion.config import DEFAULT_AGENT_MODEL
+from literary_companion.lib.fun_fact_generators import INSTRUCTIONS, PROMPT_VERSION
+
+
+def _digest(parts: Dict) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+def text_hash(normalized_text: str) -> str:
+    return hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+
+
+def fact_key(fact_type: str, text_sha256: str, model: str = DEFAULT_AGENT_MODEL) -> str:
+    return _digest({
+        "fact_type": fact_type,
+        "instruction": INSTRUCTIONS.get(fact_type, ""),
+        "model": model,
+        "prompt_version": PROMPT_VERSION,
+        "text_sha256": text_sha256,
+    })
+
+
+def fact_keys(fact_types: Iterable[str], text_sha256: str, model: str = DEFAULT_AGENT_MODEL) -> Dict[str, str]:
+    return {fact_type: fact_key(fact_type, text_sha256, model) for fact_type in fact_types}
+
+
+def chapter_key(keys: Dict[str, str]) -> str:
+    """A chapter's key is derived from its fact keys, so it changes when any of them does."""
+    return _digest(keys)
+
+
+def fact_object_name(base_book_name: str, fact_type: str, key: str) -> str:
+    return f"{base_book_name}/fun_facts/{fact_type}/{key}.json"
+
+
+def chapter_object_name(base_book_name: str, chapter_number: int, key: str) -> str:
+    return f"{base_book_name}/fun_facts/chapter_{chapter_number}/{key}.json"
+
+
+def chapter_index_object_name(base_book_name: str, chapter_number: int) -> str:
+    return f"{base_book_name}/fun_facts/index/chapter_{chapter_number}.json"
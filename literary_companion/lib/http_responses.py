@@ -0,0 +1,148 @@
+# literary_companion/lib/http_responses.py
+#
+# Helpers for serving cacheable JSON bodies: content negotiation for gzip and
+# brotli, strong ETags and conditional GETs. Compressed variants are built once
+# per body and memoized, so bodies kept in a cache are served precompressed.
+# Streamed bodies are gzipped on the fly instead.
+
+import gzip
+import threading
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from flask import Response
+
+from literary_companion.config import (
+    HTTP_COMPRESSION_ENABLED,
+    HTTP_COMPRESSION_ENCODINGS,
+    HTTP_COMPRESSION_LEVEL,
+    HTTP_COMPRESSION_MIN_BYTES,
+    HTTP_ETAGS_ENABLED,
+)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available.
+    brotli = None
+
+
+def available_encodings() -> List[str]:
+    """The configured encodings, in order of preference, that this process can produce."""
+    if not HTTP_COMPRESSION_ENABLED:
+        return []
+    return [e for e in HTTP_COMPRESSION_ENCODINGS if e == "gzip" or (e == "br" and brotli is not None)]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        # Brotli quality runs 0-11; map the shared 1-9 level onto it.
+        return brotli.compress(data, quality=min(11, HTTP_COMPRESSION_LEVEL + 2))
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=HTTP_COMPRESSION_LEVEL)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+class EncodedBody:
+    """A response body with its ETag and lazily built, memoized compressed variants."""
+
+    def __init__(self, body: bytes, etag: str, mimetype: str = "application/json"):
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def variant(self, encoding: Optional[str]) -> bytes:
+        if not encoding:
+            return self.body
+        with self._lock:
+            if encoding not in self._variants:
+                self._variants[encoding] = compress(self.body, encoding)
+            return self._variants[encoding]
+
+    @property
+    def cache_size(self) -> int:
+        # Leave room for the compressed variants, which are built on demand.
+        return len(self.body) + len(self.body) // 2
+
+
+def _variant_etag(etag: str, encoding: Optional[str]) -> str:
+    # Each encoding is a different representation, so it needs its own strong ETag.
+    return f"{etag}-{encoding}" if encoding else etag
+
+
+def _apply_cache_headers(response: Response, etag: str, max_age: int) -> None:
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.vary.add("Accept-Encoding")
+
+
+def not_modified_response(request, etag: str, max_age: int) -> Optional[Response]:
+    """
+    Returns a 304 response if the request's If-None-Match already holds a
+    representation of `etag`, so callers can skip loading the body entirely.
+    """
+    if not HTTP_ETAGS_ENABLED or request.method not in ("GET", "HEAD") or not request.if_none_match:
+        return None
+    for encoding in [None] + available_encodings():
+        candidate = _variant_etag(etag, encoding)
+        if request.if_none_match.contains(candidate):
+            response = Response(status=304)
+            _apply_cache_headers(response, candidate, max_age)
+            return response
+    return None
+
+
+def cached_body_response(request, payload: EncodedBody, max_age: int) -> Response:
+    """
+    Builds a response for `payload`, compressed according to the request's
+    Accept-Encoding and answered with a 304 when the client's copy is current.
+    """
+    encoding = None
+    if len(payload.body) >= HTTP_COMPRESSION_MIN_BYTES:
+        encoding = request.accept_encodings.best_match(available_encodings())
+
+    response = Response(payload.variant(encoding), mimetype=payload.mimetype)
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add("Accept-Encoding")
+    if not HTTP_ETAGS_ENABLED:
+        return response
+    _apply_cache_headers(response, _variant_etag(payload.etag, encoding), max_age)
+    return response.make_conditional(request)
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Gzips a streamed body incrementally. Each chunk is flushed once compressed,
+    so the client can decode it without waiting for the rest of the stream.
+    """
+    compressor = zlib.compressobj(HTTP_COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def streamed_response(request, chunks: Iterable[bytes], mimetype: str, etag: Optional[str] = None,
+                      max_age: int = 0) -> Response:
+    """
+    Builds a streamed response, gzipped when the client accepts it. With an
+    `etag`, callers answer revalidations with not_modified_response before
+    producing the stream, as the body is not known up front.
+    """
+    encoding = None
+    if "gzip" in available_encodings():
+        encoding = request.accept_encodings.best_match(["gzip"])
+
+    response = Response(gzip_stream(chunks) if encoding else chunks, mimetype=mimetype)
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add("Accept-Encoding")
+    if etag and HTTP_ETAGS_ENABLED:
+        _apply_cache_headers(response, _variant_etag(etag, encoding), max_age)
+    else:
+        response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,325 @@
+# literary_companion/lib/llm_governor.py
+#
+# A process-wide governor for model traffic. Every call passes through:
+#   1. token buckets for requests and tokens per minute (our quota),
+#   2. an adaptive concurrency limit that grows additively while calls succeed
+#      and halves on 429 / resource-exhausted errors (AIMD), so the process
+#      settles at the highest concurrency the quota actually sustains,
+#   3. retries with full-jitter exponential backoff, capped by a retry budget
+#      so an outage does not multiply load with retries.
+#
+# Callers may be on different event loops (one per request under threaded
+# workers) or plain threads, so all shared state is guarded by a threading
+# lock and parked callers are woken in a loop-safe way.
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from google.api_core import exceptions as api_exceptions
+
+T = TypeVar("T")
+
+# Errors that mean "slow down": they shrink the concurrency limit and are retried.
+THROTTLE_ERRORS = (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests)
+# Errors that are usually transient: retried, without shrinking the limit.
+TRANSIENT_ERRORS = (
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.DeadlineExceeded,
+    asyncio.TimeoutError,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    if isinstance(error, THROTTLE_ERRORS):
+        return True
+    # Some client layers wrap quota errors, so fall back to the message.
+    message = str(error).lower()
+    return "429" in message or "resource exhausted" in message or "resource_exhausted" in message
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    return is_throttle_error(error) or isinstance(error, TRANSIENT_ERRORS)
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at `per_minute`. Reservations may take
+    the bucket into debt; the caller then waits until the debt is repaid, which
+    keeps callers in reservation order. A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` tokens and returns how many seconds to wait before using them."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def adjust(self, amount: float) -> None:
+        """Takes (or, if negative, returns) tokens after the fact, e.g. once actual usage is known."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class _Waiter:
+    """A caller parked on the concurrency limit, wakeable from any thread."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.granted = False
+        if loop is not None:
+            self.future = loop.create_future()
+        else:
+            self.event = threading.Event()
+
+    def wake(self) -> None:
+        self.granted = True
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._resolve)
+        else:
+            self.event.set()
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdaptiveLimiter:
+    """
+    A concurrency limit adjusted by additive increase, multiplicative decrease.
+    Acquiring returns the current epoch, which the caller passes back with a
+    throttle so that calls already in flight when the quota ran out, and which
+    fail together, only lower the limit once.
+    """
+
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 64, decrease_factor: float = 0.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.decrease_factor = decrease_factor
+        self.epoch = 0
+        self.in_flight = 0
+        self._waiters = []
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, waiter: _Waiter) -> bool:
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    async def acquire_async(self) -> int:
+        waiter = _Waiter(asyncio.get_running_loop())
+        if self._try_acquire(waiter):
+            return self.epoch
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            # A slot handed over just as we were cancelled must be given back.
+            if waiter.granted:
+                self.release()
+            raise
+        return self.epoch
+
+    def acquire_sync(self) -> int:
+        waiter = _Waiter()
+        if not self._try_acquire(waiter):
+            waiter.event.wait()
+        return self.epoch
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_waiters()
+
+    def on_success(self) -> None:
+        with self._lock:
+            # Grows by about one slot for every `limit` successful calls.
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._wake_waiters()
+
+    def on_throttle(self, epoch: int) -> None:
+        with self._lock:
+            if epoch != self.epoch:
+                return
+            self.epoch += 1
+            self.limit = max(self.minimum, self.limit * self.decrease_factor)
+            logging.warning(f"LLM quota throttled; concurrency limit lowered to {int(self.limit)}.")
+
+    def _wake_waiters(self) -> None:
+        # Callers hold the lock. Slots are handed over directly, in arrival order.
+        while self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self._waiters.pop(0).wake()
+
+
+class RetryBudget:
+    """
+    Limits retries to a fraction of requests, plus a small steady allowance so
+    occasional failures at low traffic can still be retried.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, capacity: float = 20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.min_per_second)
+            self._updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class LLMGovernor:
+    """Rate limits, adaptively bounds and retries model calls. See the module comment."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        initial_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        max_retries: int = 5,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 30.0,
+        retry_budget_ratio: float = 0.2,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.limiter = AdaptiveLimiter(initial_concurrency, min_concurrency, max_concurrency)
+        self.retry_budget = RetryBudget(ratio=retry_budget_ratio)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._counters = {"calls": 0, "retries": 0, "throttled": 0, "failed": 0, "retry_budget_exhausted": 0}
+        self._counters_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+
+    def _backoff_seconds(self, attempt: int) -> float:
+        # Full jitter spreads out retries from calls that failed together.
+        ceiling = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempt - 1))
+        return random.uniform(self.retry_base_seconds / 2, max(self.retry_base_seconds / 2, ceiling))
+
+    def _should_retry(self, error: BaseException, attempt: int, epoch: int) -> bool:
+        if is_throttle_error(error):
+            self._count("throttled")
+            self.limiter.on_throttle(epoch)
+        if not is_retryable_error(error) or attempt >= self.max_retries:
+            return False
+        if not self.retry_budget.try_spend():
+            self._count("retry_budget_exhausted")
+            return False
+        self._count("retries")
+        return True
+
+    def record_tokens(self, actual_tokens: int, estimated_tokens: int) -> None:
+        """Corrects the tokens-per-minute bucket once a call's actual usage is known."""
+        self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    async def call_async(self, fn: Callable[[], Awaitable[T]], estimated_tokens: int = 1) -> T:
+        """Awaits `fn()` under the governor, retrying retryable errors. Raises the last error."""
+        self._count("calls")
+        self.retry_budget.record_request()
+        attempt = 0
+        while True:
+            delay = self._reserve(estimated_tokens)
+            if delay:
+                await asyncio.sleep(delay)
+            epoch = await self.limiter.acquire_async()
+            try:
+                result = await fn()
+            except Exception as e:
+                error = e
+            else:
+                self.limiter.on_success()
+                return result
+            finally:
+                self.limiter.release()
+            attempt += 1
+            if not self._should_retry(error, attempt, epoch):
+                self._count("failed")
+                raise error
+            await asyncio.sleep(self._backoff_seconds(attempt))
+
+    def call_sync(self, fn: Callable[[], T], estimated_tokens: int = 1) -> T:
+        """The blocking form of call_async, for callers without an event loop."""
+        self._count("calls")
+        self.retry_budget.record_request()
+        attempt = 0
+        while True:
+            delay = self._reserve(estimated_tokens)
+            if delay:
+                time.sleep(delay)
+            epoch = self.limiter.acquire_sync()
+            try:
+                result = fn()
+            except Exception as e:
+                error = e
+            else:
+                self.limiter.on_success()
+                return result
+            finally:
+                self.limiter.release()
+            attempt += 1
+            if not self._should_retry(error, attempt, epoch):
+                self._count("failed")
+                raise error
+            time.sleep(self._backoff_seconds(attempt))
+
+    def stats(self) -> Dict[str, float]:
+        with self._counters_lock:
+            counters = dict(self._counters)
+        counters.update({
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "waiting": len(self.limiter._waiters),
+        })
+        return counters
@@ -0,0 +1,110 @@
+# literary_companion/lib/lru_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    A thread-safe, in-process LRU cache bounded by entry count and total size,
+    with an optional time-to-live for each entry.
+
+    Sizes are supplied by the caller when an entry is stored, so the cache can
+    hold anything from parsed books to small JSON documents.
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 0, ttl_seconds: float = 0):
+        # A max_entries, max_bytes or ttl_seconds of 0 disables that particular bound.
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, size: int = 1, ttl_seconds: Optional[float] = None) -> None:
+        """Stores `value` under `key`, evicting least recently used entries as needed."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes and size > self.max_bytes:
+                # Never let a single oversized entry flush the whole cache.
+                return
+            self._entries[key] = (value, size, expires_at)
+            self._current_bytes += size
+            while self._entries and (
+                (self.max_entries and len(self._entries) > self.max_entries)
+                or (self.max_bytes and self._current_bytes > self.max_bytes)
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], sizer: Callable[[Any], int] = lambda v: 1) -> Any:
+        """
+        Returns the cached value for `key`, calling `loader` to populate it on a miss.
+        Concurrent misses may each call the loader; the last result wins.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = loader()
+        if value is not None:
+            self.put(key, value, size=sizer(value))
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        """Removes `key` from the cache if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        # Callers must hold the lock.
+        _, size, _ = self._entries.pop(key)
+        self._current_bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the cache counters, suitable for logging or a JSON response."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
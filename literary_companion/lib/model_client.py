@@ -0,0 +1,129 @@
+# literary_companion/lib/model_client.py
+#
+# The shared entry point for direct Vertex AI model calls. Model instances are
+# cached per model name instead of being built for every call, and the async
+# API runs on the caller's event loop with a per-call timeout, so fan-outs no
+# longer need a worker thread per request.
+#
+# The async gRPC channel a model opens is bound to the event loop it was first
+# used on. Under gunicorn's threaded workers every request runs its own loop,
+# so async models are cached per loop (and dropped with it). Sync callers
+# share one instance per model name.
+#
+# Every call goes through the shared LLM governor, which paces calls to the
+# quota, adapts concurrency to 429s and retries transient failures.
+
+import asyncio
+import threading
+import weakref
+from typing import Dict, Optional
+
+from vertexai.generative_models import GenerationConfig, GenerativeModel
+
+from literary_companion.config import (
+    DEFAULT_AGENT_MODEL,
+    LLM_INITIAL_CONCURRENCY,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_MIN_CONCURRENCY,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_RETRY_BUDGET_RATIO,
+    LLM_RETRY_MAX_SECONDS,
+    LLM_TIMEOUT_SECONDS,
+    LLM_TOKENS_PER_MINUTE,
+)
+from literary_companion.lib.llm_governor import LLMGovernor
+from literary_companion.lib.token_estimate import estimate_tokens
+
+llm_governor = LLMGovernor(
+    requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+    initial_concurrency=LLM_INITIAL_CONCURRENCY,
+    min_concurrency=LLM_MIN_CONCURRENCY,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    max_retries=LLM_MAX_RETRIES,
+    retry_base_seconds=LLM_RETRY_BASE_SECONDS,
+    retry_max_seconds=LLM_RETRY_MAX_SECONDS,
+    retry_budget_ratio=LLM_RETRY_BUDGET_RATIO,
+)
+
+_sync_models: Dict[str, GenerativeModel] = {}
+_async_models: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, GenerativeModel]]" = (
+    weakref.WeakKeyDictionary()
+)
+_lock = threading.Lock()
+
+
+def get_model(model_name: Optional[str] = None) -> GenerativeModel:
+    """Returns the shared model instance for blocking calls."""
+    model_name = model_name or DEFAULT_AGENT_MODEL
+    with _lock:
+        if model_name not in _sync_models:
+            _sync_models[model_name] = GenerativeModel(model_name)
+        return _sync_models[model_name]
+
+
+def get_async_model(model_name: Optional[str] = None) -> GenerativeModel:
+    """Returns the model instance for async calls on the running event loop."""
+    model_name = model_name or DEFAULT_AGENT_MODEL
+    loop = asyncio.get_running_loop()
+    with _lock:
+        models = _async_models.setdefault(loop, {})
+        if model_name not in models:
+            models[model_name] = GenerativeModel(model_name)
+        return models[model_name]
+
+
+def estimate_call_tokens(prompt: str) -> int:
+    """Tokens to reserve for a call before its usage is known: the prompt plus a reply of similar length."""
+    prompt_tokens = estimate_tokens(prompt)
+    return prompt_tokens + min(prompt_tokens, 2048)
+
+
+def _record_usage(response, estimated_tokens: int) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    total_tokens = getattr(usage, "total_token_count", 0) if usage is not None else 0
+    if total_tokens:
+        llm_governor.record_tokens(total_tokens, estimated_tokens)
+
+
+def generate_text(
+    prompt: str,
+    model_name: Optional[str] = None,
+    generation_config: Optional[GenerationConfig] = None,
+) -> str:
+    """Generates text for `prompt`, blocking the calling thread. Raises once retries are exhausted."""
+    model = get_model(model_name)
+    estimated_tokens = estimate_call_tokens(prompt)
+    response = llm_governor.call_sync(
+        lambda: model.generate_content(prompt, generation_config=generation_config),
+        estimated_tokens=estimated_tokens,
+    )
+    _record_usage(response, estimated_tokens)
+    return response.text
+
+
+async def generate_text_async(
+    prompt: str,
+    model_name: Optional[str] = None,
+    timeout_seconds: Optional[float] = LLM_TIMEOUT_SECONDS,
+    generation_config: Optional[GenerationConfig] = None,
+) -> str:
+    """
+    Generates text for `prompt` without blocking the event loop. Each attempt
+    is limited to `timeout_seconds` (None or 0 disables the timeout). Raises
+    the last error (asyncio.TimeoutError or the model's own) once retries are
+    exhausted.
+    """
+    model = get_async_model(model_name)
+    estimated_tokens = estimate_call_tokens(prompt)
+    response = await llm_governor.call_async(
+        lambda: asyncio.wait_for(
+            model.generate_content_async(prompt, generation_config=generation_config),
+            timeout=timeout_seconds or None,
+        ),
+        estimated_tokens=estimated_tokens,
+    )
+    _record_usage(response, estimated_tokens)
+    return response.text
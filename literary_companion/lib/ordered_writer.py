@@ -0,0 +1,52 @@
+# literary_companion/lib/ordered_writer.py
+#
+# Streams a prepared book's {"paragraphs": [...]} JSON while chapters finish
+# out of order. Each chapter is handed over with its position in reading
+# order; it is written as soon as every chapter before it has been, and
+# dropped from memory straight after. Records are written compactly, without
+# the indentation that used to double the file size.
+
+import json
+import threading
+from typing import Dict, List
+
+from literary_companion.lib.prepared_book import COMPACT_SEPARATORS
+
+
+class OrderedJsonWriter:
+    """Writes groups of records into one JSON array in sequence order. Thread-safe."""
+
+    def __init__(self, fileobj, array_name: str = "paragraphs"):
+        self.fileobj = fileobj
+        self.records_written = 0
+        self._next_sequence = 0
+        self._pending: Dict[int, List[dict]] = {}
+        self._lock = threading.Lock()
+        self.fileobj.write(f'{{"{array_name}":['.encode("utf-8"))
+
+    def add(self, sequence: int, records: List[dict]) -> List[int]:
+        """
+        Hands over the records at position `sequence` (0, 1, 2, ...) and writes
+        every group that is now contiguous. Returns the sequences written by
+        this call, in order.
+        """
+        with self._lock:
+            self._pending[sequence] = records
+            written = []
+            while self._next_sequence in self._pending:
+                for record in self._pending.pop(self._next_sequence):
+                    prefix = b"," if self.records_written else b""
+                    self.fileobj.write(prefix + json.dumps(
+                        record, separators=COMPACT_SEPARATORS, ensure_ascii=False
+                    ).encode("utf-8"))
+                    self.records_written += 1
+                written.append(self._next_sequence)
+                self._next_sequence += 1
+            return written
+
+    def finish(self) -> None:
+        """Closes the JSON document. Every sequence before the last one added must have arrived."""
+        with self._lock:
+            if self._pending:
+                raise ValueError(f"Sequence {self._next_sequence} was never added.")
+            self.fileobj.write(b"]}\n")
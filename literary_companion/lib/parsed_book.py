@@ -0,0 +1,76 @@
+# literary_companion/lib/parsed_book.py
+
+import hashlib
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from literary_companion.lib.prepared_book import compact_metadata, group_by_chapter, paragraph_runs
+
+
+def estimate_memory_bytes(paragraphs: List[dict]) -> int:
+    """
+    Estimates the memory held by parsed paragraphs: the list, each dict and its
+    values. Python objects take several times their JSON size, so cache budgets
+    are charged this rather than the length of the source text. Dict keys are
+    shared across paragraphs and not counted.
+    """
+    total = sys.getsizeof(paragraphs)
+    for p in paragraphs:
+        total += sys.getsizeof(p) + sum(sys.getsizeof(v) for v in p.values())
+    return total
+
+
+class ParsedBook:
+    """
+    A prepared book parsed once, together with a chapter -> paragraph slice index
+    so that serving a chapter is a dict lookup instead of a scan over every paragraph.
+    """
+
+    def __init__(self, paragraphs: List[dict], version: Optional[str] = None):
+        self.paragraphs = paragraphs
+        self.memory_bytes = estimate_memory_bytes(paragraphs)
+        self.version = version
+        self.chapter_index = self._build_chapter_index(paragraphs)
+        self._metadata = None
+
+    @classmethod
+    def from_json(cls, book_data_str: str) -> "ParsedBook":
+        """Builds a ParsedBook from the contents of a `_prepared.json` file."""
+        book_data = json.loads(book_data_str)
+        version = hashlib.sha256(book_data_str.encode('utf-8')).hexdigest()
+        return cls(book_data.get("paragraphs", []), version=version)
+
+    @staticmethod
+    def _build_chapter_index(paragraphs: List[dict]) -> Dict[int, Tuple[int, int]]:
+        # Paragraphs are written in reading order, so each chapter is a contiguous run.
+        index: Dict[int, Tuple[int, int]] = {}
+        for i, p in enumerate(paragraphs):
+            chapter = p.get("chapter_number")
+            if chapter is None:
+                continue
+            chapter = int(chapter)
+            start, _ = index.get(chapter, (i, i))
+            index[chapter] = (start, i + 1)
+        return index
+
+    def chapter(self, chapter_number: int) -> List[dict]:
+        """Returns the paragraphs of a chapter, or an empty list if it does not exist."""
+        bounds = self.chapter_index.get(int(chapter_number))
+        if bounds is None:
+            return []
+        start, end = bounds
+        return self.paragraphs[start:end]
+
+    def chapter_numbers(self) -> List[int]:
+        return sorted(self.chapter_index)
+
+    def metadata(self) -> dict:
+        """Returns the compact chapter/paragraph structure of the book, computed once per book."""
+        if self._metadata is None:
+            entries = [
+                {"chapter_number": chapter_number, "paragraph_runs": paragraph_runs(paragraphs)}
+                for chapter_number, paragraphs in group_by_chapter(self.paragraphs).items()
+            ]
+            self._metadata = compact_metadata(entries, self.version)
+        return self._metadata
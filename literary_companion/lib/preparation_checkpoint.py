@@ -0,0 +1,131 @@
+# literary_companion/lib/preparation_checkpoint.py
+#
+# Checkpoints for book preparation. Each chapter is written to GCS as soon as
+# all of its paragraphs are translated, and a manifest lists the finished
+# chapters, so a run that dies part way can resume and only translate the
+# chapters it had not finished.
+#
+# Every checkpointed chapter records a hash of its source segmentation (the
+# paragraph IDs, positions and text it was built from), and the manifest
+# records the model and translation prompts. On resume a chapter is reused only
+# if both still match, so a changed source file, chapter pattern, prompt or
+# model never brings back stale translations.
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from google.api_core.exceptions import NotFound
+
+from literary_companion.lib.prepared_book import (
+    COMPACT_SEPARATORS,
+    checkpoint_chapter_object_name,
+    checkpoint_manifest_object_name,
+)
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+
+def chapter_source_hash(paragraphs_with_metadata: List[dict]) -> str:
+    """Hashes a chapter's segmentation: paragraph IDs, positions and source text."""
+    source = [(p["total_id"], p["para_in_chapter"], p["text"]) for p in paragraphs_with_metadata]
+    return hashlib.sha256(json.dumps(source, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class PreparationCheckpoint:
+    """The checkpoint of one book's preparation run."""
+
+    def __init__(self, bucket, prepared_name: str, fingerprint: Dict[str, str], manifest_interval_seconds: float = 5.0):
+        self.bucket = bucket
+        self.prepared_name = prepared_name
+        self.fingerprint = fingerprint
+        # GCS allows about one write per second to a single object, so the
+        # manifest is rewritten at most this often while chapters complete.
+        self.manifest_interval_seconds = manifest_interval_seconds
+        self.chapters: Dict[str, dict] = {}
+        self._dirty = False
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    def load_manifest(self) -> bool:
+        """
+        Adopts the manifest of an earlier run, so its chapters can be restored
+        with restore_chapter. Returns False if there is no usable checkpoint.
+        """
+        try:
+            manifest = json.loads(self.bucket.blob(checkpoint_manifest_object_name(self.prepared_name)).download_as_text())
+        except NotFound:
+            logging.info(f"No checkpoint found for {self.prepared_name}; starting from scratch.")
+            return False
+        if manifest.get("format_version") != CHECKPOINT_FORMAT_VERSION or manifest.get("fingerprint") != self.fingerprint:
+            logging.info(f"Checkpoint for {self.prepared_name} was made with a different model or prompt; ignoring it.")
+            return False
+        with self._lock:
+            self.chapters = manifest.get("chapters", {})
+        logging.info(f"Resuming {self.prepared_name}: {len(self.chapters)} chapters are checkpointed.")
+        return True
+
+    def has_chapter(self, chapter_number: int) -> bool:
+        """Whether an earlier run checkpointed `chapter_number`, before checking its source hash."""
+        with self._lock:
+            return str(chapter_number) in self.chapters
+
+    def restore_chapter(self, chapter_number: int, source_hash: str) -> Optional[List[dict]]:
+        """Returns a checkpointed chapter's prepared paragraphs, or None unless its source hash matches."""
+        with self._lock:
+            entry = self.chapters.get(str(chapter_number))
+        if not entry or entry["source_sha256"] != source_hash:
+            return None
+        try:
+            shard = json.loads(self.bucket.blob(entry["object_name"]).download_as_text())
+        except NotFound:
+            return None
+        return shard["paragraphs"]
+
+    def save_chapter(self, chapter_number: int, source_hash: str, paragraphs: List[dict]) -> None:
+        """Writes a finished chapter and, at most every few seconds, the manifest. Blocking."""
+        object_name = checkpoint_chapter_object_name(self.prepared_name, chapter_number)
+        self.bucket.blob(object_name).upload_from_string(
+            json.dumps({"chapter_number": chapter_number, "paragraphs": paragraphs},
+                       separators=COMPACT_SEPARATORS, ensure_ascii=False),
+            content_type="application/json",
+        )
+        with self._lock:
+            self.chapters[str(chapter_number)] = {
+                "object_name": object_name,
+                "source_sha256": source_hash,
+                "paragraph_count": len(paragraphs),
+            }
+            self._dirty = True
+            if time.monotonic() - self._last_flush >= self.manifest_interval_seconds:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        """Writes the manifest if chapters were saved since the last write. Blocking."""
+        with self._lock:
+            if self._dirty:
+                self._flush_locked()
+
+    def reset(self) -> None:
+        """Starts a fresh checkpoint, so chapters from an earlier run are not resumed."""
+        with self._lock:
+            self.chapters = {}
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        manifest = {
+            "format_version": CHECKPOINT_FORMAT_VERSION,
+            "prepared_file": self.prepared_name,
+            "fingerprint": self.fingerprint,
+            "updated_at": time.time(),
+            "chapters": self.chapters,
+        }
+        self.bucket.blob(checkpoint_manifest_object_name(self.prepared_name)).upload_from_string(
+            json.dumps(manifest, separators=COMPACT_SEPARATORS), content_type="application/json"
+        )
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
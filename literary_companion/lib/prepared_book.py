@@ -0,0 +1,183 @@
+# literary_companion/lib/prepared_book.py
+#
+# Layout helpers for prepared books. Besides the legacy monolithic
+# `<book>_prepared.json`, book preparation writes a sharded layout:
+#
+#   <book>_prepared/manifest.json
+#   <book>_prepared/chapter_<n>.json
+#
+# The manifest is small and lists every chapter's paragraph ranges, byte size
+# and content hash, so readers can fetch only the chapters they need.
+#
+# While preparation runs, finished chapters are checkpointed under
+#
+#   <book>_prepared_checkpoint/manifest.json
+#   <book>_prepared_checkpoint/chapter_<n>.json
+#
+# so an interrupted run can resume without re-translating them.
+
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+MANIFEST_FORMAT_VERSION = 1
+
+# Compact separators keep shards small; readers never need the whitespace.
+COMPACT_SEPARATORS = (',', ':')
+
+
+def prepared_file_name(book_file_name: str) -> str:
+    """Maps a source file name (e.g. 'moby_dick.txt') to its prepared JSON name."""
+    return book_file_name.replace('.txt', '_prepared.json')
+
+
+def shard_prefix(prepared_name: str) -> str:
+    """Returns the GCS prefix holding the sharded layout of a prepared book."""
+    return prepared_name[:-len('.json')] if prepared_name.endswith('.json') else prepared_name
+
+
+def manifest_object_name(prepared_name: str) -> str:
+    return f"{shard_prefix(prepared_name)}/manifest.json"
+
+
+def chapter_object_name(prepared_name: str, chapter_number: int) -> str:
+    return f"{shard_prefix(prepared_name)}/chapter_{chapter_number}.json"
+
+
+def checkpoint_prefix(prepared_name: str) -> str:
+    return f"{shard_prefix(prepared_name)}_checkpoint"
+
+
+def checkpoint_manifest_object_name(prepared_name: str) -> str:
+    return f"{checkpoint_prefix(prepared_name)}/manifest.json"
+
+
+def checkpoint_chapter_object_name(prepared_name: str, chapter_number: int) -> str:
+    return f"{checkpoint_prefix(prepared_name)}/chapter_{chapter_number}.json"
+
+
+def paragraph_number(paragraph: dict) -> int:
+    """Extracts the numeric part of a paragraph ID such as 'p-42'."""
+    return int(str(paragraph["paragraph_id"]).rsplit('-', 1)[-1])
+
+
+def paragraph_runs(paragraphs: List[dict]) -> List[List[int]]:
+    """
+    Compresses a chapter's paragraphs into runs of consecutive IDs.
+    Each run is [first_paragraph_number, first_paragraph_in_chapter, count].
+    A chapter normally has a single run; gaps appear only where a paragraph
+    failed to translate and was left out of the prepared book.
+    """
+    runs: List[List[int]] = []
+    for p in paragraphs:
+        number = paragraph_number(p)
+        in_chapter = int(p["paragraph_in_chapter"])
+        if runs:
+            first_number, first_in_chapter, count = runs[-1]
+            if number == first_number + count and in_chapter == first_in_chapter + count:
+                runs[-1][2] += 1
+                continue
+        runs.append([number, in_chapter, 1])
+    return runs
+
+
+def expand_paragraph_runs(chapter_number: int, runs: List[List[int]]) -> List[dict]:
+    """Inverse of `paragraph_runs`: rebuilds per-paragraph metadata for a chapter."""
+    return [
+        {
+            "paragraph_id": f"p-{first_number + k}",
+            "chapter_number": chapter_number,
+            "paragraph_in_chapter": first_in_chapter + k,
+        }
+        for first_number, first_in_chapter, count in runs
+        for k in range(count)
+    ]
+
+
+def group_by_chapter(paragraphs: List[dict]) -> "OrderedDict[int, List[dict]]":
+    """Groups paragraphs by chapter number, preserving reading order."""
+    chapters: "OrderedDict[int, List[dict]]" = OrderedDict()
+    for p in paragraphs:
+        chapters.setdefault(int(p["chapter_number"]), []).append(p)
+    return chapters
+
+
+def build_chapter_shard(chapter_number: int, paragraphs: List[dict]) -> bytes:
+    return json.dumps(
+        {"chapter_number": chapter_number, "paragraphs": paragraphs},
+        separators=COMPACT_SEPARATORS,
+        ensure_ascii=False,
+    ).encode('utf-8')
+
+
+def build_manifest_entry(prepared_name: str, chapter_number: int, paragraphs: List[dict], shard: bytes) -> dict:
+    return {
+        "chapter_number": chapter_number,
+        "object_name": chapter_object_name(prepared_name, chapter_number),
+        "paragraph_count": len(paragraphs),
+        "first_paragraph_id": paragraphs[0]["paragraph_id"],
+        "last_paragraph_id": paragraphs[-1]["paragraph_id"],
+        "paragraph_runs": paragraph_runs(paragraphs),
+        "byte_size": len(shard),
+        "sha256": hashlib.sha256(shard).hexdigest(),
+    }
+
+
+def build_manifest(prepared_name: str, chapter_entries: List[dict]) -> dict:
+    """Builds the manifest from per-chapter entries, in chapter order."""
+    chapter_entries = sorted(chapter_entries, key=lambda c: c["chapter_number"])
+    # The book's version is a hash over its chapter hashes, so it changes
+    # whenever any chapter's content does.
+    version = hashlib.sha256(
+        "".join(c["sha256"] for c in chapter_entries).encode('utf-8')
+    ).hexdigest()
+    return {
+        "format_version": MANIFEST_FORMAT_VERSION,
+        "prepared_file": prepared_name,
+        "version": version,
+        "chapter_count": len(chapter_entries),
+        "paragraph_count": sum(c["paragraph_count"] for c in chapter_entries),
+        "byte_size": sum(c["byte_size"] for c in chapter_entries),
+        "chapters": chapter_entries,
+    }
+
+
+def build_shards(prepared_name: str, paragraphs: List[dict]) -> Tuple[dict, Dict[str, bytes]]:
+    """
+    Splits a prepared book into per-chapter shards.
+    Returns the manifest and a mapping of object name -> shard bytes.
+    """
+    shards: Dict[str, bytes] = {}
+    entries = []
+    for chapter_number, chapter_paragraphs in group_by_chapter(paragraphs).items():
+        shard = build_chapter_shard(chapter_number, chapter_paragraphs)
+        entry = build_manifest_entry(prepared_name, chapter_number, chapter_paragraphs, shard)
+        shards[entry["object_name"]] = shard
+        entries.append(entry)
+    return build_manifest(prepared_name, entries), shards
+
+
+def compact_metadata(chapter_entries: List[dict], version: str) -> dict:
+    """
+    Builds the reader's compact, columnar book metadata from per-chapter entries
+    (manifest entries, or anything with 'chapter_number' and 'paragraph_runs').
+    Per-paragraph metadata can be rebuilt with `expand_paragraph_runs`.
+    """
+    chapter_entries = sorted(chapter_entries, key=lambda c: c["chapter_number"])
+    return {
+        "format": "compact-v1",
+        "version": version,
+        "chapters": [c["chapter_number"] for c in chapter_entries],
+        "paragraph_counts": [sum(run[2] for run in c["paragraph_runs"]) for c in chapter_entries],
+        "paragraph_runs": [c["paragraph_runs"] for c in chapter_entries],
+    }
+
+
+def parse_chapter_range(chapters_str: str) -> Optional[Tuple[int, int]]:
+    """Parses strings like 'Chapters 1 through 16' into an inclusive (start, end) tuple."""
+    match = re.match(r"Chapters (\d+) through (\d+)", chapters_str or "", re.IGNORECASE)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
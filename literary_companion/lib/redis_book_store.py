@@ -0,0 +1,154 @@
+# literary_companion/lib/redis_book_store.py
+#
+# Chapter-granular Redis storage for prepared books. Each book is one Redis
+# hash with a "meta" field (the shard manifest) and one "ch:<n>" field per
+# chapter, so a chapter request transfers a single compressed chapter instead
+# of the whole book.
+
+import json
+import logging
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import redis
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available.
+    zstandard = None
+
+META_FIELD = "meta"
+
+# Adds fields to a book hash only if it still exists, so a backfill racing the
+# hash's expiry cannot recreate it without its manifest. ARGV[1] is the TTL,
+# ARGV[2] is 1 for a sliding expiry (always reset) and 0 for a fixed one (only
+# set if the key somehow has none), and the rest are field/value pairs.
+_PUT_IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+local ttl = tonumber(ARGV[1])
+if ttl > 0 and (ARGV[2] == '1' or redis.call('TTL', KEYS[1]) == -1) then
+    redis.call('EXPIRE', KEYS[1], ttl)
+end
+return 1
+"""
+
+# One-byte codec tags prefixed to every stored value, so values written with
+# one codec stay readable after the configured codec changes.
+_ZLIB_TAG = b"z"
+_ZSTD_TAG = b"s"
+_RAW_TAG = b"n"
+
+
+def chapter_field(chapter_number: int) -> str:
+    return f"ch:{chapter_number}"
+
+
+class RedisBookStore:
+    """Stores prepared books as compressed, per-chapter fields of a Redis hash."""
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        ttl_seconds: int = 3600,
+        sliding_expiry: bool = False,
+        codec: str = "zlib",
+        compression_level: int = 6,
+    ):
+        # The client must be created with decode_responses=False, as values are binary.
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.sliding_expiry = sliding_expiry
+        if codec == "zstd" and zstandard is None:
+            logging.warning("zstd compression requested but 'zstandard' is not installed. Using zlib.")
+            codec = "zlib"
+        self.codec = codec
+        self.compression_level = compression_level
+        self._put_if_exists = client.register_script(_PUT_IF_EXISTS_SCRIPT)
+
+    @staticmethod
+    def key(book_name: str) -> str:
+        # A distinct prefix from the legacy whole-book string key ("book:<name>")
+        # so both storage modes can coexist during a rollout.
+        return f"bookh:{book_name}"
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return _ZSTD_TAG + zstandard.ZstdCompressor(level=self.compression_level).compress(data)
+        if self.codec == "none":
+            return _RAW_TAG + data
+        return _ZLIB_TAG + zlib.compress(data, self.compression_level)
+
+    @staticmethod
+    def _decompress(value: bytes) -> bytes:
+        tag, payload = value[:1], value[1:]
+        if tag == _ZSTD_TAG:
+            if zstandard is None:
+                raise ValueError("Value was stored with zstd, but 'zstandard' is not installed.")
+            return zstandard.ZstdDecompressor().decompress(payload)
+        if tag == _ZLIB_TAG:
+            return zlib.decompress(payload)
+        return payload
+
+    def _touch(self, pipe, key: str) -> None:
+        if self.sliding_expiry and self.ttl_seconds:
+            pipe.expire(key, self.ttl_seconds)
+
+    def put_book(self, book_name: str, manifest: dict, shards: Dict[int, bytes]) -> None:
+        """Stores a manifest and any number of chapter shards in one round trip."""
+        key = self.key(book_name)
+        mapping = {META_FIELD: self._compress(json.dumps(manifest).encode('utf-8'))}
+        for chapter_number, shard in shards.items():
+            mapping[chapter_field(chapter_number)] = self._compress(shard)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(key, mapping=mapping)
+        if self.ttl_seconds:
+            pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def put_chapters(self, book_name: str, shards: Dict[int, bytes]) -> bool:
+        """
+        Adds chapter shards to an existing book hash without resetting a fixed
+        expiry. Returns False, writing nothing, if the hash has expired.
+        """
+        if not shards:
+            return False
+        args = [self.ttl_seconds or 0, 1 if self.sliding_expiry else 0]
+        for n, shard in shards.items():
+            args += [chapter_field(n), self._compress(shard)]
+        return bool(self._put_if_exists(keys=[self.key(book_name)], args=args))
+
+    def get_manifest(self, book_name: str) -> Optional[dict]:
+        key = self.key(book_name)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hget(key, META_FIELD)
+        self._touch(pipe, key)
+        value = pipe.execute()[0]
+        if value is None:
+            return None
+        return json.loads(self._decompress(value))
+
+    def get_chapters(self, book_name: str, chapter_numbers: Iterable[int]) -> Dict[int, List[dict]]:
+        """
+        Returns {chapter_number: paragraphs} for the chapters present in Redis,
+        fetched with a single pipelined HMGET. Missing chapters are simply absent.
+        """
+        chapter_numbers = [int(n) for n in chapter_numbers]
+        if not chapter_numbers:
+            return {}
+        key = self.key(book_name)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hmget(key, [chapter_field(n) for n in chapter_numbers])
+        self._touch(pipe, key)
+        values = pipe.execute()[0]
+
+        chapters = {}
+        for chapter_number, value in zip(chapter_numbers, values):
+            if value is not None:
+                chapters[chapter_number] = json.loads(self._decompress(value)).get("paragraphs", [])
+        return chapters
+
+    def invalidate(self, book_name: str) -> None:
+        self.client.delete(self.key(book_name))
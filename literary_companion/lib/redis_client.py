@@ -0,0 +1,57 @@
+# literary_companion/lib/redis_client.py
+#
+# A shared, lazily connected Redis client for library code that runs outside
+# app.py (agents, locks, caches). Redis is always optional: callers get None
+# when it is unreachable and fall back to working without it.
+
+import logging
+import threading
+import time
+from typing import Optional
+
+import redis
+
+from literary_companion.config import (
+    REDIS_CONNECT_TIMEOUT_SECONDS,
+    REDIS_HOST,
+    REDIS_PORT,
+    REDIS_SOCKET_TIMEOUT_SECONDS,
+)
+
+# After a failed connection, wait this long before trying again, so a missing
+# Redis costs one connection attempt per interval rather than one per request.
+RECONNECT_INTERVAL_SECONDS = 30
+
+_client = None
+_next_attempt = 0.0
+_client_lock = threading.Lock()
+
+
+def get_redis_client() -> Optional[redis.Redis]:
+    """
+    Returns a shared Redis client (decoding responses to str), or None if Redis
+    is unreachable. Only one thread at a time tries to connect, and it does so
+    outside the lock; other callers get None meanwhile instead of waiting on it.
+    """
+    global _client, _next_attempt
+    with _client_lock:
+        if _client is not None or time.monotonic() < _next_attempt:
+            return _client
+        # Claim this attempt, so concurrent callers skip Redis until it succeeds.
+        _next_attempt = time.monotonic() + RECONNECT_INTERVAL_SECONDS
+
+    client = redis.Redis(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        decode_responses=True,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT_SECONDS,
+        socket_timeout=REDIS_SOCKET_TIMEOUT_SECONDS,
+    )
+    try:
+        client.ping()
+    except redis.exceptions.RedisError as e:
+        logging.warning(f"Redis unavailable at {REDIS_HOST}:{REDIS_PORT}: {e}")
+        return None
+    with _client_lock:
+        _client = client
+        return _client
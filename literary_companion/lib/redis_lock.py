@@ -0,0 +1,38 @@
+# literary_companion/lib/redis_lock.py
+#
+# A minimal Redis lease (SET NX with an expiry) for coordinating work across
+# instances. The expiry bounds how long a crashed holder can block others.
+
+import logging
+import uuid
+
+import redis
+
+# Deletes the key only if it still holds our token, so an expired lease that
+# another instance has since acquired is never released by the old holder.
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLock:
+    """A single-holder lease on `name` that expires after `ttl_seconds`."""
+
+    def __init__(self, client: redis.Redis, name: str, ttl_seconds: int = 120):
+        self.client = client
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.token = uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        return bool(self.client.set(self.name, self.token, nx=True, ex=self.ttl_seconds))
+
+    def release(self) -> None:
+        try:
+            self.client.eval(_RELEASE_SCRIPT, 1, self.name, self.token)
+        except redis.exceptions.RedisError as e:
+            # The lease expires on its own; a failed release only delays other instances.
+            logging.warning(f"Failed to release Redis lock '{self.name}': {e}")
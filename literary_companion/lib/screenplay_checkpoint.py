@@ -0,0 +1,74 @@
+# literary_companion/lib/screenplay_checkpoint.py
+#
+# Per-stage checkpoints for screenplay generation. Each chapter's scene list,
+# creative prompts and (when polished by the LLM assembler) screenplay are
+# written to GCS as soon as they are produced, tagged with a hash of that
+# stage's inputs. A later run reuses a stage only if its hash still matches, so
+# unchanged chapters cost no model calls, a crashed run loses nothing it had
+# finished, and a changed chapter text, prompt or model regenerates the stages
+# that depend on it.
+#
+# The hashes chain: the scene stage hashes the chapter text, and each later
+# stage hashes the output of the stage before it, so regenerating scenes also
+# invalidates their prompts and screenplay.
+
+import hashlib
+import json
+import logging
+from typing import Any, Optional
+
+from google.api_core.exceptions import NotFound
+
+from literary_companion.lib.prepared_book import COMPACT_SEPARATORS
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+SCENES_STAGE = "scenes"
+PROMPTS_STAGE = "creative_prompts"
+SCREENPLAY_STAGE = "screenplay"
+
+
+def stage_input_hash(*parts: Any) -> str:
+    """Hashes a stage's inputs: any JSON-serializable values (text, settings, prompts, model names)."""
+    return hashlib.sha256(
+        json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def checkpoint_object_name(folder_name: str, chapter_number: int, stage: str) -> str:
+    return f"{folder_name}/screenplay_checkpoint/chapter_{chapter_number}_{stage}.json"
+
+
+class ScreenplayCheckpoint:
+    """The stage checkpoints of one book's screenplay generation. Methods are blocking."""
+
+    def __init__(self, bucket, folder_name: str):
+        self.bucket = bucket
+        self.folder_name = folder_name
+
+    def load(self, chapter_number: int, stage: str, input_hash: str) -> Optional[Any]:
+        """Returns a stage's checkpointed output, or None if there is none for these inputs."""
+        object_name = checkpoint_object_name(self.folder_name, chapter_number, stage)
+        try:
+            checkpoint = json.loads(self.bucket.blob(object_name).download_as_text())
+        except NotFound:
+            return None
+        except ValueError:
+            logging.warning(f"Ignoring unreadable screenplay checkpoint gs://{self.bucket.name}/{object_name}.")
+            return None
+        if checkpoint.get("format_version") != CHECKPOINT_FORMAT_VERSION or checkpoint.get("input_sha256") != input_hash:
+            return None
+        return checkpoint.get("output")
+
+    def save(self, chapter_number: int, stage: str, input_hash: str, output: Any) -> None:
+        """Writes a stage's output, tagged with the hash of its inputs."""
+        self.bucket.blob(checkpoint_object_name(self.folder_name, chapter_number, stage)).upload_from_string(
+            json.dumps({
+                "format_version": CHECKPOINT_FORMAT_VERSION,
+                "chapter_number": chapter_number,
+                "stage": stage,
+                "input_sha256": input_hash,
+                "output": output,
+            }, separators=COMPACT_SEPARATORS, ensure_ascii=False),
+            content_type="application/json",
+        )
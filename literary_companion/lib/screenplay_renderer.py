@@ -0,0 +1,85 @@
+# literary_companion/lib/screenplay_renderer.py
+#
+# Renders a chapter's scenes (with their creative prompts) as the screenplay
+# markdown the ScreenplayAssembler agent used to produce: one "# heading"
+# section per scene with its action and dialogue, followed by a
+# "## Creative Assets" section, and scenes separated by "---". Rendering is
+# local and deterministic, so assembling a chapter costs no model call and
+# long chapters are never cut off by an output-token limit.
+
+import json
+from typing import Any, List
+
+# Creative prompt keys in the order they are rendered, with their headings.
+ASSET_HEADINGS = {
+    "music": "Music",
+    "sound_effects": "Sound Effects",
+    "concept_art": "Concept Art",
+    "narration": "Narration",
+}
+MISSING_PROMPTS_TEXT = "Failed to generate creative prompts for this scene."
+SCENE_SEPARATOR = "\n\n---\n\n"
+
+
+def _text(value: Any) -> str:
+    """Renders a free-form value from model output as markdown text."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return "\n\n".join(t for t in (_text(item) for item in value) if t)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _dialogue_text(dialogue: Any) -> str:
+    """
+    Renders dialogue given as a string, a list of lines, or a list of
+    {"character": ..., "line": ...} objects as character cues over their lines.
+    """
+    if not isinstance(dialogue, list):
+        return _text(dialogue)
+    blocks = []
+    for line in dialogue:
+        if isinstance(line, dict):
+            character = _text(line.get("character") or line.get("speaker") or line.get("name"))
+            spoken = _text(line.get("line") or line.get("text") or line.get("dialogue"))
+            block = "\n".join(t for t in (character.upper(), spoken) if t)
+        else:
+            block = _text(line)
+        if block:
+            blocks.append(block)
+    return "\n\n".join(blocks)
+
+
+def _assets_text(creative_prompts: Any) -> str:
+    if not isinstance(creative_prompts, dict) or "error" in creative_prompts or not creative_prompts:
+        return f"### Creative Prompts\n{MISSING_PROMPTS_TEXT}"
+    keys = [k for k in ASSET_HEADINGS if k in creative_prompts]
+    keys += [k for k in creative_prompts if k not in ASSET_HEADINGS]
+    sections = []
+    for key in keys:
+        heading = ASSET_HEADINGS.get(key) or str(key).replace("_", " ").title()
+        sections.append(f"### {heading}\n{_text(creative_prompts[key])}")
+    return "\n\n".join(sections)
+
+
+def render_scene(scene: dict, scene_number: int = 1) -> str:
+    """Renders one scene and its creative prompts as markdown."""
+    heading = _text(scene.get("scene_heading")) or f"SCENE {scene_number}"
+    parts = [f"# {heading}"]
+    for body in (_text(scene.get("action")), _dialogue_text(scene.get("dialogue"))):
+        if body:
+            parts.append(body)
+    parts.append("## Creative Assets")
+    parts.append(_assets_text(scene.get("creative_prompts")))
+    return "\n\n".join(parts)
+
+
+def render_screenplay(scenes_with_prompts: List[dict]) -> str:
+    """Renders a chapter's scenes, in order, as one screenplay markdown document."""
+    return SCENE_SEPARATOR.join(
+        render_scene(scene, i) for i, scene in enumerate(scenes_with_prompts, start=1)
+    ) + "\n"
@@ -0,0 +1,74 @@
+# literary_companion/lib/single_flight.py
+#
+# Coalesces concurrent calls for the same key into one in-flight call whose
+# result every caller shares. Waiters may be on different event loops: under
+# gunicorn's threaded workers each request runs its own loop, while asgi.py
+# shares one loop per worker, so the shared result is a thread-safe
+# concurrent.futures.Future rather than an asyncio one.
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class LeaderAbandoned(Exception):
+    """Raised to waiters when the call they joined was cancelled before finishing."""
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers await its result."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the result of `fn()`, or of the call already in flight for `key`.
+        If that call is cancelled (e.g. its client disconnected), waiters retry
+        and one of them takes over.
+        """
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                is_leader = future is None
+                if is_leader:
+                    future = concurrent.futures.Future()
+                    self._calls[key] = future
+                    self.leaders += 1
+                else:
+                    self.coalesced += 1
+
+            if is_leader:
+                return await self._lead(key, future, fn)
+            try:
+                # Shielded, so one waiter being cancelled does not cancel the shared future.
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except LeaderAbandoned:
+                continue
+
+    async def _lead(self, key: Hashable, future: concurrent.futures.Future, fn) -> Any:
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._finish(key)
+            future.set_exception(LeaderAbandoned(f"In-flight call for {key!r} was cancelled."))
+            raise
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    def _finish(self, key: Hashable) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
@@ -0,0 +1,17 @@
+# literary_companion/lib/text_keys.py
+#
+# Text normalization for content-addressed keys (fun facts, translation memo),
+# so the same passage hashes to the same key however it was extracted.
+
+import re
+import unicodedata
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text so incidental differences (Unicode forms, runs of spaces,
+    trailing whitespace, extra blank lines) do not change the cache key.
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
@@ -0,0 +1,54 @@
+# literary_companion/lib/token_estimate.py
+#
+# Cheap token-count estimates for budgeting model calls (rate limiting, batch
+# packing) without a round trip to the model's count_tokens endpoint.
+
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# English prose averages roughly four characters per token for Gemini models.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens in `text`. Never returns less than 1."""
+    return max(1, len(text or "") // CHARS_PER_TOKEN)
+
+
+def pack_by_tokens(
+    items: Sequence[T],
+    max_tokens: int,
+    text: Callable[[T], str] = str,
+    max_items: Optional[int] = None,
+) -> List[List[T]]:
+    """
+    Packs consecutive `items` into batches whose estimated tokens (of
+    `text(item)`) stay within `max_tokens`, and with at most `max_items` each.
+    An item over the budget on its own gets a batch to itself.
+    """
+    batches: List[List[T]] = []
+    batch: List[T] = []
+    batch_tokens = 0
+    for item in items:
+        tokens = estimate_tokens(text(item))
+        if batch and (batch_tokens + tokens > max_tokens or (max_items and len(batch) >= max_items)):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def trailing_within(items: Sequence[str], max_tokens: int) -> List[str]:
+    """The longest run of trailing `items` whose estimated tokens fit within `max_tokens`."""
+    tail: List[str] = []
+    tokens = 0
+    for item in reversed(items):
+        tokens += estimate_tokens(item)
+        if tokens > max_tokens:
+            break
+        tail.insert(0, item)
+    return tail
@@ -0,0 +1,119 @@
+# literary_companion/lib/translation_memo.py
+#
+# A durable memo of paragraph translations, so re-running book preparation
+# (after a crash, a segmentation change, or for another edition of the same
+# novel) only translates paragraphs it has not seen before.
+#
+# Entries are content-addressed: the key hashes the normalized paragraph text,
+# the translation prompts and the model, so editing a prompt or switching
+# models never serves a stale translation. GCS holds the durable copy, under
+#   translation_memo/<key[:2]>/<key>.json
+# and an optional local SQLite file in front of it saves the GCS round trips
+# on machines that prepare books repeatedly.
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from google.api_core.exceptions import NotFound
+
+from literary_companion.lib.text_keys import normalize_text
+
+MEMO_PREFIX = "translation_memo"
+
+
+def translation_key(text: str, prompt_fingerprint: str, model: str) -> str:
+    return hashlib.sha256(
+        json.dumps({"model": model, "prompt": prompt_fingerprint, "text": normalize_text(text)}, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:32]
+
+
+def memo_object_name(key: str) -> str:
+    return f"{MEMO_PREFIX}/{key[:2]}/{key}.json"
+
+
+class TranslationMemo:
+    """Paragraph translations by content key: a local SQLite file (optional), then GCS."""
+
+    def __init__(self, bucket, sqlite_path: Optional[str] = None):
+        self.bucket = bucket
+        self._db = None
+        self._db_lock = threading.Lock()
+        if sqlite_path:
+            try:
+                self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS memo (key TEXT PRIMARY KEY, translation TEXT NOT NULL)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logging.warning(f"Translation memo SQLite tier at {sqlite_path} is unavailable: {e}")
+                self._db = None
+        self._counters = {"local_hits": 0, "gcs_hits": 0, "misses": 0, "writes": 0}
+        self._counters_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def _get_local(self, key: str) -> Optional[str]:
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute("SELECT translation FROM memo WHERE key = ?", (key,)).fetchone()
+        except Exception as e:
+            logging.warning(f"Translation memo SQLite read of {key} failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def _put_local(self, key: str, translation: str) -> None:
+        if self._db is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute("INSERT OR REPLACE INTO memo (key, translation) VALUES (?, ?)", (key, translation))
+                self._db.commit()
+        except Exception as e:
+            logging.warning(f"Translation memo SQLite write of {key} failed: {e}")
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the memoized translation for `key`, or None. Errors count as misses."""
+        translation = self._get_local(key)
+        if translation is not None:
+            self._count("local_hits")
+            return translation
+        try:
+            data = json.loads(self.bucket.blob(memo_object_name(key)).download_as_text())
+            translation = data["translation"]
+        except NotFound:
+            translation = None
+        except Exception as e:
+            logging.warning(f"Translation memo read of {key} failed: {e}")
+            translation = None
+        if translation is None:
+            self._count("misses")
+            return None
+        self._count("gcs_hits")
+        self._put_local(key, translation)
+        return translation
+
+    def put(self, key: str, translation: str) -> None:
+        """Stores a translation. A failed write is logged, never raised: the memo is an optimization."""
+        try:
+            self.bucket.blob(memo_object_name(key)).upload_from_string(
+                json.dumps({"translation": translation}), content_type="application/json"
+            )
+            self._put_local(key, translation)
+            self._count("writes")
+        except Exception as e:
+            logging.warning(f"Translation memo write of {key} failed: {e}")
+
+    def put_many(self, translations: Dict[str, str]) -> None:
+        for key, translation in translations.items():
+            self.put(key, translation)
+
+    def stats(self) -> Dict[str, int]:
+        with self._counters_lock:
+            return dict(self._counters)
@@ -0,0 +1,109 @@
+# literary_companion/tools/fun_fact_pregeneration_tool.py
+
+import asyncio
+import logging
+import time
+from typing import Iterable, Optional
+
+from google.adk.tools import FunctionTool
+
+from literary_companion.agents.fun_fact_adk_agents import FunFactCoordinatorAgent, fun_fact_cache
+from literary_companion.config import FUN_FACT_PREGEN_CONCURRENCY, GCS_BUCKET_NAME
+from literary_companion.lib.fun_fact_generators import FUN_FACT_TYPES
+from literary_companion.lib.prepared_book import prepared_file_name
+from literary_companion.tools.gcs_tool import read_prepared_chapters, read_prepared_manifest
+
+
+def chapter_text(paragraphs) -> str:
+    """The chapter text exactly as the reader sends it, so pre-generated facts share its cache keys."""
+    return "\n\n".join(p.get("original_text", "") for p in paragraphs)
+
+
+async def run_fun_fact_pregeneration(
+    bucket_name: str,
+    file_name: str,
+    concurrency: int = FUN_FACT_PREGEN_CONCURRENCY,
+    chapter_numbers: Optional[Iterable[int]] = None,
+) -> str:
+    """
+    Generates and caches every chapter's fun facts for a prepared book, `concurrency`
+    chapters at a time. Chapters already in the cache are skipped, so an
+    interrupted run resumes where it stopped.
+    """
+    if not GCS_BUCKET_NAME:
+        return "Error: GCS_BUCKET_NAME is not set, so there is no fun-fact cache to write to."
+    start_time = time.monotonic()
+    prepared_name = prepared_file_name(file_name)
+    try:
+        manifest = await asyncio.to_thread(read_prepared_manifest, bucket_name, prepared_name)
+        if chapter_numbers is None and manifest:
+            chapter_numbers = [c["chapter_number"] for c in manifest["chapters"]]
+        chapters = await asyncio.to_thread(
+            read_prepared_chapters, bucket_name, prepared_name, chapter_numbers, manifest
+        )
+    except Exception as e:
+        return f"Error: Failed to read prepared book gs://{bucket_name}/{prepared_name}. {e}"
+
+    total_chapters = len(chapters)
+    logging.info(
+        f"Pre-generating fun facts for {total_chapters} chapters of {file_name} "
+        f"into gs://{GCS_BUCKET_NAME}, {concurrency} chapters at a time."
+    )
+    counts = {"generated": 0, "cached": 0, "failed": 0}
+    processed_count = 0
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def pregenerate_chapter(chapter_number, paragraphs):
+        nonlocal processed_count
+        async with semaphore:
+            coordinator = FunFactCoordinatorAgent(
+                fun_fact_types=FUN_FACT_TYPES, book_name=file_name, chapter_number=chapter_number
+            )
+            text_segment = chapter_text(paragraphs)
+            cache_path = coordinator.chapter_cache_path(text_segment)
+            try:
+                if await asyncio.to_thread(fun_fact_cache.get, cache_path) is not None:
+                    outcome = "cached"
+                else:
+                    # A chapter counts as generated only once its facts are stored
+                    # durably, not when they are merely held in process memory.
+                    _, stored = await coordinator.get_fun_facts_stored(text_segment)
+                    outcome = "generated" if stored else "failed"
+            except Exception as e:
+                logging.error(f"Chapter {chapter_number} fun facts generated an exception: {e}", exc_info=True)
+                outcome = "failed"
+
+        counts[outcome] += 1
+        processed_count += 1
+        if outcome == "failed":
+            logging.warning(f"Fun facts for chapter {chapter_number} failed and will be retried on the next run.")
+        if processed_count % 5 == 0 or processed_count == total_chapters:
+            elapsed = time.monotonic() - start_time
+            percentage_complete = (processed_count / total_chapters) * 100
+            logging.info(
+                f"Progress - Completed fun facts for {processed_count} of {total_chapters} chapters "
+                f"({percentage_complete:.2f}% complete, {processed_count / elapsed * 60:.1f} chapters/min)."
+            )
+
+    await asyncio.gather(*(pregenerate_chapter(n, p) for n, p in chapters.items() if p))
+
+    duration_minutes = (time.monotonic() - start_time) / 60
+    result_message = (
+        f"Fun facts for {file_name}: generated {counts['generated']}, already cached {counts['cached']}, "
+        f"failed {counts['failed']} of {total_chapters} chapters. Total time: {duration_minutes:.2f} minutes."
+    )
+    logging.info(result_message)
+    return result_message
+
+
+async def pregenerate_fun_facts(bucket_name: str, file_name: str) -> str:
+    """
+    Pre-generates the fun facts for every chapter of a prepared book and
+    caches them where the reader looks them up. Run after
+    process_and_translate_book. Chapters already cached are skipped.
+    """
+    return await run_fun_fact_pregeneration(bucket_name, file_name)
+
+
+# Expose the function as an ADK FunctionTool
+fun_fact_pregeneration_tool = FunctionTool(pregenerate_fun_facts)
@@ -1,17 +1,50 @@
 # literary_companion/tools/gcs_tool.py
+import asyncio
+import codecs
+import gzip
 import json
 import logging
-import re
-import tempfile
 import time
 import concurrent.futures
-from typing import List, Optional
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
 from google.api_core.exceptions import NotFound
 
 from google.cloud import storage
 from google.adk.tools import FunctionTool
 
-from literary_companion.tools.translation_tool import translate_text
+from literary_companion.lib.prepared_book import (
+    build_chapter_shard,
+    build_manifest,
+    build_manifest_entry,
+    build_shards,
+    group_by_chapter,
+    manifest_object_name,
+    prepared_file_name,
+)
+from literary_companion.config import (
+    DEFAULT_AGENT_MODEL,
+    PREP_CHAPTERS_IN_FLIGHT,
+    PREP_SOURCE_CHUNK_BYTES,
+    PREPARED_OUTPUT_CHUNK_BYTES,
+    PREPARED_OUTPUT_GZIP,
+    TRANSLATION_BATCH_MAX_PARAGRAPHS,
+    TRANSLATION_BATCH_TOKENS,
+    TRANSLATION_CONCURRENCY,
+    TRANSLATION_MEMO_BUCKET,
+    TRANSLATION_MEMO_ENABLED,
+    TRANSLATION_MEMO_SQLITE_PATH,
+)
+from literary_companion.lib.book_segmenter import ParagraphSegmenter
+from literary_companion.lib.ordered_writer import OrderedJsonWriter
+from literary_companion.lib.preparation_checkpoint import PreparationCheckpoint, chapter_source_hash
+from literary_companion.lib.screenplay_checkpoint import ScreenplayCheckpoint
+from literary_companion.lib.token_estimate import pack_by_tokens
+from literary_companion.lib.translation_memo import TranslationMemo, translation_key
+from literary_companion.tools.translation_tool import (
+    TRANSLATION_PROMPT_FINGERPRINT,
+    translate_batch_async,
+    translate_text_async,
+)
 
 # Configure logging for structured output that integrates well with Cloud Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -55,6 +88,34 @@ def read_gcs_object(bucket_name: str, object_name: str) -> str:
         logging.error(f"Error reading from GCS: {e}", exc_info=True)
         raise IOError(f"Could not read gs://{bucket_name}/{object_name}") from e
 
+def read_gcs_object_if_exists(bucket_name: str, object_name: str) -> Optional[str]:
+    """
+    Reads a text file from a GCS bucket, or returns None if it does not exist.
+    One round trip either way: the download itself is the existence check.
+    """
+    try:
+        return read_gcs_object(bucket_name, object_name)
+    except NotFound:
+        logging.info(f"gs://{bucket_name}/{object_name} does not exist.")
+        return None
+
+def read_gcs_object_with_generation(bucket_name: str, object_name: str) -> Tuple[str, int]:
+    """Reads a text file from a GCS bucket along with its generation number."""
+    if not storage_client:
+        raise ConnectionError("GCS client not initialized.")
+    try:
+        bucket = storage_client.bucket(bucket_name)
+        blob = bucket.blob(object_name)
+        content = blob.download_as_text()
+        # The download populates the blob's generation from the response headers.
+        logging.info(f"Successfully read {len(content)} chars from gs://{bucket_name}/{object_name} (generation {blob.generation})")
+        return content, blob.generation
+    except NotFound:
+        raise
+    except Exception as e:
+        logging.error(f"Error reading from GCS: {e}", exc_info=True)
+        raise IOError(f"Could not read gs://{bucket_name}/{object_name}") from e
+
 def write_gcs_object(bucket_name: str, object_name: str, content: str) -> str:
     """Writes text content to a file in a GCS bucket."""
     if not storage_client:
@@ -69,39 +130,229 @@ def write_gcs_object(bucket_name: str, object_name: str, content: str) -> str:
         logging.error(f"Error writing to GCS: {e}", exc_info=True)
         return f"Error: Could not write file to GCS. {e}"
 
-def _translate_paragraph_worker(
-    paragraph_id: int,
-    paragraph_text: str,
-    chapter_number: int,
-    paragraph_in_chapter: int,
-) -> Optional[dict]:
+def write_sharded_prepared_book(bucket_name: str, prepared_name: str, paragraphs: List[dict]) -> dict:
     """
-    Worker function to translate a single paragraph.
-    Designed to be called from a ThreadPoolExecutor.
+    Writes the per-chapter sharded layout of a prepared book next to the
+    monolithic file and returns its manifest.
     """
-    if not paragraph_text:
+    if not storage_client:
+        raise ConnectionError("GCS client not initialized.")
+    manifest, shards = build_shards(prepared_name, paragraphs)
+    bucket = storage_client.bucket(bucket_name)
+
+    def upload(item):
+        object_name, data = item
+        bucket.blob(object_name).upload_from_string(data, content_type='application/json')
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(upload, shards.items()))
+
+    # The manifest goes last, so its presence means every shard is in place.
+    manifest_name = manifest_object_name(prepared_name)
+    bucket.blob(manifest_name).upload_from_string(json.dumps(manifest), content_type='application/json')
+    logging.info(
+        f"Wrote {manifest['chapter_count']} chapter shards ({manifest['byte_size']} bytes) "
+        f"and manifest to gs://{bucket_name}/{manifest_name}"
+    )
+    return manifest
+
+def read_prepared_manifest(bucket_name: str, prepared_name: str) -> Optional[dict]:
+    """Reads the sharded-layout manifest of a prepared book, or None if the book has no shards."""
+    try:
+        return json.loads(read_gcs_object(bucket_name, manifest_object_name(prepared_name)))
+    except NotFound:
         return None
 
-    translated_text = translate_text(paragraph_text)
+def read_prepared_chapters(
+    bucket_name: str,
+    prepared_name: str,
+    chapter_numbers: Optional[Iterable[int]] = None,
+    manifest: Optional[dict] = None,
+) -> Dict[int, List[dict]]:
+    """
+    Returns {chapter_number: paragraphs} for the requested chapters of a prepared book.
+    Only the needed chapter shards are downloaded. Books prepared before the
+    sharded layout existed fall back to the monolithic `_prepared.json`, as do
+    whole-book reads (chapter_numbers=None), where one download beats one per shard.
+    """
+    if chapter_numbers is not None:
+        chapter_numbers = [int(n) for n in chapter_numbers]
+        if manifest is None:
+            manifest = read_prepared_manifest(bucket_name, prepared_name)
+        if manifest:
+            entries = {c["chapter_number"]: c for c in manifest.get("chapters", [])}
+            wanted = [entries[n] for n in chapter_numbers if n in entries]
+            if not wanted:
+                return {}
 
-    if translated_text.startswith("Error:"):
-        logging.warning(f"Skipping p-{paragraph_id} due to translation error.")
+            def fetch(entry):
+                shard = json.loads(read_gcs_object(bucket_name, entry["object_name"]))
+                return entry["chapter_number"], shard.get("paragraphs", [])
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(wanted))) as executor:
+                return dict(executor.map(fetch, wanted))
+
+    book_data = json.loads(read_gcs_object(bucket_name, prepared_name))
+    chapters = group_by_chapter(book_data.get("paragraphs", []))
+    if chapter_numbers is None:
+        return dict(chapters)
+    return {n: chapters[n] for n in chapter_numbers if n in chapters}
+
+def open_screenplay_checkpoint(bucket_name: str, folder_name: str) -> Optional[ScreenplayCheckpoint]:
+    """The screenplay stage checkpoints for a book's folder, or None without a GCS client."""
+    if not storage_client or not bucket_name or not folder_name:
         return None
+    return ScreenplayCheckpoint(storage_client.bucket(bucket_name), folder_name)
 
-    logging.info(f"Successfully translated p-{paragraph_id} (Chapter {chapter_number}, Paragraph {paragraph_in_chapter}).")
+def _translation_memo(bucket_name: str) -> Optional[TranslationMemo]:
+    """The translation memo for a preparation run, or None if it is disabled."""
+    if not TRANSLATION_MEMO_ENABLED or not storage_client:
+        return None
+    return TranslationMemo(
+        storage_client.bucket(TRANSLATION_MEMO_BUCKET or bucket_name),
+        sqlite_path=TRANSLATION_MEMO_SQLITE_PATH or None,
+    )
 
+def _paragraph_record(p_meta: dict, translated_text: str) -> dict:
+    """The prepared-book record for a paragraph from the segmentation step."""
     return {
-        "paragraph_id": f"p-{paragraph_id}",
-        "chapter_number": chapter_number,
-        "paragraph_in_chapter": paragraph_in_chapter,
-        "original_text": paragraph_text,
+        "paragraph_id": f"p-{p_meta['total_id']}",
+        "chapter_number": p_meta["chapter"],
+        "paragraph_in_chapter": p_meta["para_in_chapter"],
+        "original_text": p_meta["text"],
         "translated_text": translated_text,
     }
 
-def process_and_translate_book(bucket_name: str, file_name: str) -> str:
+async def _translate_paragraph_worker(p_meta: dict) -> Optional[dict]:
+    """
+    Worker coroutine to translate a single paragraph from the segmentation step.
+    Many run concurrently on one event loop, bounded by a semaphore.
+    """
+    if not p_meta["text"]:
+        return None
+
+    translated_text = await translate_text_async(p_meta["text"])
+
+    if translated_text.startswith("Error:"):
+        # Quota and transient errors have already been retried by the LLM governor.
+        logging.warning(f"Skipping p-{p_meta['total_id']} due to translation error.")
+        return None
+
+    logging.info(f"Successfully translated p-{p_meta['total_id']} (Chapter {p_meta['chapter']}, Paragraph {p_meta['para_in_chapter']}).")
+
+    return _paragraph_record(p_meta, translated_text)
+
+def _translation_batches(paragraphs_with_metadata: List[dict]) -> List[List[int]]:
+    """
+    Groups paragraph indices into translation batches of consecutive paragraphs
+    from the same chapter, within the configured token and size budget.
+    """
+    if TRANSLATION_BATCH_TOKENS <= 0:
+        return [[i] for i in range(len(paragraphs_with_metadata))]
+    batches = []
+    chapter_indices: List[int] = []
+    for i, p_meta in enumerate(paragraphs_with_metadata):
+        if chapter_indices and paragraphs_with_metadata[chapter_indices[-1]]["chapter"] != p_meta["chapter"]:
+            batches.extend(_pack_indices(paragraphs_with_metadata, chapter_indices))
+            chapter_indices = []
+        chapter_indices.append(i)
+    if chapter_indices:
+        batches.extend(_pack_indices(paragraphs_with_metadata, chapter_indices))
+    return batches
+
+def _pack_indices(paragraphs_with_metadata: List[dict], indices: List[int]) -> List[List[int]]:
+    return pack_by_tokens(
+        indices,
+        TRANSLATION_BATCH_TOKENS,
+        text=lambda i: paragraphs_with_metadata[i]["text"],
+        max_items=TRANSLATION_BATCH_MAX_PARAGRAPHS,
+    )
+
+async def _translate_batch_worker(batch: List[dict]) -> Tuple[List[Optional[dict]], bool]:
+    """
+    Translates consecutive paragraphs in one model call. If the response does
+    not validate, falls back to one call per paragraph. Returns the records in
+    batch order (None for paragraphs that failed) and whether it fell back.
+    """
+    if len(batch) > 1:
+        first_id, last_id = f"p-{batch[0]['total_id']}", f"p-{batch[-1]['total_id']}"
+        translations = await translate_batch_async([(f"p-{m['total_id']}", m["text"]) for m in batch])
+        if translations is not None:
+            logging.info(f"Successfully translated {first_id}..{last_id} ({len(batch)} paragraphs) in one batch.")
+            return [_paragraph_record(m, translations[f"p-{m['total_id']}"]) for m in batch], False
+        logging.warning(f"Batch {first_id}..{last_id} did not validate; translating its {len(batch)} paragraphs singly.")
+
+    results = await asyncio.gather(*(
+        _translate_paragraph_worker(m) for m in batch
+    ))
+    return list(results), len(batch) > 1
+
+def _open_prepared_output(bucket, prepared_name: str) -> list:
+    """
+    Opens a resumable upload of a prepared book, gzip-encoded if
+    PREPARED_OUTPUT_GZIP is set. Returns the streams to write to and then
+    close, outermost first; the object only appears once all are closed.
+    """
+    blob = bucket.blob(prepared_name)
+    if PREPARED_OUTPUT_GZIP:
+        # GCS decompresses for clients that do not accept gzip, so readers need no changes.
+        blob.content_encoding = 'gzip'
+    upload = blob.open('wb', chunk_size=PREPARED_OUTPUT_CHUNK_BYTES, ignore_flush=True, content_type='application/json')
+    if not PREPARED_OUTPUT_GZIP:
+        return [upload]
+    return [gzip.GzipFile(fileobj=upload, mode='wb', mtime=0), upload]
+
+def _upload_chapter_shard(bucket, prepared_name: str, chapter_number: int, paragraphs: List[dict]) -> dict:
+    """Uploads one chapter's shard of the sharded layout and returns its manifest entry."""
+    shard = build_chapter_shard(chapter_number, paragraphs)
+    entry = build_manifest_entry(prepared_name, chapter_number, paragraphs, shard)
+    bucket.blob(entry["object_name"]).upload_from_string(shard, content_type='application/json')
+    return entry
+
+def iter_blob_text(blob, chunk_size: int = PREP_SOURCE_CHUNK_BYTES) -> Iterator[str]:
+    """
+    Yields a UTF-8 text object's content in ranged reads of `chunk_size` bytes.
+    The blob's size must be loaded (e.g. by blob.reload()).
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for start in range(0, blob.size or 0, chunk_size):
+        data = blob.download_as_bytes(start=start, end=min(start + chunk_size, blob.size) - 1)
+        yield decoder.decode(data)
+    yield decoder.decode(b'', final=True)
+
+async def _iter_source_pieces(blob, segmenter: ParagraphSegmenter) -> AsyncIterator[Tuple[int, List[dict], bool]]:
+    """
+    Reads and segments the source incrementally, yielding (chapter_number,
+    paragraphs, chapter_ended) pieces. The paragraphs of the current chapter
+    are yielded after every source chunk, not only once the chapter ends, so a
+    book with no headings is not segmented in full before translation starts.
+    """
+    chunks = iter_blob_text(blob)
+    piece: List[dict] = []
+    current = None
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, None)
+        records = segmenter.feed(chunk) if chunk is not None else segmenter.finish()
+        for p_meta in records:
+            if current is not None and p_meta["chapter"] != current:
+                yield current, piece, True
+                piece = []
+            current = p_meta["chapter"]
+            piece.append(p_meta)
+        if chunk is None:
+            break
+        if piece:
+            yield current, piece, False
+            piece = []
+    if current is not None:
+        yield current, piece, True
+
+async def process_and_translate_book(bucket_name: str, file_name: str, resume: bool = False) -> str:
     """
     Reads a book from GCS, identifies chapters, translates paragraph by paragraph
-    in parallel, and writes the structured result back to GCS.
+    concurrently, and writes the structured result back to GCS. Finished
+    chapters are checkpointed as it goes; with `resume` set, chapters
+    checkpointed by an interrupted earlier run are reused instead of translated again.
     """
     logging.info("Starting book processing workflow.")
     if not storage_client:
@@ -110,106 +361,288 @@ def process_and_translate_book(bucket_name: str, file_name: str) -> str:
     try:
         bucket = storage_client.bucket(bucket_name)
         blob = bucket.blob(file_name)
-        original_content = blob.download_as_text()
-        logging.info(f"Successfully read {len(original_content)} chars.")
+        await asyncio.to_thread(blob.reload)
+        logging.info(f"Streaming {blob.size} bytes from gs://{bucket_name}/{file_name}.")
     except Exception as e:
         return f"Error: Failed to read source file. {e}"
+    output_filename = prepared_file_name(file_name)
 
-    # 1. Split the entire text by double newlines to get paragraph blocks.
-    paragraph_blocks = re.split(r'(?:\r\n|\n){2,}', original_content.strip())
-
-    # 2. Process paragraphs to assign chapter and paragraph numbers
-    chapter_number = 0
-    paragraph_in_chapter = 0
-    total_paragraph_counter = 0
-    paragraphs_with_metadata = []
-    # This regex is case-insensitive and looks for "CHAPTER" followed by a space and a number/roman numeral.
-    chapter_pattern = re.compile(r'^CHAPTER\s+[\w.]+', re.IGNORECASE)
-
-    for p_block in paragraph_blocks:
-        clean_block = p_block.strip()
-        if not clean_block:
-            continue  # Skip empty blocks
-
-        if chapter_pattern.match(clean_block):
-            chapter_number += 1
-            paragraph_in_chapter = 0
-            # We don't add the chapter title itself as a paragraph to translate
-        else:
-            paragraph_in_chapter += 1
-            total_paragraph_counter += 1
-            paragraphs_with_metadata.append({
-                "text": clean_block.replace('\n', ' ').replace('\r', ' '),
-                "total_id": total_paragraph_counter,
-                "chapter": chapter_number,
-                "para_in_chapter": paragraph_in_chapter
-            })
-
-    total_paragraphs = len(paragraphs_with_metadata)
-    logging.info(f"Segmented text into {total_paragraphs} paragraphs across {chapter_number} chapters. Starting parallel translation...")
-
-    prepared_paragraphs: List[Optional[dict]] = [None] * total_paragraphs
-
-    # 3. Use a ThreadPoolExecutor to run translations in parallel.
-    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
-        future_to_index = {
-            executor.submit(
-                _translate_paragraph_worker,
-                p_meta["total_id"],
-                p_meta["text"],
-                p_meta["chapter"],
-                p_meta["para_in_chapter"]
-            ): i
-            for i, p_meta in enumerate(paragraphs_with_metadata)
-        }
-
-        processed_count = 0
-        for future in concurrent.futures.as_completed(future_to_index):
-            index = future_to_index[future]
+    # 1. Checkpoint chapters as they finish. When resuming, chapters finished
+    #    by an earlier run (with unchanged source, prompt and model) are
+    #    restored instead of translated again.
+    checkpoint = PreparationCheckpoint(
+        bucket, output_filename, {"model": DEFAULT_AGENT_MODEL, "prompt": TRANSLATION_PROMPT_FINGERPRINT}
+    )
+    try:
+        if not (resume and await asyncio.to_thread(checkpoint.load_manifest)):
+            await asyncio.to_thread(checkpoint.reset)
+    except Exception as e:
+        logging.warning(f"Checkpointing is unavailable for this run: {e}")
+        checkpoint = None
+
+    # 2. Translate paragraphs as the source is read and segmented.
+    #    Each distinct paragraph is translated once per book, and translations
+    #    memoized by earlier runs are reused, so only paragraphs never seen
+    #    before reach the model. At most TRANSLATION_CONCURRENCY batches run at
+    #    once; the LLM governor in lib/model_client.py paces the actual model
+    #    calls to the quota.
+    memo = _translation_memo(bucket_name)
+    translations: Dict[str, asyncio.Future] = {}
+    batch_slots = asyncio.Semaphore(TRANSLATION_CONCURRENCY)
+    lookup_slots = asyncio.Semaphore(32)
+    counts = {"batches": 0, "fallbacks": 0, "distinct": 0, "memo_hits": 0, "repeated": 0,
+              "restored_chapters": 0, "translated": 0}
+
+    async def lookup(key: str) -> Optional[str]:
+        async with lookup_slots:
             try:
-                result = future.result()
-                if result:
-                    prepared_paragraphs[index] = result
+                return await asyncio.to_thread(memo.get, key)
             except Exception as exc:
-                logging.error(f"Paragraph index {index} generated an exception: {exc}", exc_info=True)
+                logging.warning(f"Translation memo lookup failed; translating instead: {exc}")
+                return None
+
+    async def translate_batch(batch: List[Tuple[dict, str]]):
+        results: List[Optional[dict]] = [None] * len(batch)
+        try:
+            async with batch_slots:
+                results, fell_back = await _translate_batch_worker([p_meta for p_meta, _ in batch])
+            counts["fallbacks"] += fell_back
+            translated = {key: r["translated_text"] for (_, key), r in zip(batch, results) if r}
+            if memo and translated:
+                await asyncio.to_thread(memo.put_many, translated)
+        except Exception as exc:
+            logging.error(f"A translation batch generated an exception: {exc}", exc_info=True)
+        finally:
+            # Resolve every future, so chapters sharing these paragraphs never wait forever.
+            for (_, key), r in zip(batch, results):
+                if not translations[key].done():
+                    translations[key].set_result(r["translated_text"] if r else None)
+
+        previous_count = counts["translated"]
+        counts["translated"] += len(batch)
+        if counts["translated"] // 50 > previous_count // 50:
+            logging.info(f"Progress - Completed translation for {counts['translated']} paragraphs so far.")
+
+    def register(piece: List[dict], keys: List[str]) -> List[Tuple[dict, str]]:
+        """Adds the translation keys of `piece` to `keys`, returning the paragraphs no chapter has claimed yet."""
+        new_paragraphs = []
+        for p_meta in piece:
+            key = translation_key(p_meta["text"], TRANSLATION_PROMPT_FINGERPRINT, DEFAULT_AGENT_MODEL)
+            keys.append(key)
+            if key in translations:
+                counts["repeated"] += 1
+                continue
+            translations[key] = asyncio.get_running_loop().create_future()
+            new_paragraphs.append((p_meta, key))
+        counts["distinct"] += len(new_paragraphs)
+        return new_paragraphs
+
+    async def translate_new(new_paragraphs: List[Tuple[dict, str]]):
+        if memo and new_paragraphs:
+            memoized = await asyncio.gather(*(lookup(key) for _, key in new_paragraphs))
+            for (_, key), translation in zip(new_paragraphs, memoized):
+                if translation is not None and not translations[key].done():
+                    translations[key].set_result(translation)
+                    counts["memo_hits"] += 1
+        pending = [(p_meta, key) for p_meta, key in new_paragraphs if not translations[key].done()]
+        batches = [[pending[i] for i in indices] for indices in _translation_batches([p for p, _ in pending])]
+        counts["batches"] += len(batches)
+        await asyncio.gather(*(translate_batch(batch) for batch in batches))
+
+    async def translate_chapter(
+        chapter_number: int, pieces: asyncio.Queue, chapter_paragraphs: List[dict]
+    ) -> Tuple[List[dict], int]:
+        """
+        Translates a chapter whose paragraphs arrive on `pieces` as the source is
+        segmented, until a None, collecting them into `chapter_paragraphs`. Each
+        piece is sent for translation as it arrives, unless the chapter may be
+        restored from the checkpoint, which needs the whole chapter's source hash.
+        """
+        may_restore = bool(checkpoint and resume and checkpoint.has_chapter(chapter_number))
+        keys: List[str] = []
+        new_paragraphs: List[Tuple[dict, str]] = []
+        piece_tasks = []
+        try:
+            while (piece := await pieces.get()) is not None:
+                chapter_paragraphs.extend(piece)
+                if not may_restore:
+                    fresh = register(piece, keys)
+                    new_paragraphs.extend(fresh)
+                    piece_tasks.append(asyncio.ensure_future(translate_new(fresh)))
+            if may_restore:
+                restored = await asyncio.to_thread(
+                    checkpoint.restore_chapter, chapter_number, chapter_source_hash(chapter_paragraphs)
+                )
+                if restored is not None:
+                    counts["restored_chapters"] += 1
+                    return restored, 0
+                new_paragraphs = register(chapter_paragraphs, keys)
+                piece_tasks.append(asyncio.ensure_future(translate_new(new_paragraphs)))
+            await asyncio.gather(*piece_tasks)
+        except BaseException:
+            # Other chapters may be waiting on these paragraphs; fail them
+            # rather than leave those chapters waiting forever.
+            for task in piece_tasks:
+                task.cancel()
+            for _, key in new_paragraphs:
+                if not translations[key].done():
+                    translations[key].set_result(None)
+            raise
+
+        # Repeated paragraphs may still be in flight for another chapter.
+        chapter_translations = await asyncio.gather(*(translations[key] for key in keys))
+        records = [
+            _paragraph_record(p_meta, translation)
+            for p_meta, translation in zip(chapter_paragraphs, chapter_translations)
+            if translation is not None
+        ]
+        failed = len(chapter_paragraphs) - len(records)
+        # Chapters with failed paragraphs are left for the next run to retry.
+        if checkpoint and not failed:
+            try:
+                await asyncio.to_thread(
+                    checkpoint.save_chapter, chapter_number, chapter_source_hash(chapter_paragraphs), records
+                )
+            except Exception as e:
+                logging.warning(f"Failed to checkpoint chapter {chapter_number}: {e}")
+        logging.info(f"Progress - Completed chapter {chapter_number} ({len(records)} paragraphs).")
+        return records, failed
+
+    # 3. Stream the prepared book out in reading order while translation runs.
+    #    Each chapter goes into a resumable upload, and into its own shard, as
+    #    soon as every chapter before it is done. The upload is only finalized
+    #    at the end, so a failed run leaves the previous prepared file in place.
+    try:
+        output_streams = await asyncio.to_thread(_open_prepared_output, bucket, output_filename)
+        writer = OrderedJsonWriter(output_streams[0])
+    except Exception as e:
+        logging.error(f"Failed to start the prepared file upload: {e}", exc_info=True)
+        return f"Error: Failed to write prepared file to GCS. {e}"
+    shard_entries: List[dict] = []
+    shard_errors: List[Exception] = []
+    output_errors: List[Exception] = []
+    counts.update({"written": 0, "failed": 0})
 
-            processed_count += 1
-            if processed_count % 50 == 0 or processed_count == total_paragraphs:
-                percentage_complete = (processed_count / total_paragraphs) * 100
-                logging.info(f"Progress - Completed translation for {processed_count} of {total_paragraphs} paragraphs ({percentage_complete:.2f}% complete).")
+    # A chapter holds its slot until it has been written, so at most
+    # PREP_CHAPTERS_IN_FLIGHT chapters are in memory however large the source is.
+    # Its shard and checkpoint are written whole, so one chapter is held in
+    # full until then, even though its translation starts with its first piece.
+    chapter_slots = asyncio.Semaphore(PREP_CHAPTERS_IN_FLIGHT)
 
-    # Filter out any None results from failed translations
-    final_paragraphs = [p for p in prepared_paragraphs if p is not None]
+    async def finish_chapter(sequence: int, chapter_number: int, pieces: asyncio.Queue):
+        chapter_paragraphs: List[dict] = []
+        try:
+            records, failed = await translate_chapter(chapter_number, pieces, chapter_paragraphs)
+        except Exception as exc:
+            logging.error(f"Chapter {chapter_number} generated an exception: {exc}", exc_info=True)
+            records, failed = [], len(chapter_paragraphs)
+        counts["failed"] += failed
+        if records:
+            try:
+                shard_entries.append(await asyncio.to_thread(
+                    _upload_chapter_shard, bucket, output_filename, chapter_number, records
+                ))
+            except Exception as exc:
+                logging.error(f"Failed to write the shard of chapter {chapter_number}: {exc}", exc_info=True)
+                shard_errors.append(exc)
+        try:
+            written = await asyncio.to_thread(writer.add, sequence, records)
+        except Exception as exc:
+            logging.error(f"Failed to write chapter {chapter_number} to the prepared file: {exc}", exc_info=True)
+            output_errors.append(exc)
+            # Wake the reader loop, which stops once the output has failed.
+            chapter_slots.release()
+            return
+        counts["written"] += len(records)
+        for _ in written:
+            chapter_slots.release()
 
-    output_filename = file_name.replace('.txt', '_prepared.json')
+    segmenter = ParagraphSegmenter()
+    chapter_tasks = []
+    pieces = None
+    try:
+        async for chapter_number, piece, chapter_ended in _iter_source_pieces(blob, segmenter):
+            if pieces is None:
+                await chapter_slots.acquire()
+                if output_errors:
+                    break
+                pieces = asyncio.Queue()
+                chapter_tasks.append(asyncio.ensure_future(
+                    finish_chapter(len(chapter_tasks), chapter_number, pieces)
+                ))
+            if piece:
+                pieces.put_nowait(piece)
+            if chapter_ended:
+                pieces.put_nowait(None)
+                pieces = None
+    except Exception as e:
+        for task in chapter_tasks:
+            task.cancel()
+        return f"Error: Failed to read source file. {e}"
+    total_paragraphs = segmenter.total_paragraphs
+    logging.info(
+        f"Segmented text into {total_paragraphs} paragraphs across {segmenter.chapter_number} chapters; "
+        f"waiting for the remaining translations."
+    )
+    await asyncio.gather(*chapter_tasks)
+    if checkpoint:
+        try:
+            await asyncio.to_thread(checkpoint.flush)
+        except Exception as e:
+            logging.warning(f"Failed to write the checkpoint manifest: {e}")
 
-    # 4. Use a temporary file to build the JSON for memory efficiency.
+    failed_count = counts["failed"]
+    if failed_count:
+        logging.warning(f"{failed_count} paragraphs could not be translated and were left out.")
+    if output_errors:
+        return f"Error: Failed to write prepared file to GCS. {output_errors[0]}"
+
+    # 4. Finalize the upload, which publishes the prepared file.
     try:
-        with tempfile.NamedTemporaryFile(mode='w+', encoding='utf-8', delete=True) as tmp_file:
-            tmp_file.write('{\n  "paragraphs": [\n')
-            is_first_paragraph = True
-            for paragraph_data in final_paragraphs:
-                if not is_first_paragraph:
-                    tmp_file.write(',\n')
-                json.dump(paragraph_data, tmp_file, indent=4)
-                is_first_paragraph = False
-
-            tmp_file.write('\n  ]\n}\n')
-            tmp_file.seek(0)
-            output_blob = bucket.blob(output_filename)
-            output_blob.upload_from_file(tmp_file, content_type='application/json')
-            end_time = time.monotonic()
-            duration_minutes = (end_time - start_time) / 60
-            result_message = (
-                f"Success! Processed {len(final_paragraphs)} paragraphs and saved to gs://{bucket_name}/{output_filename}. "
-                f"Total time: {duration_minutes:.2f} minutes."
-            )
-            logging.info(result_message)
-            return result_message
+        await asyncio.to_thread(writer.finish)
+        for stream in output_streams:
+            await asyncio.to_thread(stream.close)
     except Exception as e:
         logging.error(f"Failed to write prepared file to GCS: {e}", exc_info=True)
         return f"Error: Failed to write prepared file to GCS. {e}"
 
+    # 5. The shard manifest goes last, so its presence means every shard is in
+    #    place. The monolithic file is already published, so a failure here is not fatal.
+    try:
+        if shard_errors:
+            raise shard_errors[0]
+        manifest = build_manifest(output_filename, shard_entries)
+        manifest_name = manifest_object_name(output_filename)
+        await asyncio.to_thread(
+            bucket.blob(manifest_name).upload_from_string, json.dumps(manifest), content_type='application/json'
+        )
+        shard_message = f" Wrote {manifest['chapter_count']} chapter shards."
+    except Exception as e:
+        logging.error(f"Failed to write chapter shards to GCS: {e}", exc_info=True)
+        shard_message = f" Warning: chapter shards were not written ({e})."
+
+    end_time = time.monotonic()
+    duration_minutes = (end_time - start_time) / 60
+    fallback_message = f", {counts['fallbacks']} of which fell back to one call per paragraph" if counts["fallbacks"] else ""
+    result_message = (
+        f"Success! Processed {counts['written']} paragraphs and saved to gs://{bucket_name}/{output_filename}."
+        f"{shard_message} Used {counts['batches']} translation batches"
+        f"{fallback_message}."
+        f" Reused translations for {counts['repeated']} repeated paragraphs."
+    )
+    if counts["restored_chapters"]:
+        result_message += f" Resumed {counts['restored_chapters']} chapters from the checkpoint."
+    if memo:
+        result_message += (
+            f" Translation memo: {counts['memo_hits']} of {counts['distinct']} distinct paragraphs found"
+            f" ({counts['memo_hits'] / max(1, counts['distinct']) * 100:.1f}% hit rate)."
+        )
+    result_message += f" Total time: {duration_minutes:.2f} minutes."
+    if failed_count:
+        result_message += f" Warning: {failed_count} paragraphs failed to translate and were left out."
+    logging.info(result_message)
+    return result_message
+
 # Expose the functions as ADK FunctionTools
 gcs_reader_tool = FunctionTool(read_gcs_object)
 gcs_writer_tool = FunctionTool(write_gcs_object)
@@ -3,6 +3,8 @@
 import os
 import json
 from google.cloud import storage
+from literary_companion.lib.prepared_book import parse_chapter_range
+from literary_companion.tools.gcs_tool import read_prepared_chapters
 from literary_companion.tools.translation_tool import generate_content_with_prompt
 
 # A tool to generate a screenplay beat sheet from a novel
@@ -95,12 +97,13 @@ def generate_scene_list(bucket_name: str, file_name: str, chapters_to_process: s
         print(error_message)
         return error_message
 
-    # 3. Read the prepared JSON file and get the modern text.
-    blob = bucket.blob(file_name)
+    # 3. Read the prepared chapters and get the modern text. Only the requested
+    #    chapters are downloaded; an unparseable range falls back to the whole novel.
     try:
-        json_content = blob.download_as_text()
-        data = json.loads(json_content)
-        paragraphs = data.get("paragraphs", [])
+        chapter_range = parse_chapter_range(chapters_to_process)
+        chapter_numbers = range(chapter_range[0], chapter_range[1] + 1) if chapter_range else None
+        chapters = read_prepared_chapters(bucket_name, file_name, chapter_numbers)
+        paragraphs = [p for chapter_num in sorted(chapters) for p in chapters[chapter_num]]
         modern_novel_text = " ".join(p.get("translated_text", "") for p in paragraphs if p.get("translated_text"))
         if not modern_novel_text:
             return "Error: Could not find any translated text in the prepared file."
@@ -1,7 +1,6 @@
-
 # In literary_companion/tools/screenplay_v2_tool.py
-import json
-from google.cloud import storage
+from literary_companion.lib.prepared_book import parse_chapter_range
+from literary_companion.tools.gcs_tool import read_prepared_chapters
 
 def get_novel_text_for_chapters(bucket_name: str, file_name: str, chapters_to_process: str) -> str:
     """Reads the prepared novel from GCS and returns the text for the specified chapters.
@@ -14,18 +13,14 @@ def get_novel_text_for_chapters(bucket_name: str, file_name: str, chapters_to_pr
     Returns:
         The text of the specified chapters.
     """
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(file_name)
-
     try:
-        json_content = blob.download_as_text()
-        data = json.loads(json_content)
-        paragraphs = data.get("paragraphs", [])
+        # Only the requested chapters' shards are downloaded. If the range
+        # can't be parsed, fall back to the text of the whole novel.
+        chapter_range = parse_chapter_range(chapters_to_process)
+        chapter_numbers = range(chapter_range[0], chapter_range[1] + 1) if chapter_range else None
+        chapters = read_prepared_chapters(bucket_name, file_name, chapter_numbers)
+        paragraphs = [p for chapter_num in sorted(chapters) for p in chapters[chapter_num]]
 
-        # This is a simple example of how you might filter by chapter.
-        # A more robust implementation would parse the 'chapters_to_process' string.
-        # For now, we'll just use all the text.
         modern_novel_text = " ".join(p.get("translated_text", "") for p in paragraphs if p.get("translated_text"))
         if not modern_novel_text:
             return "Error: Could not find any translated text in the prepared file."
@@ -1,24 +1,34 @@
 # literary_companion/tools/translation_tool.py
 
-from vertexai.generative_models import GenerativeModel
-from literary_companion.config import DEFAULT_AGENT_MODEL
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+
+from vertexai.generative_models import GenerationConfig
+
+from literary_companion.lib.model_client import generate_text, generate_text_async
 
 def generate_content_with_prompt(prompt: str) -> str:
     """
     A generic function to generate content from a given prompt using a generative AI model.
     """
     try:
-        model = GenerativeModel(DEFAULT_AGENT_MODEL)
-        response = model.generate_content(prompt)
-        return response.text
+        return generate_text(prompt)
     except Exception as e:
         print(f"--- Tool: Error during AI content generation: {e} ---")
         return f"Error: AI content generation failed. {e}"
 
-def translate_text(text: str) -> str:
-    """Translates classic literary text into modern, easy-to-read English using an AI model."""
-    
-    prompt = (
+async def generate_content_with_prompt_async(prompt: str) -> str:
+    """The async form of generate_content_with_prompt, run on the caller's event loop."""
+    try:
+        return await generate_text_async(prompt)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        print(f"--- Tool: Error during AI content generation: {error} ---")
+        return f"Error: AI content generation failed. {error}"
+
+def translation_prompt(text: str) -> str:
+    return (
         "You are a helpful translation assistant. Your task is to rephrase the following "
         "passage from a classic novel into clear, modern, and easily understandable English. "
         "Preserve the original meaning, characters, and events exactly. Only update the "
@@ -26,5 +36,89 @@ def translate_text(text: str) -> str:
         "commentary or introductions.\n\n"
         f"CLASSIC TEXT:\n---\n{text}\n---\n\nMODERN TRANSLATION:"
     )
-    
-    return generate_content_with_prompt(prompt)
\ No newline at end of file
+
+def translate_text(text: str) -> str:
+    """Translates classic literary text into modern, easy-to-read English using an AI model."""
+    return generate_content_with_prompt(translation_prompt(text))
+
+async def translate_text_async(text: str) -> str:
+    """The async form of translate_text."""
+    return await generate_content_with_prompt_async(translation_prompt(text))
+
+# The structured output requested for a batch: one object per paragraph.
+BATCH_TRANSLATION_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "id": {"type": "string"},
+            "translation": {"type": "string"},
+        },
+        "required": ["id", "translation"],
+    },
+}
+
+def batch_translation_prompt(paragraphs: List[Tuple[str, str]]) -> str:
+    """Builds one prompt for several (paragraph_id, text) pairs, sharing the instruction preamble."""
+    passages = "\n\n".join(f"[{paragraph_id}]\n{text}" for paragraph_id, text in paragraphs)
+    return (
+        "You are a helpful translation assistant. Your task is to rephrase each of the following "
+        "consecutive passages from a classic novel into clear, modern, and easily understandable English. "
+        "Preserve the original meaning, characters, and events exactly. Only update the "
+        "vocabulary, sentence structure, and tone to be more contemporary. Do not add any "
+        "commentary or introductions, and do not merge or split passages.\n\n"
+        "Each passage starts with its ID in square brackets. Respond with a JSON array holding one "
+        "object per passage, in the same order, each with the passage's \"id\" (without brackets) "
+        "and its \"translation\".\n\n"
+        f"CLASSIC PASSAGES:\n---\n{passages}\n---"
+    )
+
+def parse_batch_translation(response_text: str, paragraph_ids: List[str]) -> Optional[Dict[str, str]]:
+    """
+    Returns {paragraph_id: translation} from a batch response, or None unless it
+    holds exactly one non-empty translation for every requested ID.
+    """
+    try:
+        items = json.loads(response_text)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(items, list):
+        return None
+    translations = {}
+    for item in items:
+        if not isinstance(item, dict):
+            return None
+        paragraph_id, translation = item.get("id"), item.get("translation")
+        if not isinstance(paragraph_id, str) or not isinstance(translation, str) or not translation.strip():
+            return None
+        translations[paragraph_id.strip().strip("[]")] = translation.strip()
+    if len(items) != len(paragraph_ids) or set(translations) != set(paragraph_ids):
+        return None
+    return translations
+
+async def translate_batch_async(paragraphs: List[Tuple[str, str]]) -> Optional[Dict[str, str]]:
+    """
+    Translates several (paragraph_id, text) pairs in one model call. Returns
+    {paragraph_id: translation}, or None if the call failed or its response did
+    not validate, in which case the caller should translate the paragraphs singly.
+    """
+    paragraph_ids = [paragraph_id for paragraph_id, _ in paragraphs]
+    try:
+        response_text = await generate_text_async(
+            batch_translation_prompt(paragraphs),
+            generation_config=GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=BATCH_TRANSLATION_SCHEMA,
+            ),
+        )
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        print(f"--- Tool: Error during batch translation of {paragraph_ids[0]}..{paragraph_ids[-1]}: {error} ---")
+        return None
+    return parse_batch_translation(response_text, paragraph_ids)
+
+# Identifies the translation prompts in memo keys, so editing either prompt
+# invalidates translations memoized under the old wording.
+TRANSLATION_PROMPT_FINGERPRINT = hashlib.sha256(
+    (translation_prompt("") + batch_translation_prompt([])).encode("utf-8")
+).hexdigest()[:16]
@@ -8,6 +8,9 @@ set -u
 
 # This script triggers the Cloud Build job to run the book preparation workflow.
 # It assumes you have already sourced the correct gcenv.sh for your target environment.
+# Any arguments are passed on to scripts/run_book_preparation.py, e.g.
+#   ./run_book_prep_build.sh --resume
+PREP_ARGS="$*"
 
 # Check for required environment variables from gcenv.sh
 if [ -z "${PROJECT_ID:-}" ] || [ -z "${LOCATION:-}" ] || [ -z "${GCS_BUCKET_NAME:-}" ] || [ -z "${GCS_FILE_NAME:-}" ]; then
@@ -23,10 +26,11 @@ echo "Project ID:   ${PROJECT_ID}"
 echo "Location:     ${LOCATION}"
 echo "Bucket Name:  ${GCS_BUCKET_NAME}"
 echo "File Name:    ${GCS_FILE_NAME}"
+echo "Extra Args:   ${PREP_ARGS}"
 echo "----------------------------------------------------------------"
 echo ""
 
 gcloud builds submit . \
     --config=cloudbuild.yaml \
     --project="${PROJECT_ID}" \
-    --substitutions=_BUCKET_NAME="${GCS_BUCKET_NAME}",_FILE_NAME="${GCS_FILE_NAME}",_LOCATION="${LOCATION}"
\ No newline at end of file
+    --substitutions=_BUCKET_NAME="${GCS_BUCKET_NAME}",_FILE_NAME="${GCS_FILE_NAME}",_LOCATION="${LOCATION}",_PREP_ARGS="${PREP_ARGS}"
\ No newline at end of file
@@ -0,0 +1,98 @@
+# scripts/benchmark_fun_facts.py
+#
+# Measures concurrent fun-fact throughput against one or more running servers,
+# e.g. the same image started with SERVER_MODE=wsgi and SERVER_MODE=asgi:
+#
+#   docker run -p 8080:8080 -e SERVER_MODE=wsgi ... lit-comp
+#   docker run -p 8081:8080 -e SERVER_MODE=asgi ... lit-comp
+#   python scripts/benchmark_fun_facts.py --book moby_dick.txt \
+#       --target wsgi=http://localhost:8080 --target asgi=http://localhost:8081
+#
+# Requests for chapters whose fun facts are already cached measure only the
+# serving path; uncached chapters include the full LLM fan-out.
+
+import argparse
+import concurrent.futures
+import json
+import statistics
+import sys
+import time
+import urllib.request
+import uuid
+
+
+def post_fun_facts(base_url: str, book_name: str, chapter_number: int, text_segment: str, timeout: float) -> float:
+    """Sends one fun-fact request and returns its latency in seconds."""
+    body = json.dumps({
+        "text_segment": text_segment,
+        "session_id": f"bench_{uuid.uuid4().hex}",
+        "chapter_number": chapter_number,
+        "book_name": book_name,
+    }).encode("utf-8")
+    req = urllib.request.Request(
+        f"{base_url.rstrip('/')}/generate_fun_facts",
+        data=body,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    start = time.monotonic()
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        response.read()
+    return time.monotonic() - start
+
+
+def run_benchmark(base_url: str, args) -> dict:
+    chapters = [args.chapter + (i % args.distinct_chapters) for i in range(args.requests)]
+    latencies = []
+    errors = 0
+    start = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(post_fun_facts, base_url, args.book, chapter, args.text, args.timeout)
+            for chapter in chapters
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"Request failed: {e}", file=sys.stderr)
+    elapsed = time.monotonic() - start
+
+    latencies.sort()
+    return {
+        "requests": args.requests,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_s": statistics.median(latencies) if latencies else 0.0,
+        "p95_s": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+        "max_s": latencies[-1] if latencies else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark concurrent fun-fact throughput.")
+    parser.add_argument("--target", action="append", required=True,
+                        help="A server to benchmark, as 'label=url' (may be repeated).")
+    parser.add_argument("--book", required=True, help="The book name, e.g. 'moby_dick.txt'.")
+    parser.add_argument("--chapter", type=int, default=1, help="The first chapter to request.")
+    parser.add_argument("--distinct-chapters", type=int, default=1,
+                        help="Spread requests over this many consecutive chapters.")
+    parser.add_argument("--text", default="Call me Ishmael.", help="The text_segment to send.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once.")
+    parser.add_argument("--requests", type=int, default=64, help="Total requests per target.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds.")
+    args = parser.parse_args()
+
+    results = {}
+    for target in args.target:
+        label, _, url = target.partition("=")
+        if not url:
+            label, url = target, target
+        print(f"--- Benchmarking {label} ({url}): {args.requests} requests, concurrency {args.concurrency} ---")
+        results[label] = run_benchmark(url, args)
+
+    print(f"\n{'target':<12}{'req/s':>10}{'p50 (s)':>10}{'p95 (s)':>10}{'max (s)':>10}{'errors':>8}")
+    for label, r in results.items():
+        print(f"{label:<12}{r['throughput_rps']:>10.2f}{r['p50_s']:>10.2f}{r['p95_s']:>10.2f}{r['max_s']:>10.2f}{r['errors']:>8}")
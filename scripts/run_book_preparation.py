@@ -15,15 +15,29 @@ from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai.types import Content, Part
 from literary_companion.agents.book_preparation_coordinator_v1 import book_preparation_coordinator
+from literary_companion.tools.fun_fact_pregeneration_tool import run_fun_fact_pregeneration
+from literary_companion.tools.gcs_tool import process_and_translate_book
 
-async def main(bucket_name: str, file_name: str):
+async def main(bucket_name: str, file_name: str, fun_facts: bool = False, resume: bool = False):
     """
-    Runs the BookPreparationCoordinator_v1 agent to process a novel.
+    Runs the BookPreparationCoordinator_v1 agent to process a novel, optionally
+    pre-generating every chapter's fun facts afterwards. With `resume`, chapters
+    checkpointed by an interrupted earlier run are not translated again.
     """
     # Print the environment variables to confirm they are set correctly in the build
     print(f"--- Using Project: {os.environ.get('GOOGLE_CLOUD_PROJECT')} Location: {os.environ.get('GOOGLE_CLOUD_LOCATION')} ---")
     print(f"--- Starting preparation for gs://{bucket_name}/{file_name} ---")
 
+    if resume:
+        # Called directly rather than through the agent: if the model left out
+        # resume=True, the tool would reset the checkpoint this run should reuse.
+        result = await process_and_translate_book(bucket_name, file_name, resume=True)
+        print(result)
+        if fun_facts and not result.startswith("Error"):
+            print(await run_fun_fact_pregeneration(bucket_name, file_name))
+        print("--- Preparation script finished. ---")
+        return
+
     app_name = "literary-companion-preparer"
     session_service = InMemorySessionService()
 
@@ -46,11 +60,15 @@ async def main(bucket_name: str, file_name: str):
     )
     initial_message = Content(role="user", parts=[Part(text=initial_message_text)])
 
+    preparation_result = None
     async for event in runner.run_async(
         user_id=user_id,
         session_id=session_id,
         new_message=initial_message
     ):
+        for function_response in event.get_function_responses():
+            if function_response.name == process_and_translate_book.__name__:
+                preparation_result = str((function_response.response or {}).get("result", ""))
         if event.is_final_response():
             if event.content and event.content.parts:
                 final_text = event.content.parts[0].text
@@ -65,6 +83,13 @@ async def main(bucket_name: str, file_name: str):
         elif event.content and event.content.parts and (thought_text := event.content.parts[0].text) and not event.is_final_response():
             print(f"--- Agent thought: \"{thought_text.strip()}\" ---")
 
+    # Run here rather than left to the agent, so the flag never depends on the model.
+    if fun_facts:
+        if preparation_result and not preparation_result.startswith("Error"):
+            print(await run_fun_fact_pregeneration(bucket_name, file_name))
+        else:
+            print("--- Preparation did not succeed; skipping fun fact pre-generation. ---")
+
     print("--- Preparation script finished. ---")
 
 
@@ -72,6 +97,16 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the Literary Companion Book Preparation Agent.")
     parser.add_argument("--bucket", required=True, help="The GCS bucket name.")
     parser.add_argument("--file", required=True, help="The GCS file name of the novel's text.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reuse the chapters checkpointed by an interrupted earlier run instead of "
+                             "translating them again.")
+    parser.add_argument("--fun-facts", action="store_true",
+                        help="After preparing the book, pre-generate every chapter's fun facts.")
+    parser.add_argument("--fun-facts-only", action="store_true",
+                        help="Only pre-generate fun facts for an already prepared book. Chapters already cached "
+                             "are skipped, so this also resumes an interrupted run.")
+    parser.add_argument("--fun-fact-concurrency", type=int, default=None,
+                        help="Chapters to generate at once with --fun-facts-only (default: FUN_FACT_PREGEN_CONCURRENCY).")
     args = parser.parse_args()
 
     # Ensure the required environment variable is set.
@@ -79,4 +114,8 @@ if __name__ == "__main__":
         print("ERROR: The GOOGLE_CLOUD_PROJECT environment variable must be set.")
         sys.exit(1)
 
-    asyncio.run(main(args.bucket, args.file))
\ No newline at end of file
+    if args.fun_facts_only:
+        kwargs = {"concurrency": args.fun_fact_concurrency} if args.fun_fact_concurrency else {}
+        print(asyncio.run(run_fun_fact_pregeneration(args.bucket, args.file, **kwargs)))
+    else:
+        asyncio.run(main(args.bucket, args.file, fun_facts=args.fun_facts, resume=args.resume))
\ No newline at end of file
@@ -4,37 +4,29 @@ import asyncio
 import os
 import uuid
 import argparse
-import json
 import sys
-import re
 from google.adk.runners import Runner
 from literary_companion.agents.screenplay_coordinator_v2 import screenplay_coordinator_v2
 from literary_companion.tools.screenplay_v2_tool import get_novel_text_for_chapters
+from literary_companion.tools.gcs_tool import read_prepared_chapters
+from literary_companion.lib.prepared_book import parse_chapter_range, prepared_file_name
 from google.adk.sessions import InMemorySessionService
 from google.genai.types import Content, Part
 from google.cloud import storage
 
 def get_paragraphs_for_chapters(bucket_name: str, file_name: str, chapters_str: str) -> list[dict]:
     """
-    Fetches and filters paragraphs from a prepared JSON file in GCS
-    based on a chapter string (e.g., "Chapters 1 through 5").
+    Fetches the paragraphs for a chapter string (e.g., "Chapters 1 through 5")
+    from a prepared book in GCS, downloading only the needed chapter shards.
     """
-    match = re.match(r"Chapters (\d+) through (\d+)", chapters_str, re.IGNORECASE)
-    if not match:
+    chapter_range = parse_chapter_range(chapters_str)
+    if not chapter_range:
         return []
-    start_chapter, end_chapter = int(match.group(1)), int(match.group(2))
+    start_chapter, end_chapter = chapter_range
 
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(file_name)
-        file_contents = blob.download_as_string()
-        data = json.loads(file_contents)
-        
-        return [
-            p for p in data.get("paragraphs", [])
-            if p.get("chapter_number") and start_chapter <= int(p["chapter_number"]) <= end_chapter
-        ]
+        chapters = read_prepared_chapters(bucket_name, file_name, range(start_chapter, end_chapter + 1))
+        return [p for chapter_num in sorted(chapters) if chapter_num for p in chapters[chapter_num]]
     except Exception as e:
         print(f"Error fetching or parsing prepared file from GCS: {e}", file=sys.stderr)
         return []
@@ -51,7 +43,7 @@ def save_screenplay_to_gcs(bucket_name: str, file_path: str, content: str):
         print(f"\nError saving screenplay to GCS: {e}", file=sys.stderr)
 
 
-async def main(bucket: str, file: str, chapters: str, use_mocks: bool):
+async def main(bucket: str, file: str, chapters: str, use_mocks: bool, parallelism: int = None, polish: bool = False, force: bool = False):
     """
     Initializes and runs the ScreenplayCoordinatorV2 agent.
     """
@@ -61,14 +53,20 @@ async def main(bucket: str, file: str, chapters: str, use_mocks: bool):
 
     initial_state = {}
     if not use_mocks:
-        prepared_file_name = file.replace('.txt', '_prepared.json')
-        print(f"Using prepared file for screenplay generation: gs://{bucket}/{prepared_file_name}")
-        paragraphs = get_paragraphs_for_chapters(bucket, prepared_file_name, chapters)
+        prepared_name = prepared_file_name(file)
+        print(f"Using prepared file for screenplay generation: gs://{bucket}/{prepared_name}")
+        paragraphs = get_paragraphs_for_chapters(bucket, prepared_name, chapters)
         if not paragraphs:
             print(f"Error: Could not retrieve paragraphs for '{chapters}'. Aborting.", file=sys.stderr)
             return
         initial_state["paragraphs"] = paragraphs
         initial_state["folder_name"] = file.replace('.txt', '')
+        if parallelism:
+            initial_state["parallelism"] = parallelism
+        if polish:
+            initial_state["polish"] = True
+        if force:
+            initial_state["force"] = True
 
     app_name = "literary-companion-screenwriter-v2"
     session_service = InMemorySessionService()
@@ -149,6 +147,24 @@ if __name__ == "__main__":
         action="store_true",
         help="Use mock data instead of calling LLMs to reduce cost."
     )
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        default=None,
+        help="Maximum number of concurrent LLM calls (default: SCREENPLAY_PARALLELISM, or 8). Use 1 to run sequentially."
+    )
+    parser.add_argument(
+        "--polish",
+        action="store_true",
+        help="Also rewrite each rendered chapter screenplay with the LLM assembler (slower; one extra call per chapter)."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate every stage of every chapter, ignoring checkpoints from earlier runs."
+    )
     args = parser.parse_args()
+    if args.parallelism is not None and args.parallelism < 1:
+        parser.error("--parallelism must be at least 1.")
 
-    asyncio.run(main(bucket=bucket_name, file=file_name, chapters=args.chapters, use_mocks=args.use_mocks))
+    asyncio.run(main(bucket=bucket_name, file=file_name, chapters=args.chapters, use_mocks=args.use_mocks, parallelism=args.parallelism, polish=args.polish, force=args.force))
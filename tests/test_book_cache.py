@@ -0,0 +1,44 @@
+# tests/test_book_cache.py
+
+import app
+from literary_companion.lib.lru_cache import LRUCache
+from literary_companion.lib.prepared_book import build_shards
+
+CHAPTERS = 20
+
+
+def _paragraphs():
+    return [
+        {"paragraph_id": f"p-{c}-{i}", "chapter_number": c, "paragraph_in_chapter": i,
+         "original_text": f"Chapter {c}, paragraph {i}.", "translated_text": f"Capítulo {c}, párrafo {i}."}
+        for c in range(1, CHAPTERS + 1) for i in range(3)
+    ]
+
+
+def test_preloading_a_long_book_keeps_every_chapter_cached(monkeypatch):
+    manifest, shards = build_shards("book_prepared.json", _paragraphs())
+    by_number = {c["chapter_number"]: c["object_name"] for c in manifest["chapters"]}
+    gcs_reads = []
+
+    def read_chapters(bucket, prepared_name, chapter_numbers, manifest=None):
+        gcs_reads.extend(chapter_numbers)
+        return {n: app.json.loads(shards[by_number[n]])["paragraphs"] for n in chapter_numbers}
+
+    monkeypatch.setattr(app, "book_cache", LRUCache(
+        max_entries=app.BOOK_CACHE_MAX_ENTRIES,
+        max_bytes=app.BOOK_CACHE_MAX_BYTES,
+        ttl_seconds=app.BOOK_CACHE_TTL_SECONDS,
+    ))
+    monkeypatch.setattr(app, "book_store", None)
+    monkeypatch.setattr(app, "GCS_BUCKET_NAME", "bucket")
+    monkeypatch.setattr(app, "PRELOAD_BOOKS", ["book.txt"])
+    monkeypatch.setattr(app, "read_prepared_manifest", lambda bucket, prepared_name: manifest)
+    monkeypatch.setattr(app, "read_prepared_chapters", read_chapters)
+
+    app.warm_book_cache()
+    assert sorted(gcs_reads) == list(range(1, CHAPTERS + 1))
+    assert app.book_cache.stats()["evictions"] == 0
+
+    chapters = app.get_chapters("book.txt", range(1, CHAPTERS + 1))
+    assert [len(chapters[n]) for n in range(1, CHAPTERS + 1)] == [3] * CHAPTERS
+    assert len(gcs_reads) == CHAPTERS